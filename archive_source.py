@@ -0,0 +1,197 @@
+import io
+import logging
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Iterator, List, Tuple
+from config import ARCHIVE_MAX_DEPTH, ARCHIVE_MAX_NESTED_MB
+from helpers import in_irrelevant_directory, is_irrelevant_file
+
+ZIP_EXTENSIONS = ('.zip', '.jar', '.war', '.ear')
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+# Separates an archive from the path of a file inside it, as in Java's jar URLs: lib/app.war!/WEB-INF/web.xml
+MEMBER_SEPARATOR = '!/'
+# Metadata directories of Java archives (manifests, signatures, Maven descriptors)
+ARCHIVE_METADATA_DIRECTORIES = ['META-INF']
+# Archives each reader thread keeps open between files
+OPEN_ARCHIVES_PER_THREAD = 4
+
+_local = threading.local()
+
+
+def is_archive(name: str) -> bool:
+    """Return True if a file name has the extension of an archive that can be read in place."""
+    return name.lower().endswith(ZIP_EXTENSIONS + TAR_EXTENSIONS)
+
+
+def sources_jar_name(name: str) -> str:
+    """Return the name of the sources jar that belongs to a binary jar, e.g. app-1.0-sources.jar for app-1.0.jar."""
+    return name[:-len('.jar')] + '-sources.jar'
+
+
+def skip_binary_jars(names: Iterable[str]) -> List[str]:
+    """Drop binary jars that have a sources jar next to them; their classes are summarized from the sources."""
+    names = list(names)
+    present = set(names)
+    return [name for name in names
+            if not (name.lower().endswith('.jar') and sources_jar_name(name) in present)]
+
+
+def is_safe_member_name(name: str) -> bool:
+    """
+    Return False for member names that point outside the archive's tree when used as a
+    path: absolute names, names with '..' parts, drive letters or backslashes.
+    """
+    parts = PurePosixPath(name).parts
+    return bool(parts) and not name.startswith('/') and '\\' not in name \
+        and ':' not in parts[0] and '..' not in parts
+
+
+class _ZipArchive:
+    def __init__(self, source):
+        self._zip = zipfile.ZipFile(source)
+
+    def members(self) -> Iterator[Tuple[str, int]]:
+        for info in self._zip.infolist():
+            if not info.is_dir():
+                yield info.filename, info.file_size
+
+    def read(self, name: str) -> bytes:
+        return self._zip.read(name)
+
+    def close(self):
+        self._zip.close()
+
+
+class _TarArchive:
+    def __init__(self, source):
+        if isinstance(source, (str, Path)):
+            self._tar = tarfile.open(source, mode='r:*')
+        else:
+            self._tar = tarfile.open(fileobj=source, mode='r:*')
+        self._by_name = {info.name: info for info in self._tar.getmembers() if info.isfile()}
+
+    def members(self) -> Iterator[Tuple[str, int]]:
+        for name, info in self._by_name.items():
+            yield name, info.size
+
+    def read(self, name: str) -> bytes:
+        with self._tar.extractfile(self._by_name[name]) as member:
+            return member.read()
+
+    def close(self):
+        self._tar.close()
+
+
+def open_archive(source, name: str):
+    """Open an archive from a path or a file object; `name` selects zip or tar handling by its extension."""
+    if name.lower().endswith(ZIP_EXTENSIONS):
+        return _ZipArchive(source)
+    return _TarArchive(source)
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    """
+    A file inside an archive on disk, possibly inside nested archives.
+
+    It offers the parts of the Path interface the summarization pipeline uses (name,
+    suffix, relative_to, read_bytes, str), so members flow through it like files.
+    """
+    archive: Path
+    # Member names from the outer archive inward; the last one is this file
+    members: Tuple[str, ...]
+    size: int
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.members[-1]).name
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.members[-1]).suffix
+
+    def relative_to(self, directory: Path) -> PurePosixPath:
+        return PurePosixPath(MEMBER_SEPARATOR.join([self.archive.relative_to(directory).as_posix(), *self.members]))
+
+    def read_bytes(self) -> bytes:
+        """Read the member's content without extracting anything to disk."""
+        return _open_chain(self.archive, self.members[:-1]).read(self.members[-1])
+
+    def __str__(self) -> str:
+        return MEMBER_SEPARATOR.join([str(self.archive), *self.members])
+
+
+def _open_chain(archive: Path, nested: Tuple[str, ...]):
+    """Return the (nested) archive, reusing the ones this thread opened recently."""
+    cache: OrderedDict = getattr(_local, 'archives', None)
+    if cache is None:
+        cache = _local.archives = OrderedDict()
+    key = (str(archive), *nested)
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    if nested:
+        parent = _open_chain(archive, nested[:-1])
+        opened = open_archive(io.BytesIO(parent.read(nested[-1])), nested[-1])
+    else:
+        opened = open_archive(archive, archive.name)
+    cache[key] = opened
+    while len(cache) > OPEN_ARCHIVES_PER_THREAD:
+        _, evicted = cache.popitem(last=False)
+        evicted.close()
+    return opened
+
+
+def iter_archive_members(archive: Path, directory: Path, max_depth: int = ARCHIVE_MAX_DEPTH,
+                         max_nested_mb: float = ARCHIVE_MAX_NESTED_MB) -> Iterator[ArchiveMember]:
+    """
+    Yield the files in an archive that pass the same ignore rules as files on disk.
+
+    Archives inside the archive are read in memory, up to `max_depth` levels counting
+    the archive on disk and up to `max_nested_mb` in size. Compiled classes and
+    binary jars with a sources jar next to them are skipped in favour of the sources.
+    """
+    archive_path = Path(archive.relative_to(directory).as_posix())
+    try:
+        opened = open_archive(archive, archive.name)
+    except (zipfile.BadZipFile, tarfile.TarError, OSError) as e:
+        logging.warning("Skipping unreadable archive %s: %s", archive, e)
+        return
+    try:
+        yield from _walk(archive, archive_path, opened, (), 1, max_depth, max_nested_mb * 1024 * 1024)
+    finally:
+        opened.close()
+
+
+def _walk(archive: Path, archive_path: Path, opened, nested: Tuple[str, ...], depth: int,
+          max_depth: int, max_nested_bytes: float) -> Iterator[ArchiveMember]:
+    sizes: Dict[str, int] = dict(opened.members())
+    for name in skip_binary_jars(sizes):
+        if not is_safe_member_name(name):
+            logging.warning("Skipping archive member with an unsafe name in %s: %r", archive, name)
+            continue
+        members = nested + (name,)
+        # Member paths are checked as if the archive were a directory: lib/app.war!/WEB-INF/web.xml
+        virtual_path = archive_path.joinpath(*(part + '!' for part in nested), *PurePosixPath(name).parts)
+        if in_irrelevant_directory(virtual_path) or \
+                any(part in ARCHIVE_METADATA_DIRECTORIES for part in PurePosixPath(name).parts):
+            continue
+        if is_archive(name):
+            if depth >= max_depth or sizes[name] > max_nested_bytes:
+                logging.debug("Not reading nested archive %s", virtual_path)
+                continue
+            try:
+                inner = open_archive(io.BytesIO(opened.read(name)), name)
+            except (zipfile.BadZipFile, tarfile.TarError, OSError) as e:
+                logging.warning("Skipping unreadable archive %s: %s", virtual_path, e)
+                continue
+            try:
+                yield from _walk(archive, archive_path, inner, members, depth + 1, max_depth, max_nested_bytes)
+            finally:
+                inner.close()
+        elif not is_irrelevant_file(virtual_path, file_size=sizes[name]):
+            yield ArchiveMember(archive, members, sizes[name])
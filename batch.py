@@ -0,0 +1,178 @@
+import argparse
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List
+from config import OUTPUT_DIR, READER_ISOLATION
+from helpers import save_output_to_file
+from diagram_generators.renderer_factory import get_renderer, start_renderer_in_background
+from log_setup import configure_logging
+from main import resolve_settings, run_analysis
+from reader_pool import ReaderPool
+
+BATCH_REPORT_JSON = "batch_report.json"
+BATCH_REPORT_MARKDOWN = "batch_report.md"
+
+
+def load_manifest(manifest_file: Path) -> List[Dict]:
+    """
+    Load the repositories of a batch from a JSON manifest.
+
+    The manifest is either a list of repositories or an object with "repositories" and
+    optional "defaults" (settings applied to every repository). A repository is a path
+    or an object with "path" and optional "name" and "overrides". Relative paths are
+    relative to the directory of the manifest.
+    """
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"repositories": data}
+    defaults = data.get("defaults", {})
+    repositories = []
+    for entry in data["repositories"]:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        entry = {**entry, "path": str(manifest_file.parent / Path(entry["path"]).expanduser())}
+        repositories.append({**entry, "overrides": {**defaults, **entry.get("overrides", {})}})
+    return repositories
+
+
+def output_name(repository: Dict, used_names: set) -> str:
+    """Return a unique, filesystem-safe output directory name for a repository."""
+    base_name = repository.get("name") or Path(repository["path"]).resolve().name
+    base_name = re.sub(r'[^a-zA-Z0-9_.\-]', '_', base_name)
+    name = base_name
+    suffix = 2
+    while name in used_names:
+        name = f"{base_name}_{suffix}"
+        suffix += 1
+    used_names.add(name)
+    return name
+
+
+def analyze_repositories(repositories: List[Dict], output_root: Path = OUTPUT_DIR / "batch") -> List[Dict]:
+    """
+    Analyze several repositories one after another in this process.
+
+    Each repository is a dict with "path" and optional "name" and "overrides" (settings
+    from config.py, see main.OVERRIDABLE_SETTINGS). Output goes to a subdirectory of
+    `output_root` per repository. The LLM cache, the HTTP connection pool, the reader
+    processes and one renderer per diagram format are shared by all repositories. Writes a cross-repo
+    report to `output_root` and returns the per-repository reports.
+    """
+    output_root.mkdir(parents=True, exist_ok=True)
+    # Validate all overrides up front rather than failing halfway through the batch
+    for repository in repositories:
+        resolve_settings(repository.get("overrides"))
+
+    renderers = {}
+    reader_pool = ReaderPool() if READER_ISOLATION else None
+    reports = []
+    used_names = set()
+    try:
+        for position, repository in enumerate(repositories, 1):
+            name = output_name(repository, used_names)
+            settings = resolve_settings(repository.get("overrides"))
+            renderer = None
+            if settings['GENERATE_DIAGRAM']:
+                output_format = settings['OUTPUT_FORMAT']
+                if output_format not in renderers:
+                    renderers[output_format] = get_renderer(output_format)
+                    start_renderer_in_background(renderers[output_format])
+                renderer = renderers[output_format]
+
+            logging.info("Analyzing repository %s/%s: %s", position, len(repositories), repository['path'])
+            report = run_analysis(
+                Path(repository["path"]), output_root / name, repository.get("overrides"), renderer=renderer,
+                reader_pool=reader_pool,
+            )
+            report["name"] = name
+            reports.append(report)
+            # Rewrite the report after every repository so partial results survive an interruption
+            write_batch_report(reports, output_root)
+    finally:
+        for renderer in renderers.values():
+            renderer.close()
+        if reader_pool is not None:
+            reader_pool.close()
+    return reports
+
+
+def write_batch_report(reports: List[Dict], output_root: Path):
+    """Write the cross-repo report as JSON and as a Markdown table."""
+    with open(output_root / BATCH_REPORT_JSON, 'w', encoding='utf-8') as f:
+        json.dump(reports, f, indent=2)
+
+    lines = [
+        "# Batch Analysis Report",
+        "",
+        "| Repository | Status | Files | Summarized | Failed | Skipped | Diagram | Seconds |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    totals = {"files_total": 0, "files_summarized": 0, "files_failed": 0, "files_skipped": 0, "wall_seconds": 0}
+    for report in reports:
+        metrics = report.get("metrics", {})
+        for key in totals:
+            totals[key] += metrics.get(key, 0)
+        diagram = {True: "yes", False: "failed", None: "-"}[report.get("diagram")]
+        lines.append(
+            f"| {report['name']} | {report['status']} | {metrics.get('files_total', 0)} "
+            f"| {metrics.get('files_summarized', 0)} | {metrics.get('files_failed', 0)} "
+            f"| {metrics.get('files_skipped', 0)} | {diagram} | {metrics.get('wall_seconds', 0):.0f} |"
+        )
+    lines.append(
+        f"| **Total ({len(reports)})** | | {totals['files_total']} | {totals['files_summarized']} "
+        f"| {totals['files_failed']} | {totals['files_skipped']} | | {totals['wall_seconds']:.0f} |"
+    )
+    failed = [report for report in reports if report["status"] == "failed"]
+    if failed:
+        lines.extend(["", "## Failed Repositories", ""])
+        lines.extend(f"- {report['name']}: {report.get('error', '')}" for report in failed)
+    partial = [report for report in reports if report.get("coverage")]
+    if partial:
+        lines.extend(["", "## Partial Coverage", ""])
+        lines.extend(f"- {report['name']}: {report['coverage']}" for report in partial)
+    save_output_to_file("\n".join(lines) + "\n", output_root / BATCH_REPORT_MARKDOWN)
+
+
+def parse_override(text: str) -> tuple:
+    """Parse a NAME=VALUE override, reading the value as JSON when possible (true, 3, "x")."""
+    name, _, value = text.partition('=')
+    try:
+        return name, json.loads(value)
+    except json.JSONDecodeError:
+        return name, value
+
+
+def main():
+    """Command line entry point for analyzing many repositories in one process."""
+    parser = argparse.ArgumentParser(description="Analyze many repositories in one process.")
+    parser.add_argument("repos", type=Path, nargs='*', help="Repositories to analyze.")
+    parser.add_argument("--manifest", type=Path, help="JSON file listing repositories with per-repo overrides.")
+    parser.add_argument("--output-root", type=Path, default=OUTPUT_DIR / "batch",
+                        help="Directory for the per-repository output and the batch report.")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="NAME=VALUE",
+                        help="Setting applied to every repository, e.g. --set GENERATE_DIAGRAM=true.")
+    args = parser.parse_args()
+
+    repositories = load_manifest(args.manifest) if args.manifest else []
+    repositories += [{"path": str(repo)} for repo in args.repos]
+    if not repositories:
+        parser.error("no repositories given")
+    common = dict(parse_override(override) for override in args.overrides)
+    for repository in repositories:
+        repository["overrides"] = {**common, **repository.get("overrides", {})}
+
+    configure_logging(args.output_root)
+    try:
+        reports = analyze_repositories(repositories, args.output_root)
+    except ValueError as e:
+        parser.error(str(e))
+    failed = sum(1 for report in reports if report["status"] == "failed")
+    print(f"Analyzed {len(reports)} repositories ({failed} failed). "
+          f"Report: {args.output_root / BATCH_REPORT_MARKDOWN}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+from llm_cache import LLMCache, TAG_FIELDS, content_hash, template_version
+
+# Units accepted by --older-than, in seconds
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_age(age: str) -> float:
+    """Parse an age such as '30d', '12h' or '90m' into seconds."""
+    age = age.strip().lower()
+    if age and age[-1] in AGE_UNITS:
+        return float(age[:-1]) * AGE_UNITS[age[-1]]
+    return float(age) * AGE_UNITS['d']
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count for display."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def current_prompt_tags():
+    """Return the prompt versions and system prompt hashes used by the current code and configuration."""
+    # Imported lazily so that export/import work without the LLM client dependencies
+    from llm_interface import (
+        FILE_SUMMARY_PROMPT_TEMPLATE, SKELETON_SUMMARY_PROMPT_TEMPLATE, SYSTEM_PROMPT, DIAGRAM_SYSTEM_PROMPT,
+        BATCH_SUMMARY_PROMPT_TEMPLATE, BATCH_SYSTEM_PROMPT,
+    )
+    from diagram_generators.mermaid_generator import MERMAID_PROMPT_TEMPLATE
+    from diagram_generators.plantuml_generator import PLANTUML_PROMPT_TEMPLATE
+    from diagram_generators.import_graph import CLUSTER_LABEL_PROMPT_TEMPLATE, CLUSTER_LABEL_SYSTEM_PROMPT
+    from main import FIX_DIAGRAM_PROMPT_TEMPLATE
+    from qa import QA_PROMPT_TEMPLATE, QA_SYSTEM_PROMPT
+
+    prompt_versions = {
+        template_version(template)
+        for template in [
+            FILE_SUMMARY_PROMPT_TEMPLATE,
+            SKELETON_SUMMARY_PROMPT_TEMPLATE,
+            BATCH_SUMMARY_PROMPT_TEMPLATE,
+            MERMAID_PROMPT_TEMPLATE,
+            PLANTUML_PROMPT_TEMPLATE,
+            FIX_DIAGRAM_PROMPT_TEMPLATE,
+            CLUSTER_LABEL_PROMPT_TEMPLATE,
+            QA_PROMPT_TEMPLATE,
+        ]
+    }
+    system_hashes = {
+        content_hash(prompt)[:12]
+        for prompt in [
+            SYSTEM_PROMPT, DIAGRAM_SYSTEM_PROMPT, BATCH_SYSTEM_PROMPT, CLUSTER_LABEL_SYSTEM_PROMPT, QA_SYSTEM_PROMPT,
+        ]
+    }
+    return prompt_versions, system_hashes
+
+
+def export_cache(bundle_path: Path) -> int:
+    """Export the local LLM cache to a portable bundle."""
+    cache = LLMCache()
+    try:
+        return cache.export_bundle(bundle_path)
+    finally:
+        cache.close()
+
+
+def import_cache(bundle_path: Path, overwrite: bool = False) -> int:
+    """Import a cache bundle into the local LLM cache."""
+    cache = LLMCache()
+    try:
+        return cache.import_bundle(bundle_path, overwrite=overwrite)
+    finally:
+        cache.close()
+
+
+def list_cache(group_by: str):
+    """Print the cache entries grouped by a tag."""
+    cache = LLMCache()
+    try:
+        rows = cache.summarize_tags(group_by)
+    finally:
+        cache.close()
+
+    print(f"{group_by:<48} {'entries':>8} {'size':>10}  {'oldest':<16}  {'newest':<16}")
+    for row in rows:
+        oldest = datetime.fromtimestamp(row['oldest']).strftime("%Y-%m-%d %H:%M")
+        newest = datetime.fromtimestamp(row['newest']).strftime("%Y-%m-%d %H:%M")
+        tag = row['tag'] if row['tag'] is not None else "(untagged)"
+        print(f"{tag:<48} {row['entries']:>8} {format_bytes(row['bytes']):>10}  {oldest:<16}  {newest:<16}")
+
+
+def show_stats():
+    """Print the size of the cache."""
+    cache = LLMCache()
+    try:
+        stats = cache.stats()
+    finally:
+        cache.close()
+    print(f"Entries:           {stats['entries']}")
+    print(f"Response data:     {format_bytes(stats['response_bytes'])}")
+    print(f"Database file:     {format_bytes(stats['file_bytes'])}")
+    print(f"Reclaimable space: {format_bytes(stats['reclaimable_bytes'])}")
+
+
+def purge_cache(args) -> int:
+    """Purge cache entries matching the command line filters."""
+    older_than = parse_age(args.older_than) if args.older_than else None
+    cache = LLMCache()
+    try:
+        if args.stale:
+            # An entry is stale when its prompt template or its system prompt no longer exists
+            prompt_versions, system_hashes = current_prompt_tags()
+            purged = cache.purge(
+                model=args.model,
+                older_than=older_than,
+                keep_prompt_versions=prompt_versions,
+                keep_system_hashes=system_hashes,
+                dry_run=args.dry_run,
+            )
+        else:
+            purged = cache.purge(
+                model=args.model,
+                prompt_version=args.prompt_version,
+                system_hash=args.system_hash,
+                older_than=older_than,
+                dry_run=args.dry_run,
+            )
+        if args.compact and not args.dry_run:
+            cache.compact(full=True)
+    finally:
+        cache.close()
+    return purged
+
+
+def compact_cache(full: bool) -> int:
+    """Reclaim free space in the cache database."""
+    cache = LLMCache()
+    try:
+        return cache.compact(full=full)
+    finally:
+        cache.close()
+
+
+def main():
+    """Command line entry point for managing the LLM response cache."""
+    parser = argparse.ArgumentParser(description="Manage the InsightCode LLM response cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the cache to a portable bundle.")
+    export_parser.add_argument("bundle", type=Path, help="Path of the bundle file to write (e.g. cache_bundle.zip).")
+
+    import_parser = subparsers.add_parser("import", help="Import a cache bundle into the local cache.")
+    import_parser.add_argument("bundle", type=Path, help="Path of the bundle file to read.")
+    import_parser.add_argument(
+        "--overwrite", action="store_true", help="Replace local entries that also exist in the bundle."
+    )
+
+    list_parser = subparsers.add_parser("list", help="List cache entries grouped by a tag.")
+    list_parser.add_argument("--by", choices=TAG_FIELDS, default="model", help="Tag to group entries by.")
+
+    subparsers.add_parser("stats", help="Show the size of the cache.")
+
+    purge_parser = subparsers.add_parser("purge", help="Delete cache entries by tag or age.")
+    purge_parser.add_argument("--model", help="Only entries generated by this model.")
+    purge_parser.add_argument("--prompt-version", help="Only entries built from this prompt template version.")
+    purge_parser.add_argument("--system-hash", help="Only entries generated with this system prompt hash.")
+    purge_parser.add_argument("--older-than", help="Only entries older than this age, e.g. 30d, 12h or 90m.")
+    purge_parser.add_argument(
+        "--stale", action="store_true",
+        help="Only entries whose prompt template or system prompt is no longer used by the current code.",
+    )
+    purge_parser.add_argument("--dry-run", action="store_true", help="Report how many entries match without deleting.")
+    purge_parser.add_argument("--compact", action="store_true", help="Reclaim the freed space afterwards.")
+
+    compact_parser = subparsers.add_parser("compact", help="Reclaim free space in the cache database.")
+    compact_parser.add_argument(
+        "--full", action="store_true",
+        help="Rewrite the whole database (blocks other users of the cache while it runs).",
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.command == "export":
+        count = export_cache(args.bundle)
+        print(f"Exported {count} cache entries to {args.bundle}")
+    elif args.command == "import":
+        count = import_cache(args.bundle, overwrite=args.overwrite)
+        print(f"Imported {count} cache entries from {args.bundle}")
+    elif args.command == "list":
+        list_cache(args.by)
+    elif args.command == "stats":
+        show_stats()
+    elif args.command == "purge":
+        try:
+            count = purge_cache(args)
+        except ValueError as e:
+            parser.error(str(e))
+        action = "would be purged" if args.dry_run else "purged"
+        print(f"{count} cache entries {action}")
+    elif args.command == "compact":
+        released = compact_cache(args.full)
+        print(f"Released {format_bytes(released)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import ast
+import logging
+import re
+from typing import List, Set
+
+# Extensions handled by the brace-language outliner
+BRACE_LANGUAGE_EXTENSIONS = [
+    '.java', '.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx',
+    '.c', '.h', '.cpp', '.cc', '.cxx', '.hpp', '.hh', '.hxx', '.cs', '.kt', '.scala', '.go', '.swift',
+]
+
+# Placeholder written where lines were left out
+ELISION_MARKER = "..."
+
+# Keywords that look like function calls but open control-flow blocks
+CONTROL_KEYWORDS = {
+    'if', 'else', 'for', 'foreach', 'while', 'do', 'switch', 'case', 'catch', 'try', 'finally',
+    'return', 'new', 'throw', 'sizeof', 'synchronized', 'with', 'using', 'lock', 'typeof', 'await',
+}
+
+# A named function or method declaration, e.g. "public List<User> findAll(int page) throws X {"
+FUNCTION_SIGNATURE_PATTERN = re.compile(
+    r'^\s*(?:[\w<>\[\]?,.:*&~@]+\s+)*(?P<name>[A-Za-z_~][\w:~]*)\s*\([^;{}]*\)?'
+    r'\s*(?:const|noexcept|override|final|throws\s+[\w.,\s]+|:\s*[\w<>\[\]|?,.\s]+)*\s*\{?\s*$'
+)
+# Function expressions and lambdas that open a block, e.g. "const f = async (a) => {" or "function (x) {"
+FUNCTION_EXPRESSION_PATTERN = re.compile(r'(?:=>\s*\{\s*$|\bfunction\b[^{;]*\{\s*$)')
+# String literals and comments, removed before counting braces
+STRING_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`')
+LINE_COMMENT_PATTERN = re.compile(r'//.*$')
+INLINE_BLOCK_COMMENT_PATTERN = re.compile(r'/\*.*?\*/')
+
+
+def render_kept_lines(lines: List[str], keep: Set[int]) -> str:
+    """Join the kept lines (0-based indexes), replacing each run of dropped lines with an indented marker."""
+    output = []
+    previous = -1
+    for index in sorted(keep):
+        if index >= len(lines):
+            continue
+        if index > previous + 1:
+            dropped = [line for line in lines[previous + 1:index] if line.strip()]
+            if dropped:
+                indent = re.match(r'\s*', dropped[0]).group(0)
+                output.append(f"{indent}{ELISION_MARKER}")
+        output.append(lines[index])
+        previous = index
+    if previous < len(lines) - 1 and any(line.strip() for line in lines[previous + 1:]):
+        output.append(ELISION_MARKER)
+    return "\n".join(output)
+
+
+def extract_python_skeleton(source: str, body_sample_lines: int = 3) -> str:
+    """
+    Outline a Python module with the standard-library AST: module docstring, imports,
+    module and class level assignments, class and function signatures with their
+    decorators and docstrings, comments, and the first lines of each function body.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    keep: Set[int] = set()
+
+    def keep_range(start: int, end: int):
+        # AST line numbers are 1-based and inclusive
+        keep.update(range(start - 1, end))
+
+    def keep_docstring(body):
+        if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], 'value', None), ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            keep_range(body[0].lineno, body[0].end_lineno)
+            return body[1:]
+        return body
+
+    def keep_header(node):
+        start = min([d.lineno for d in getattr(node, 'decorator_list', [])] + [node.lineno])
+        body_start = node.body[0].lineno if node.body else node.end_lineno + 1
+        keep_range(start, max(node.lineno, body_start - 1))
+
+    def visit(body):
+        # Function bodies are only sampled, never visited, so every body here is module or class level
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                keep_header(node)
+                remaining = keep_docstring(node.body)
+                if remaining and body_sample_lines > 0:
+                    sample_start = remaining[0].lineno
+                    keep_range(sample_start, min(sample_start + body_sample_lines - 1, node.end_lineno))
+            elif isinstance(node, ast.ClassDef):
+                keep_header(node)
+                visit(keep_docstring(node.body))
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                keep_range(node.lineno, node.end_lineno)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                # Short assignments in full, long ones (large literals) only by their first line
+                end = node.end_lineno if node.end_lineno - node.lineno < 3 else node.lineno
+                keep_range(node.lineno, end)
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                # Module-level blocks such as `if __name__ == "__main__":` or guarded imports
+                keep_range(node.lineno, node.lineno)
+                visit(node.body)
+
+    visit(keep_docstring(tree.body))
+
+    # Keep full-line comments everywhere; they are cheap and often explain intent
+    for index, line in enumerate(lines):
+        if line.lstrip().startswith('#'):
+            keep.add(index)
+
+    return render_kept_lines(lines, keep)
+
+
+def extract_brace_skeleton(source: str, body_sample_lines: int = 3) -> str:
+    """
+    Outline a brace-delimited language (Java, JavaScript/TypeScript, C/C++ and similar)
+    with line-based patterns. Everything outside function bodies is kept: package and
+    import statements, includes, comments, annotations, type declarations and fields.
+    Function bodies are reduced to their first `body_sample_lines` lines.
+    """
+    lines = source.splitlines()
+    keep: Set[int] = set()
+    depth = 0
+    in_block_comment = False
+    # Depth at which the function body currently being elided was opened, and its sample budget
+    body_depth = None
+    sample_left = 0
+    pending_signature = False
+
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+
+        # Work out the code part of the line, skipping block comments
+        code = stripped
+        if in_block_comment:
+            if '*/' in code:
+                in_block_comment = False
+                code = code.split('*/', 1)[1]
+            else:
+                code = ''
+        code = INLINE_BLOCK_COMMENT_PATTERN.sub('', code)
+        if '/*' in code:
+            in_block_comment = True
+            code = code.split('/*', 1)[0]
+        code = LINE_COMMENT_PATTERN.sub('', STRING_PATTERN.sub('""', code)).strip()
+        is_comment = bool(stripped) and not code
+
+        opens = code.count('{')
+        closes = code.count('}')
+
+        if body_depth is not None:
+            # Inside a function body: keep comments and a short sample, then the closing line
+            if is_comment or sample_left > 0:
+                keep.add(index)
+                if not is_comment and code:
+                    sample_left -= 1
+            depth += opens - closes
+            if depth <= body_depth:
+                keep.add(index)
+                body_depth = None
+            continue
+
+        keep.add(index)
+        match = FUNCTION_SIGNATURE_PATTERN.match(code)
+        is_signature = bool(match) and match.group('name').split('::')[-1] not in CONTROL_KEYWORDS
+        is_signature = is_signature or bool(FUNCTION_EXPRESSION_PATTERN.search(code))
+
+        # The body also opens on a continuation line of a signature, e.g. "int b) throws IOException {"
+        if opens > closes and (is_signature or pending_signature):
+            body_depth = depth
+            sample_left = body_sample_lines
+        # A signature without its opening brace continues on the next lines (parameters, throws clauses)
+        pending_signature = (is_signature or (pending_signature and bool(code))) \
+            and opens == 0 and not code.endswith(';')
+        depth += opens - closes
+
+    return render_kept_lines(lines, keep)
+
+
+def extract_skeleton(source: str, file_extension: str, body_sample_lines: int = 3) -> str:
+    """
+    Return a compact structural outline of a source file, or the source unchanged when
+    the extension is not supported or the file cannot be parsed.
+    """
+    file_extension = file_extension.lower()
+    try:
+        if file_extension == '.py':
+            return extract_python_skeleton(source, body_sample_lines)
+        if file_extension in BRACE_LANGUAGE_EXTENSIONS:
+            return extract_brace_skeleton(source, body_sample_lines)
+    except (SyntaxError, ValueError, RecursionError) as e:
+        logging.debug("Could not extract a skeleton for a '%s' file, using the full content: %s", file_extension, e)
+    return source
@@ -1,57 +1,262 @@
+import argparse
+import json
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional
+from helpers import is_irrelevant_file, estimate_tokens
+from file_readers import get_reader, is_text_reader
+from file_readers.text_reader import iter_file_chunks
 
-def combine_python_files(folder_path, output_file, exclude_folders=None):
-    """
-    Combines all Python files in the specified folder and its subfolders into a single file.
-    The relative path of each file is added before its content.
-    Folders specified in exclude_folders will be skipped.
-
-    Args:
-    folder_path (str): Path to the folder containing the Python files.
-    output_file (str): Path to the output file where the combined content will be saved.
-    exclude_folders (list, optional): List of folder names to exclude from the search.
-                                      Defaults to excluding '.venv'.
-    """
+# Characters read at a time from text files
+CHUNK_SIZE = 64 * 1024
+# Separator written between files, as in the original single-file export
+FILE_SEPARATOR = "\n\n" + "=" * 80 + "\n\n"
+SHARD_NAME_TEMPLATE = "corpus_{index:04d}.txt"
+INDEX_FILE_NAME = "index.json"
+
+
+class ShardWriter:
+    """Write text into numbered shard files that each stay within a token and byte budget."""
+
+    def __init__(self, output_dir: Path, max_tokens: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.output_dir = output_dir
+        self.max_tokens = max_tokens
+        self.max_bytes = max_bytes
+        self.shards: List[dict] = []
+        self._file = None
+        self._current = None
+        # True until content has been written to the current shard
+        self._fresh = True
+        # Where the file being written started (see abort_file); None while no file is open
+        self._checkpoint = None
+
+    def _open_shard(self):
+        self.close()
+        shard_name = SHARD_NAME_TEMPLATE.format(index=len(self.shards) + 1)
+        self._file = open(self.output_dir / shard_name, 'w', encoding='utf-8')
+        self._current = {"file": shard_name, "bytes": 0, "tokens": 0, "files": []}
+        self.shards.append(self._current)
+        self._fresh = True
+
+    def _room(self) -> Optional[int]:
+        """Return how many more characters fit in the current shard, or None without a budget."""
+        limits = []
+        if self.max_bytes is not None:
+            # At least one byte per character, so this never overestimates the room
+            limits.append(self.max_bytes - self._current["bytes"])
+        if self.max_tokens is not None:
+            limits.append((self.max_tokens - self._current["tokens"]) * 4)
+        return max(min(limits), 0) if limits else None
+
+    def _write(self, text: str):
+        encoded_size = len(text.encode('utf-8'))
+        self._file.write(text)
+        self._current["bytes"] += encoded_size
+        self._current["tokens"] += estimate_tokens(text)
+
+    def start_file(self, relative_path: str):
+        """Start a new file, opening a new shard if the header does not fit in the current one."""
+        header = f"# File: {relative_path}\n\n"
+        if self._current is None:
+            self._checkpoint = (0,)
+        else:
+            self._checkpoint = (len(self.shards), self._file.tell(), self._current["bytes"], self._current["tokens"],
+                                len(self._current["files"]), self._fresh)
+        if self._current is None or (self._room() is not None and self._room() < len(header) * 2):
+            self._open_shard()
+        self._write(header)
+        self._current["files"].append({"path": relative_path, "part": 1, "bytes": 0, "tokens": 0})
+        self._relative_path = relative_path
+        self._part = 1
+
+    def write_content(self, text: str):
+        """Write file content, continuing in the next shard whenever the budget is used up."""
+        while text:
+            room = self._room()
+            if room is None or len(text) <= room:
+                piece = text
+            else:
+                piece = text[:room]
+                # Prefer to break at a line boundary when there is one in the second half of the piece
+                newline = piece.rfind('\n')
+                if newline > room // 2:
+                    piece = piece[:newline + 1]
+                # Multi-byte characters can still exceed the byte budget; shrink until they fit
+                while piece and self.max_bytes is not None and \
+                        len(piece.encode('utf-8')) > self.max_bytes - self._current["bytes"]:
+                    piece = piece[:len(piece) * 9 // 10]
+            if not piece:
+                self._continue_in_new_shard()
+                continue
+            self._write(piece)
+            self._fresh = False
+            entry = self._current["files"][-1]
+            entry["bytes"] += len(piece.encode('utf-8'))
+            entry["tokens"] += estimate_tokens(piece)
+            text = text[len(piece):]
+            if text:
+                self._continue_in_new_shard()
 
-    # Set default excluded folders if none provided
-    if exclude_folders is None:
-        exclude_folders = ['.venv', '__pycache__', '.git', '.idea', 'repo']
+    def _continue_in_new_shard(self):
+        if self._fresh:
+            raise ValueError("Shard budget is too small to hold any content")
+        self._open_shard()
+        self._part += 1
+        self._write(f"# File: {self._relative_path} (continued, part {self._part})\n\n")
+        self._current["files"].append({"path": self._relative_path, "part": self._part, "bytes": 0, "tokens": 0})
 
-    with open(output_file, 'w') as outfile:
-        # Walk through the folder and subfolders
-        for root, dirs, files in os.walk(folder_path):
-            # Get the relative path of the current folder from the root
-            relative_root = os.path.relpath(root, folder_path)
+    def end_file(self):
+        """Write the separator that closes a file, if it fits."""
+        room = self._room()
+        if room is None or room >= len(FILE_SEPARATOR):
+            self._write(FILE_SEPARATOR)
+        self._checkpoint = None
 
-            # Check if any part of the relative path contains an excluded folder
-            if any(excluded in relative_root.split(os.sep) for excluded in exclude_folders):
+    def abort_file(self):
+        """Take back everything written for the current file, e.g. after its reader failed midway."""
+        if self._checkpoint is None:
+            return
+        checkpoint, self._checkpoint = self._checkpoint, None
+        self.close()
+        # Shards opened for this file go away entirely
+        for shard in self.shards[checkpoint[0]:]:
+            (self.output_dir / shard["file"]).unlink()
+        del self.shards[checkpoint[0]:]
+        if not self.shards:
+            self._current = None
+            return
+        _, position, size, tokens, file_count, fresh = checkpoint
+        self._current = self.shards[-1]
+        self._file = open(self.output_dir / self._current["file"], 'r+', encoding='utf-8')
+        self._file.seek(position)
+        self._file.truncate()
+        self._current.update(bytes=size, tokens=tokens)
+        del self._current["files"][file_count:]
+        self._fresh = fresh
+
+    def close(self):
+        """Close the current shard file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def collect_files(folder_path: Path, extensions: Optional[List[str]] = None,
+                  exclude_folders: Optional[List[str]] = None) -> List[Path]:
+    """Walk a folder and return the files that pass the analysis ignore rules, in a stable order."""
+    exclude_folders = set(exclude_folders or [])
+    extensions = [ext.lower() for ext in extensions] if extensions else None
+    files = []
+    for root, dirs, names in os.walk(folder_path):
+        # Prune excluded folders in place so os.walk does not descend into them
+        dirs[:] = sorted(d for d in dirs if d not in exclude_folders)
+        for name in sorted(names):
+            file_path = Path(root) / name
+            if extensions is not None and file_path.suffix.lower() not in extensions:
                 continue
+            if is_irrelevant_file(file_path):
+                continue
+            files.append(file_path)
+    return files
+
+
+def iter_content(file_path: Path, extracted: Optional[str]) -> Iterator[str]:
+    """Yield the content of a file, streaming text files and chunking text extracted by other readers."""
+    if extracted is None:
+        yield from iter_file_chunks(file_path, CHUNK_SIZE)
+    else:
+        for start in range(0, len(extracted), CHUNK_SIZE):
+            yield extracted[start:start + CHUNK_SIZE]
+
+
+def export_corpus(folder_path: Path, output_dir: Path, max_tokens: Optional[int] = None,
+                  max_bytes: Optional[int] = None, workers: int = 4, extensions: Optional[List[str]] = None,
+                  exclude_folders: Optional[List[str]] = None) -> dict:
+    """
+    Export the readable content of a repository as numbered text shards plus an index.
+
+    Files are selected with the same ignore rules as the analysis and read with the
+    matching file reader. Plain text files are streamed in chunks; documents that need
+    a specific reader (PDF, Office, HTML) are extracted ahead of time by a pool of
+    `workers` threads. Each shard stays within `max_tokens` (estimated) and `max_bytes`;
+    files larger than the budget continue in the next shard. Returns the index, which
+    is also written to index.json in `output_dir`.
+    """
+    folder_path = Path(folder_path)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    files = collect_files(folder_path, extensions, exclude_folders)
+    logging.info("Exporting %s files from %s to %s", len(files), folder_path, output_dir)
 
-            # Skip excluded folders (by modifying dirs in place)
-            dirs[:] = [d for d in dirs if d not in exclude_folders]
+    def extract(file_path: Path) -> Optional[str]:
+        # Text files are streamed later on the writer thread; only extract other formats here
+        reader = get_reader(file_path.suffix)
+        if is_text_reader(reader):
+            return None
+        return reader(file_path)
 
-            for file in files:
-                if file.endswith(".py"):
-                    # Get the full file path
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, folder_path)
+    writer = ShardWriter(output_dir, max_tokens, max_bytes)
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded window of extractions in flight so memory use does not grow with the repository
+        window = max(workers * 2, 1)
+        futures = [executor.submit(extract, f) for f in files[:window]]
+        for position, file_path in enumerate(files):
+            if position + window < len(files):
+                futures.append(executor.submit(extract, files[position + window]))
+            relative_path = file_path.relative_to(folder_path).as_posix()
+            try:
+                extracted = futures[position].result()
+                futures[position] = None
+                writer.start_file(relative_path)
+                for chunk in iter_content(file_path, extracted):
+                    writer.write_content(chunk)
+                writer.end_file()
+            except Exception as e:
+                logging.error("Error exporting %s: %s", file_path, e)
+                # Leave no partial content or index entry of the file in the shards
+                writer.abort_file()
+                failed.append(relative_path)
+    writer.close()
 
-                    # Write the relative path to the output file
-                    outfile.write(f"# File: {relative_path}\n\n")
+    index = {
+        "source": str(folder_path),
+        "max_tokens": max_tokens,
+        "max_bytes": max_bytes,
+        "file_count": len(files) - len(failed),
+        "failed_files": failed,
+        "total_bytes": sum(shard["bytes"] for shard in writer.shards),
+        "total_tokens": sum(shard["tokens"] for shard in writer.shards),
+        "shards": writer.shards,
+    }
+    with open(output_dir / INDEX_FILE_NAME, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    logging.info("Wrote %s shards and %s to %s", len(writer.shards), INDEX_FILE_NAME, output_dir)
+    return index
 
-                    # Write the content of the file to the output file
-                    with open(file_path, 'r') as infile:
-                        content = infile.read()
-                        outfile.write(content)
 
-                    # Add a separator between files
-                    outfile.write("\n\n" + "="*80 + "\n\n")
+def main():
+    """Command line entry point for exporting a repository as a sharded text corpus."""
+    parser = argparse.ArgumentParser(
+        description="Export the readable content of a repository as size-limited text shards for LLM tools."
+    )
+    parser.add_argument("folder", type=Path, nargs='?', default=Path("repo"), help="Folder to export.")
+    parser.add_argument("--output-dir", type=Path, default=Path("output") / "corpus", help="Where to write shards.")
+    parser.add_argument("--max-tokens", type=int, help="Maximum estimated tokens per shard.")
+    parser.add_argument("--max-bytes", type=int, help="Maximum bytes per shard.")
+    parser.add_argument("--workers", type=int, default=4, help="Threads extracting documents in parallel.")
+    parser.add_argument("--extensions", nargs='+', help="Only export files with these extensions, e.g. .py .java")
+    parser.add_argument("--exclude", nargs='+', default=['.venv', '.git', '__pycache__'],
+                        help="Folder names to skip in addition to the standard ignore rules.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-    print(f"All Python files from '{folder_path}' have been combined into '{output_file}'.")
+    index = export_corpus(args.folder, args.output_dir, args.max_tokens, args.max_bytes, args.workers,
+                          args.extensions, args.exclude)
+    print(f"Exported {index['file_count']} files into {len(index['shards'])} shards in '{args.output_dir}'.")
 
 
-# Example usage:
-folder_path = './.'  # Change this to your target folder
-output_file = './combined_python_files.txt'  # Change this to the desired output file path
-exclude_folders = ['.venv', '__pycache__', 'repo']  # Add more folders to exclude if needed
-combine_python_files(folder_path, output_file, exclude_folders)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import re
+from typing import Dict
+from config import ROUTING_WEIGHTS
+from code_skeleton import BRACE_LANGUAGE_EXTENSIONS, STRING_PATTERN, LINE_COMMENT_PATTERN
+
+# Languages whose blocks are marked by indentation
+INDENTED_LANGUAGE_EXTENSIONS = ['.py', '.rb']
+# Files measured as code; other text (configuration, markup, documents) is measured by its length only
+CODE_EXTENSIONS = INDENTED_LANGUAGE_EXTENSIONS + BRACE_LANGUAGE_EXTENSIONS + ['.php']
+
+BRANCH_PATTERN = re.compile(r'\b(?:if|elif|for|foreach|while|case|catch|except)\b|&&|\|\|')
+IMPORT_PATTERN = re.compile(
+    r'^\s*(?:import\b|from\s+[\w.]+\s+import\b|#\s*include\b|using\s+[\w.]+\s*;|require(?:_once)?\b)'
+    r'|\brequire\s*\(',
+    re.MULTILINE,
+)
+
+
+def _indentation_depth(lines) -> int:
+    indents = [len(line) - len(line.lstrip()) for line in lines if line.strip()]
+    unit = min((indent for indent in indents if indent), default=0)
+    return max(indents, default=0) // unit if unit else 0
+
+
+def _brace_depth(lines) -> int:
+    depth = max_depth = 0
+    for line in lines:
+        code = LINE_COMMENT_PATTERN.sub('', STRING_PATTERN.sub('""', line))
+        for char in code:
+            if char == '{':
+                depth += 1
+                max_depth = max(max_depth, depth)
+            elif char == '}':
+                depth = max(depth - 1, 0)
+    return max_depth
+
+
+def complexity_metrics(file_content: str, file_extension: str) -> Dict[str, int]:
+    """
+    Return cheap static measures of a file: non-blank lines and, for code, the deepest
+    nesting of blocks, the number of branches and the number of imports.
+    """
+    lines = file_content.splitlines()
+    metrics = {"lines": sum(1 for line in lines if line.strip()), "depth": 0, "branches": 0, "imports": 0}
+    file_extension = file_extension.lower()
+    if file_extension in CODE_EXTENSIONS:
+        metrics["depth"] = _indentation_depth(lines) if file_extension in INDENTED_LANGUAGE_EXTENSIONS \
+            else _brace_depth(lines)
+        metrics["branches"] = len(BRANCH_PATTERN.findall(file_content))
+        metrics["imports"] = len(IMPORT_PATTERN.findall(file_content))
+    return metrics
+
+
+def complexity_score(file_content: str, file_extension: str, is_document: bool = False,
+                     weights: Dict[str, float] = ROUTING_WEIGHTS) -> float:
+    """
+    Score how hard a file is to summarize: the weighted sum of its complexity metrics,
+    plus the "document" weight for text extracted from documents (PDF, Office, images).
+    """
+    metrics = complexity_metrics(file_content, file_extension)
+    score = sum(weights.get(name, 0) * value for name, value in metrics.items())
+    return score + (weights.get("document", 0) if is_document else 0)
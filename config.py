@@ -7,18 +7,137 @@ OUTPUT_FORMAT = 'mermaid'  # Can be 'mermaid', 'plantuml', etc.
 
 # Ollama Configuration
 OLLAMA_URL = "http://localhost:11434/api/generate"  # Configurable LLM URL
+OLLAMA_URLS = [OLLAMA_URL]  # All Ollama servers serving the same models; requests rotate over the healthy ones
 DEFAULT_SUMMARIZATION_MODEL = "deepseek-coder-v2:16b-lite-instruct-q5_K_M"  # Configurable model. This works on 16Gb NVidia or CPU 32Gb RAM
 DEFAULT_DIAGRAM_MODEL = "deepseek-coder-v2:236b-instruct-q3_K_M"  # Configurable model. This works on 16Gb VRAM Nvidia + 64Gb CPU RAM
+ROUTING_SMALL_MODEL = "qwen2.5-coder:3b"  # Fast model for simple files when MODEL_ROUTING is enabled
+
+# Generation profiles per model, sent to Ollama with every request. Models without a profile use DEFAULT_MODEL_PROFILE.
+# num_ctx: context window in tokens, num_predict: maximum number of generated tokens,
+# keep_alive: how long Ollama keeps the model loaded after the last request (e.g. "30m", "2h", -1 for forever)
+DEFAULT_MODEL_PROFILE = {"keep_alive": "5m"}
+MODEL_PROFILES = {
+    DEFAULT_SUMMARIZATION_MODEL: {"num_ctx": 16384, "num_predict": 1024, "keep_alive": "30m"},
+    ROUTING_SMALL_MODEL: {"num_ctx": 8192, "num_predict": 1024, "keep_alive": "30m"},
+    DEFAULT_DIAGRAM_MODEL: {"num_ctx": 32768, "num_predict": 4096, "keep_alive": "1h"},
+}
+WARM_UP_DIAGRAM_MODEL = True  # Preload the diagram model in the background while summarization is still running
+DIAGRAM_WARM_UP_AT_PROGRESS = 0.8  # Fraction of summarized files after which the diagram model warm-up starts
+RELEASE_SUMMARIZATION_MODEL = True  # Unload the summarization model after summarization to free memory for the diagram model
+
+# Logging
+LOG_LEVEL = 'INFO'  # Level written to output/script_run.log ('DEBUG' also logs request payloads)
+CONSOLE_LOG_LEVEL = 'INFO'  # Level shown on the console
+LOG_EVENTS = True  # Write structured per-file events to output/events.jsonl
+
 CLEAN_CACHE_ON_STARTUP = False  # Set to True to clean cache at startup, False to retain cache
+CACHE_COMPACT_ON_STARTUP = True  # Reclaim free space in the cache from a background thread at startup
+CACHE_BUNDLE_ON_STARTUP = None  # Path to a cache bundle (see cache_tool.py export) to import at startup, e.g. Path('nightly_cache.zip')
+
+# Prompt Modes
+# 'full' sends the whole file to the summarization model, 'skeleton' sends a structural outline
+# (imports, signatures, docstrings, comments and the first lines of each function body)
+DEFAULT_PROMPT_MODE = 'full'
+PROMPT_MODE_BY_EXTENSION = {
+    '.py': 'skeleton',
+    '.java': 'skeleton',
+    '.js': 'skeleton', '.jsx': 'skeleton', '.ts': 'skeleton', '.tsx': 'skeleton',
+    '.c': 'skeleton', '.h': 'skeleton', '.cpp': 'skeleton', '.cc': 'skeleton', '.hpp': 'skeleton',
+}
+SKELETON_BODY_SAMPLE_LINES = 3  # Number of lines kept from the start of each function body
+SKELETON_MIN_FILE_CHARS = 4000  # Files shorter than this are always sent in full
+
+# Model Routing (complexity.py)
+MODEL_ROUTING = False  # Summarize simple files with ROUTING_SMALL_MODEL and the others with DEFAULT_SUMMARIZATION_MODEL
+ROUTING_MAX_SIMPLE_SCORE = 15  # Files with a complexity score up to this are simple
+# Score points per non-blank line, per level of the deepest nesting, per branch and per import (the last three only
+# for code), and for text extracted from documents (PDF, Office, images)
+ROUTING_WEIGHTS = {"lines": 0.05, "depth": 1.0, "branches": 0.5, "imports": 0.3, "document": 10}
+ROUTING_ESCALATE = True  # Summarize again with the large model when the small model's summary is too short or fails
+ROUTING_MIN_SUMMARY_CHARS = 200  # Summaries of the small model shorter than this are too short
+
+# Small-File Batching
+SMALL_FILE_BATCHING = False  # Summarize several small text files of the same directory in one LLM request
+BATCH_MAX_FILE_TOKENS = 500  # Estimated tokens up to which a file counts as small
+BATCH_TOKEN_BUDGET = 3000  # Estimated tokens of file content per batch request
+BATCH_MAX_FILES = 8  # Files per batch request
+BATCH_TOKENS_PER_SUMMARY = 400  # Generated tokens allowed per file of a batch (num_predict of the request)
+
+# Budgeted Runs (importance.py)
+# With a budget, files are ranked by importance and summarized in that order until the budget is spent; the rest
+# is listed in PENDING_FILES_FILE and summarized by the next runs, which find the files done so far in the cache
+BUDGET_SECONDS = None  # Wall-clock seconds of summarization per run, e.g. 3600; None for no limit
+BUDGET_TOKENS = None  # Prompt and completion tokens the LLM may process per run, e.g. 2_000_000; None for no limit
+# Weights of how many files import a file, how many commits changed it, its size and whether it is an entry point
+# (main program, application class, controller, routes); each measure is scaled to 0..1 before weighting
+IMPORTANCE_WEIGHTS = {"fan_in": 3.0, "churn": 2.0, "size": 1.0, "entry_point": 2.0}
+IMPORTANCE_CHURN_SINCE = "1 year ago"  # Commits counted for churn (git log --since); None counts the whole history
+
+# Archives
+ARCHIVE_INGESTION = False  # Summarize the files inside .zip, .jar, .war, .ear and tar archives without extracting them
+ARCHIVE_MAX_DEPTH = 2  # Archive levels read, counting the archive on disk: 2 reads the archives inside it, but no deeper
+ARCHIVE_MAX_NESTED_MB = 100  # Larger archives inside archives are skipped; they are held in memory while being read
+
+# HTML Extraction
+HTML_READER_MODE = 'stream'  # 'stream' extracts text with an incremental parser, 'soup' uses BeautifulSoup as before
+HTML_KEEP_HEADINGS = True  # Keep h1-h6 as Markdown headings in the extracted text ('stream' mode)
+HTML_MAX_TEXT_BYTES = 200 * 1024  # Stop reading an HTML file once this much text has been extracted ('stream' mode)
+
+# Summary Store
+EXPORT_LOOSE_SUMMARIES = False  # Also write every summary to its own file in SUMMARIES_DIR after a run
+SUMMARY_STORE_MMAP_BYTES = 256 * 1024 * 1024  # Part of the summary database SQLite reads through memory mapping
+
+# Question Answering (qa.py)
+QA_MODEL = DEFAULT_SUMMARIZATION_MODEL  # Model that answers questions from the retrieved summaries
+QA_TOP_K = 8  # Number of summaries or code chunks retrieved per question
+QA_CONTEXT_TOKEN_BUDGET = 6000  # Maximum estimated tokens of retrieved context sent with a question
+QA_CODE_CHUNK_LINES = 80  # Lines per raw code chunk when code is indexed as well
+
+# Pipeline Configuration
+READER_WORKERS = 4  # Threads that read and extract files ahead of the LLM workers
+READER_ISOLATION = True  # Extract documents (PDF, Office, HTML, images) in subprocesses; plain text is read in-process
+READER_TIMEOUT_SECONDS = 120  # Time limit for extracting one document; the reader process is killed when it is exceeded
+READER_MAX_RSS_MB = 2048  # Memory limit of a reader process (checked on Linux); larger processes are killed
+READER_MAX_FILES_PER_WORKER = 50  # Documents a reader process extracts before it is replaced, to contain memory leaks
+LLM_WORKERS = 1  # Concurrent LLM requests; raise together with OLLAMA_NUM_PARALLEL on the server
+PIPELINE_QUEUE_SIZE = 16  # Maximum number of files waiting between pipeline stages, bounds memory use
+
+# LLM Request Resilience (llm_client.py)
+LLM_CONNECT_TIMEOUT = 10  # Seconds to wait for a connection to the LLM server
+LLM_FIRST_TOKEN_TIMEOUT = 600  # Seconds to wait for the first token, including the time Ollama needs to load the model
+LLM_IDLE_TIMEOUT = 120  # Seconds a streaming response may go without a new token
+LLM_MAX_RETRIES = 3  # Retries of connection errors, timeouts and HTTP 429/5xx responses
+LLM_RETRY_BACKOFF_BASE = 2  # Seconds; the maximum delay before retry n is BASE * 2**n, the actual delay is random below it
+LLM_RETRY_BACKOFF_MAX = 60  # Upper limit of the retry delay in seconds
+LLM_HEDGING = False  # With several OLLAMA_URLS, duplicate slow requests on a second server and keep the first response
+LLM_HEDGE_PERCENTILE = 0.95  # A request is slow once it takes longer than this fraction of recent requests to the same model
+LLM_HEDGE_MIN_SAMPLES = 20  # Requests to a model that must have finished before hedging starts
+CIRCUIT_BREAKER_FAILURES = 5  # Consecutive failures after which a server is no longer called
+CIRCUIT_BREAKER_RESET_SECONDS = 60  # Seconds before a failed server gets a trial request again
 
 # Diagram Generation Configuration
 GENERATE_DIAGRAM = False  # Set to True to enable diagram generation, False to disable
 MAX_FIX_ATTEMPTS = 2  # Maximum number of attempts to fix the diagram code
+DIAGRAM_SOURCE = 'llm'  # 'llm' generates the diagram with DEFAULT_DIAGRAM_MODEL, 'import_graph' derives it from import statements
+IMPORT_GRAPH_PACKAGE_DEPTH = 2  # Directory depth of the packages shown in the import graph diagram
+IMPORT_GRAPH_MIN_EDGE_WEIGHT = 1  # Minimum number of file-level imports for a dependency to be drawn
+IMPORT_GRAPH_LABEL_CLUSTERS = False  # Let DEFAULT_SUMMARIZATION_MODEL name the clusters of the import graph diagram
+DIAGRAM_VIEWS = 'single'  # 'single' draws one LLM diagram of the whole codebase, 'multi' one per top-level package plus an overview
+DIAGRAM_VIEW_WORKERS = 2  # Views generated at the same time; raise together with OLLAMA_NUM_PARALLEL or OLLAMA_URLS
+DIAGRAM_VIEW_MIN_FILES = 3  # Packages with fewer summarized files are drawn together in one "other" view
+DIAGRAM_MAX_VIEWS = 12  # Maximum number of package views; the smallest packages beyond it join the "other" view
+DIAGRAM_OVERVIEW_FILES_PER_VIEW = 10  # Files per package described in the overview prompt
 
 # Directories
 CACHE_DIR = Path('cache')
+CACHE_DB_FILE = CACHE_DIR / 'llm_cache.sqlite'  # Portable SQLite store for LLM responses
 OUTPUT_DIR = Path('output')
 
 # Subdirectories within OUTPUT_DIR
-SUMMARIES_DIR = OUTPUT_DIR / "summaries"
-UNPROCESSED_DIR = OUTPUT_DIR / "unprocessed_files"
+SUMMARIES_DIR = OUTPUT_DIR / "summaries"  # Loose summary files, written only on export (see summary_store.py)
+SUMMARY_DB_FILE = OUTPUT_DIR / "summaries.sqlite"  # Store of all file summaries with their metadata
+UNPROCESSED_DIR = OUTPUT_DIR / "unprocessed_files"  # Copies of files that could not be read, listed with the reason in unprocessed.jsonl
+RUN_METRICS_FILE = OUTPUT_DIR / "run_metrics.json"  # Counters and stage timings of the last run
+RUN_METRICS_HISTORY_FILE = OUTPUT_DIR / "run_metrics_history.jsonl"  # Metrics of all runs, one JSON object per line
+PENDING_FILES_FILE = OUTPUT_DIR / "pending_files.json"  # Files a budgeted run left for the next run, most important first
+QA_INDEX_FILE = OUTPUT_DIR / "qa_index.json"  # Persistent BM25 index used by qa.py
@@ -1,45 +1,45 @@
 import importlib
 import logging
-from config import OUTPUT_FORMAT
+from config import OUTPUT_FORMAT, DEFAULT_DIAGRAM_MODEL
 
-def generate_diagram_prompt(combined_summary: str) -> str:
+def generate_diagram_prompt(combined_summary: str, output_format: str = OUTPUT_FORMAT) -> str:
     """Dynamically load and generate the diagram prompt based on the selected output format."""
     try:
         # Dynamically build the module name (e.g., 'mermaid_generator', 'plantuml_generator')
-        module_name = f'.{OUTPUT_FORMAT.lower()}_generator'
+        module_name = f'.{output_format.lower()}_generator'
 
         # Load the module dynamically relative to the 'diagram_generators' package
         generator_module = importlib.import_module(module_name, package='diagram_generators')
 
         # Dynamically load the prompt generation function (e.g., 'generate_mermaid_prompt')
-        generate_prompt_function = getattr(generator_module, f'generate_{OUTPUT_FORMAT.lower()}_prompt')
+        generate_prompt_function = getattr(generator_module, f'generate_{output_format.lower()}_prompt')
 
         # Call the dynamically loaded function
         return generate_prompt_function(combined_summary)
 
     except ModuleNotFoundError:
-        raise ValueError(f"Unsupported output format: {OUTPUT_FORMAT}")
+        raise ValueError(f"Unsupported output format: {output_format}")
 
     except AttributeError:
-        raise ValueError(f"No valid prompt generator function found for format: {OUTPUT_FORMAT}")
+        raise ValueError(f"No valid prompt generator function found for format: {output_format}")
 
-def generate_diagram_code(prompt: str) -> str:
+def generate_diagram_code(prompt: str, output_format: str = OUTPUT_FORMAT, model: str = DEFAULT_DIAGRAM_MODEL) -> str:
     """Dynamically load and generate the diagram code based on the selected output format."""
     try:
         # Dynamically build the module name (e.g., 'mermaid_generator', 'plantuml_generator')
-        module_name = f'.{OUTPUT_FORMAT.lower()}_generator'
+        module_name = f'.{output_format.lower()}_generator'
 
         # Load the module dynamically relative to the 'diagram_generators' package
         generator_module = importlib.import_module(module_name, package='diagram_generators')
 
         # Dynamically load the diagram code generation function (e.g., 'generate_mermaid_code')
-        generate_code_function = getattr(generator_module, f'generate_{OUTPUT_FORMAT.lower()}_code')
+        generate_code_function = getattr(generator_module, f'generate_{output_format.lower()}_code')
 
         # Call the dynamically loaded function
-        return generate_code_function(prompt)
+        return generate_code_function(prompt, model=model)
 
     except ModuleNotFoundError:
-        raise ValueError(f"Unsupported output format: {OUTPUT_FORMAT}")
+        raise ValueError(f"Unsupported output format: {output_format}")
 
     except AttributeError:
-        raise ValueError(f"No valid code generator function found for format: {OUTPUT_FORMAT}")
\ No newline at end of file
+        raise ValueError(f"No valid code generator function found for format: {output_format}")
\ No newline at end of file
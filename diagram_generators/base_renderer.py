@@ -7,4 +7,12 @@ class BaseRenderer(ABC):
     @abstractmethod
     def generate_png(self, diagram_code: str, output_dir: Path) -> Path:
         """Generate a PNG from the diagram code."""
-        pass
\ No newline at end of file
+        pass
+
+    def start(self):
+        """Prepare any expensive resources (browsers, drivers) before the first render. Optional."""
+        pass
+
+    def close(self):
+        """Release resources acquired by start() or generate_png(). Optional."""
+        pass
@@ -0,0 +1,371 @@
+import argparse
+import ast
+import hashlib
+import logging
+import os
+import re
+from collections import defaultdict
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Set, Tuple
+from helpers import is_irrelevant_file
+
+PYTHON_EXTENSIONS = ['.py']
+JAVA_EXTENSIONS = ['.java']
+JS_EXTENSIONS = ['.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx']
+C_EXTENSIONS = ['.c', '.h', '.cc', '.cpp', '.cxx', '.hh', '.hpp', '.hxx']
+SOURCE_EXTENSIONS = PYTHON_EXTENSIONS + JAVA_EXTENSIONS + JS_EXTENSIONS + C_EXTENSIONS
+
+# Leading directories that hold sources but say nothing about the architecture
+SOURCE_ROOTS = [
+    ('src', 'main', 'java'), ('src', 'main', 'kotlin'), ('src', 'main', 'scala'),
+    ('src', 'main', 'js'), ('src', 'main', 'ts'), ('src', 'main', 'cpp'), ('src',),
+]
+# First components of reverse-domain Java/Kotlin package directories, e.g. com/acme/...
+REVERSE_DOMAIN_PREFIXES = ['com', 'org', 'net', 'io', 'de', 'nl', 'fr', 'uk', 'be', 'ch', 'edu', 'gov']
+ROOT_PACKAGE = '(root)'
+
+JAVA_PACKAGE_PATTERN = re.compile(r'^\s*package\s+([\w.]+)\s*;', re.MULTILINE)
+JAVA_IMPORT_PATTERN = re.compile(r'^\s*import\s+(?:static\s+)?([\w.]+(?:\.\*)?)\s*;', re.MULTILINE)
+JS_IMPORT_PATTERN = re.compile(
+    r'''(?:\bimport\s+(?:[^'";]*?\s+from\s+)?|\bexport\s+[^'";]*?\s+from\s+|\brequire\s*\(\s*|\bimport\s*\(\s*)['"]([^'"]+)['"]'''
+)
+C_INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+PYTHON_IMPORT_PATTERN = re.compile(r'^\s*(?:from\s+(\.*[\w.]*)\s+import\s+([\w.,\s*]+)|import\s+([\w.,\s]+))', re.MULTILINE)
+
+
+def read_source(file_path: Path) -> str:
+    """Read a source file as text, ignoring undecodable bytes."""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def python_module_name(relative_path: PurePosixPath) -> str:
+    """Return the dotted module name for a Python file path relative to the repository root."""
+    parts = list(relative_path.with_suffix('').parts)
+    if parts and parts[-1] == '__init__':
+        parts = parts[:-1]
+    return '.'.join(parts)
+
+
+def parse_python_imports(source: str, relative_path: PurePosixPath) -> List[str]:
+    """Return the absolute dotted names imported by a Python file, resolving relative imports."""
+    package_parts = list(relative_path.parent.parts)
+    names = []
+
+    def resolve(level: int, module: Optional[str]) -> str:
+        if level == 0:
+            return module or ''
+        base = package_parts[:len(package_parts) - (level - 1)] if level > 1 else package_parts
+        return '.'.join(base + ([module] if module else []))
+
+    try:
+        tree = ast.parse(source)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                base = resolve(node.level, node.module)
+                names.append(base)
+                # "from package import module" imports a submodule, not just a name
+                names.extend(f"{base}.{alias.name}" if base else alias.name for alias in node.names if alias.name != '*')
+    except SyntaxError:
+        # Files written for another Python version still have recognisable import lines
+        for match in PYTHON_IMPORT_PATTERN.finditer(source):
+            if match.group(3):
+                names.extend(name.strip().split(' ')[0] for name in match.group(3).split(','))
+            else:
+                module = match.group(1)
+                level = len(module) - len(module.lstrip('.'))
+                base = resolve(level, module.lstrip('.') or None)
+                names.append(base)
+                names.extend(f"{base}.{n.strip()}" for n in match.group(2).split(',') if n.strip() not in ('', '*'))
+    return [name for name in names if name]
+
+
+class ImportGraph:
+    """File-level dependency graph of a repository, built from import, include and package statements."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.files: List[PurePosixPath] = []
+        self.edges: Set[Tuple[PurePosixPath, PurePosixPath]] = set()
+        self._python_modules: Dict[str, PurePosixPath] = {}
+        self._java_classes: Dict[str, PurePosixPath] = {}
+        self._java_packages: Dict[str, List[PurePosixPath]] = defaultdict(list)
+        self._by_path: Set[PurePosixPath] = set()
+        self._by_name: Dict[str, List[PurePosixPath]] = defaultdict(list)
+        # Package of every file, filled by collapse()
+        self.file_packages: Dict[PurePosixPath, str] = {}
+
+    def build(self) -> 'ImportGraph':
+        """Scan the repository and resolve imports between its source files."""
+        sources = {}
+        for file_path in sorted(self.directory.glob('**/*')):
+            if not file_path.is_file() or file_path.suffix.lower() not in SOURCE_EXTENSIONS:
+                continue
+            relative_path = PurePosixPath(file_path.relative_to(self.directory).as_posix())
+            if is_irrelevant_file(Path(relative_path)):
+                continue
+            try:
+                sources[relative_path] = read_source(file_path)
+            except OSError as e:
+                logging.warning("Could not read %s for the import graph: %s", file_path, e)
+                continue
+            self.files.append(relative_path)
+            self._index(relative_path, sources[relative_path])
+
+        for relative_path, source in sources.items():
+            for target in self._resolve_imports(relative_path, source):
+                if target != relative_path:
+                    self.edges.add((relative_path, target))
+
+        logging.info("Import graph: %s source files, %s internal dependencies", len(self.files), len(self.edges))
+        return self
+
+    def _index(self, relative_path: PurePosixPath, source: str):
+        suffix = relative_path.suffix.lower()
+        self._by_path.add(relative_path)
+        self._by_name[relative_path.name].append(relative_path)
+        if suffix in PYTHON_EXTENSIONS:
+            # Register every dotted suffix so that imports relative to a source root (e.g. src/) resolve
+            module_parts = python_module_name(relative_path).split('.')
+            for start in range(len(module_parts)):
+                self._python_modules.setdefault('.'.join(module_parts[start:]), relative_path)
+        elif suffix in JAVA_EXTENSIONS:
+            package_match = JAVA_PACKAGE_PATTERN.search(source)
+            package = package_match.group(1) if package_match else ''
+            class_name = f"{package}.{relative_path.stem}" if package else relative_path.stem
+            self._java_classes[class_name] = relative_path
+            self._java_packages[package].append(relative_path)
+
+    def _resolve_imports(self, relative_path: PurePosixPath, source: str) -> Set[PurePosixPath]:
+        suffix = relative_path.suffix.lower()
+        targets = set()
+        if suffix in PYTHON_EXTENSIONS:
+            for name in parse_python_imports(source, relative_path):
+                if name in self._python_modules:
+                    targets.add(self._python_modules[name])
+        elif suffix in JAVA_EXTENSIONS:
+            for name in JAVA_IMPORT_PATTERN.findall(source):
+                if name.endswith('.*'):
+                    targets.update(self._java_packages.get(name[:-2], []))
+                    continue
+                # Static imports and nested classes name a member below the top-level class
+                parts = name.split('.')
+                for end in range(len(parts), 0, -1):
+                    candidate = '.'.join(parts[:end])
+                    if candidate in self._java_classes:
+                        targets.add(self._java_classes[candidate])
+                        break
+        elif suffix in JS_EXTENSIONS:
+            for specifier in JS_IMPORT_PATTERN.findall(source):
+                if specifier.startswith('.'):
+                    target = self._resolve_relative_path(relative_path, specifier, JS_EXTENSIONS)
+                    if target:
+                        targets.add(target)
+        elif suffix in C_EXTENSIONS:
+            for include in C_INCLUDE_PATTERN.findall(source):
+                target = self._resolve_relative_path(relative_path, include, [])
+                if target is None:
+                    # Include directories are not known, so fall back to a unique match on the path suffix
+                    matches = [p for p in self._by_name.get(PurePosixPath(include).name, [])
+                               if p.as_posix().endswith(include)]
+                    target = matches[0] if len(matches) == 1 else None
+                if target:
+                    targets.add(target)
+        return targets
+
+    def _resolve_relative_path(self, relative_path: PurePosixPath, specifier: str,
+                               extensions: List[str]) -> Optional[PurePosixPath]:
+        joined = os.path.normpath(os.path.join(relative_path.parent.as_posix(), specifier)).replace(os.sep, '/')
+        base = PurePosixPath(joined)
+        candidates = [base] + [PurePosixPath(f"{joined}{ext}") for ext in extensions]
+        candidates += [base / f"index{ext}" for ext in extensions]
+        for candidate in candidates:
+            if candidate in self._by_path:
+                return candidate
+        return None
+
+    def package_of(self, relative_path: PurePosixPath, depth: int, common_prefix: Tuple[str, ...]) -> str:
+        """Return the package (directory, without source roots and the common prefix) of a file, cut to `depth`."""
+        parts = strip_source_root(relative_path.parent.parts)
+        parts = parts[len(common_prefix):]
+        return '/'.join(parts[:depth]) if parts else ROOT_PACKAGE
+
+    def collapse(self, depth: int = 2) -> Tuple[Dict[str, int], Dict[Tuple[str, str], int]]:
+        """
+        Collapse the file graph to package level.
+
+        Returns the number of files per package and the number of file-level
+        dependencies between each pair of packages.
+        """
+        directories = [strip_source_root(p.parent.parts) for p in self.files]
+        common_prefix = common_path_prefix(directories)
+        packages: Dict[str, int] = defaultdict(int)
+        self.file_packages = {}
+        for relative_path in self.files:
+            package = self.package_of(relative_path, depth, common_prefix)
+            self.file_packages[relative_path] = package
+            packages[package] += 1
+
+        package_edges: Dict[Tuple[str, str], int] = defaultdict(int)
+        for source, target in self.edges:
+            source_package, target_package = self.file_packages[source], self.file_packages[target]
+            if source_package != target_package:
+                package_edges[(source_package, target_package)] += 1
+        return dict(packages), dict(package_edges)
+
+
+def strip_source_root(parts: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Remove a leading source root such as src/main/java and a reverse-domain prefix such as com/acme."""
+    for root in SOURCE_ROOTS:
+        if parts[:len(root)] == root:
+            parts = parts[len(root):]
+            break
+    if len(parts) > 2 and parts[0] in REVERSE_DOMAIN_PREFIXES:
+        parts = parts[2:]
+    return parts
+
+
+def common_path_prefix(paths: List[Tuple[str, ...]]) -> Tuple[str, ...]:
+    """Return the directory parts shared by all paths, keeping at least one level below it."""
+    if not paths:
+        return ()
+    prefix = []
+    for level in zip(*paths):
+        if len(set(level)) != 1:
+            break
+        prefix.append(level[0])
+    # Never strip a level that some path ends at, otherwise those files would lose their package
+    shortest = min(len(p) for p in paths)
+    return tuple(prefix[:max(min(len(prefix), shortest - 1), 0)])
+
+
+def cluster_packages(packages: Dict[str, int]) -> Dict[str, List[str]]:
+    """Group packages by their top-level directory."""
+    clusters: Dict[str, List[str]] = defaultdict(list)
+    for package in sorted(packages):
+        clusters[package.split('/')[0]].append(package)
+    return dict(clusters)
+
+
+def node_id(name: str) -> str:
+    """
+    Return a diagram-safe identifier for a package or cluster name. A short hash of the
+    name keeps names that differ only in replaced characters (my-app, my_app) apart.
+    """
+    identifier = re.sub(r'\W', '_', name).strip('_') or 'root'
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:6]
+    return f"n_{identifier}_{digest}"
+
+
+def safe_label(label: str) -> str:
+    """Remove characters that break diagram labels."""
+    return re.sub(r'["<>{}\[\]|]', '', label).strip()
+
+
+def render_mermaid(packages: Dict[str, int], edges: Dict[Tuple[str, str], int],
+                   clusters: Dict[str, List[str]], cluster_labels: Dict[str, str]) -> str:
+    """Emit a Mermaid flowchart for a package graph."""
+    lines = ['flowchart LR']
+    for cluster, members in clusters.items():
+        lines.append(f'    subgraph {node_id(cluster)}_group ["{safe_label(cluster_labels.get(cluster, cluster))}"]')
+        for package in members:
+            lines.append(f'        {node_id(package)}["{safe_label(package)} ({packages[package]})"]')
+        lines.append('    end')
+    for (source, target), weight in sorted(edges.items()):
+        lines.append(f'    {node_id(source)} -->|{weight}| {node_id(target)}')
+    return '\n'.join(lines)
+
+
+def render_plantuml(packages: Dict[str, int], edges: Dict[Tuple[str, str], int],
+                    clusters: Dict[str, List[str]], cluster_labels: Dict[str, str]) -> str:
+    """Emit a PlantUML component diagram for a package graph."""
+    lines = ['@startuml', 'left to right direction']
+    for cluster, members in clusters.items():
+        lines.append(f'package "{safe_label(cluster_labels.get(cluster, cluster))}" {{')
+        for package in members:
+            lines.append(f'  component "{safe_label(package)} ({packages[package]})" as {node_id(package)}')
+        lines.append('}')
+    for (source, target), weight in sorted(edges.items()):
+        lines.append(f'{node_id(source)} --> {node_id(target)} : {weight}')
+    lines.append('@enduml')
+    return '\n'.join(lines)
+
+
+CLUSTER_LABEL_PROMPT_TEMPLATE = """Give a short name (two to four words) for the part of a software system that consists of the packages and files listed below. Answer with the name only.
+
+Packages: {packages}
+Files: {files}
+"""
+
+CLUSTER_LABEL_SYSTEM_PROMPT = "You name software components. Reply with the name only, without punctuation or explanations."
+
+
+def label_clusters_with_llm(graph: ImportGraph, clusters: Dict[str, List[str]], model: str) -> Dict[str, str]:
+    """Ask the LLM for a descriptive name per cluster; the cluster directory name is kept on failure."""
+    from llm_interface import generate_response_with_llm
+    from llm_cache import template_version
+
+    labels = {}
+    for cluster, members in clusters.items():
+        files = [path.name for path, package in graph.file_packages.items() if package.split('/')[0] == cluster][:30]
+        prompt = CLUSTER_LABEL_PROMPT_TEMPLATE.format(packages=', '.join(members), files=', '.join(files))
+        try:
+            response = generate_response_with_llm(
+                prompt, CLUSTER_LABEL_SYSTEM_PROMPT, model,
+                prompt_version=template_version(CLUSTER_LABEL_PROMPT_TEMPLATE),
+            )
+        except Exception as e:
+            logging.warning("Could not label cluster %s: %s", cluster, e)
+            continue
+        label = safe_label(re.sub(r'[^\w\s\-/]', '', response.strip().splitlines()[0] if response.strip() else ''))
+        if label:
+            labels[cluster] = f"{label} - {cluster}"
+    return labels
+
+
+def generate_import_graph_diagram(directory: Path, diagram_type: str, depth: int = 2, min_edge_weight: int = 1,
+                                  label_model: Optional[str] = None) -> str:
+    """
+    Build the import graph of a repository and return it as Mermaid or PlantUML code.
+
+    The graph is collapsed to packages `depth` directories deep and grouped into one
+    cluster per top-level directory. Dependencies between packages with fewer than
+    `min_edge_weight` file-level imports are left out. When `label_model` is given,
+    that model names the clusters; everything else is deterministic.
+    """
+    graph = ImportGraph(directory).build()
+    packages, edges = graph.collapse(depth)
+    edges = {pair: weight for pair, weight in edges.items() if weight >= min_edge_weight}
+    clusters = cluster_packages(packages)
+    cluster_labels = label_clusters_with_llm(graph, clusters, label_model) if label_model else {}
+
+    diagram_type = diagram_type.lower()
+    if diagram_type == 'mermaid':
+        return render_mermaid(packages, edges, clusters, cluster_labels)
+    if diagram_type == 'plantuml':
+        return render_plantuml(packages, edges, clusters, cluster_labels)
+    raise ValueError(f"Unsupported diagram type for the import graph: {diagram_type}")
+
+
+def main():
+    """Command line entry point: print the import graph diagram of a repository."""
+    parser = argparse.ArgumentParser(description="Generate an architecture diagram from the import graph.")
+    parser.add_argument("directory", type=Path, nargs='?', default=Path("repo"), help="Repository to analyze.")
+    parser.add_argument("--format", choices=['mermaid', 'plantuml'], default='mermaid', help="Diagram language.")
+    parser.add_argument("--depth", type=int, default=2, help="Directory depth of the packages in the diagram.")
+    parser.add_argument("--min-edge-weight", type=int, default=1, help="Minimum number of imports per edge.")
+    parser.add_argument("--output", type=Path, help="File to write the diagram code to (default: stdout).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    diagram_code = generate_import_graph_diagram(args.directory, args.format, args.depth, args.min_edge_weight)
+    if args.output:
+        args.output.write_text(diagram_code, encoding='utf-8')
+    else:
+        print(diagram_code)
+
+
+if __name__ == "__main__":
+    main()
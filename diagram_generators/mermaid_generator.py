@@ -3,6 +3,7 @@ from pathlib import Path
 from config import OUTPUT_DIR, DEFAULT_DIAGRAM_MODEL
 from helpers import save_output_to_file
 from llm_interface import generate_response_with_llm, DIAGRAM_SYSTEM_PROMPT
+from llm_cache import template_version
 
 # Updated Mermaid Prompt Template with explicit instructions
 MERMAID_PROMPT_TEMPLATE = """**Objective:**
@@ -58,8 +59,11 @@ def generate_mermaid_prompt(combined_summary: str) -> str:
     prompt = MERMAID_PROMPT_TEMPLATE.format(combined_summary=combined_summary)
     return prompt
 
-def generate_mermaid_code(prompt: str) -> str:
+def generate_mermaid_code(prompt: str, model: str = DEFAULT_DIAGRAM_MODEL) -> str:
     """Generate Mermaid diagram code based on the provided prompt."""
     # Generate the diagram code by sending the prompt to the LLM
-    diagram_code = generate_response_with_llm(prompt, DIAGRAM_SYSTEM_PROMPT, model=DEFAULT_DIAGRAM_MODEL)
+    diagram_code = generate_response_with_llm(
+        prompt, DIAGRAM_SYSTEM_PROMPT, model=model,
+        prompt_version=template_version(MERMAID_PROMPT_TEMPLATE),
+    )
     return diagram_code  # Ensure a valid string is returned
\ No newline at end of file
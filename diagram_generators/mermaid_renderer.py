@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 import json
 import logging
+import threading
 import time
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -13,6 +14,35 @@ from .base_renderer import BaseRenderer
 class MermaidRenderer(BaseRenderer):
     """Renderer for Mermaid diagrams."""
 
+    def __init__(self):
+        self._driver = None
+        self._driver_lock = threading.Lock()
+
+    def start(self):
+        """Install ChromeDriver and launch the headless browser so the first render does not wait for it."""
+        with self._driver_lock:
+            if self._driver is not None:
+                return
+            # Configure Selenium to use headless mode
+            chrome_options = Options()
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--window-size=1920,1080")
+
+            # Automatically install the correct version of ChromeDriver using webdriver-manager
+            driver_service = Service(ChromeDriverManager().install())
+
+            # Initialize the WebDriver
+            self._driver = webdriver.Chrome(service=driver_service, options=chrome_options)
+            logging.info("Headless browser for Mermaid rendering started.")
+
+    def close(self):
+        """Shut down the headless browser."""
+        with self._driver_lock:
+            if self._driver is not None:
+                self._driver.quit()
+                self._driver = None
+
     def generate_png(self, diagram_code: str, output_dir: Path) -> Path:
         """Generate a PNG image from Mermaid code with enhanced error handling and syntax checks."""
         # Prepare the diagram code for embedding in JavaScript
@@ -56,17 +86,9 @@ class MermaidRenderer(BaseRenderer):
         with open(temp_html_file, 'w', encoding='utf-8') as f:
             f.write(html_template)
 
-        # Configure Selenium to use headless mode
-        chrome_options = Options()
-        chrome_options.add_argument("--headless=new")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-
-        # Automatically install the correct version of ChromeDriver using webdriver-manager
-        driver_service = Service(ChromeDriverManager().install())
-
-        # Initialize the WebDriver
-        driver = webdriver.Chrome(service=driver_service, options=chrome_options)
+        # Reuse the browser started in advance, or start it now
+        self.start()
+        driver = self._driver
 
         try:
             # Load the HTML file
@@ -112,8 +134,6 @@ class MermaidRenderer(BaseRenderer):
             raise e  # Re-raise the exception to let the caller handle it
 
         finally:
-            driver.quit()
-
             # Remove the temporary HTML file
             if temp_html_file.exists():
                 temp_html_file.unlink()
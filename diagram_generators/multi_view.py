@@ -0,0 +1,236 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, List, Optional
+from config import (
+    DIAGRAM_VIEW_WORKERS,
+    DIAGRAM_VIEW_MIN_FILES,
+    DIAGRAM_MAX_VIEWS,
+    DIAGRAM_OVERVIEW_FILES_PER_VIEW,
+)
+from helpers import save_output_to_file
+from llm_cache import content_hash
+from . import generate_diagram_prompt
+from .base_renderer import BaseRenderer
+from .import_graph import strip_source_root, ROOT_PACKAGE
+
+VIEWS_DIR_NAME = "views"
+VIEW_MANIFEST_NAME = "views.json"
+DIAGRAM_INDEX_NAME = "diagram_index.md"
+OVERVIEW_VIEW = "(overview)"
+OTHER_VIEW = "(other)"
+# Characters of each file summary quoted in the overview prompt
+OVERVIEW_SUMMARY_CHARS = 200
+
+
+class SerializedRenderer(BaseRenderer):
+    """Let several threads share a renderer that draws one diagram at a time (e.g. one headless browser)."""
+
+    def __init__(self, renderer: BaseRenderer):
+        self._renderer = renderer
+        self._lock = threading.Lock()
+
+    def generate_png(self, diagram_code: str, output_dir: Path) -> Path:
+        with self._lock:
+            return self._renderer.generate_png(diagram_code, output_dir)
+
+
+def partition_summaries(summaries: Dict[str, str], min_files: int = DIAGRAM_VIEW_MIN_FILES,
+                        max_views: int = DIAGRAM_MAX_VIEWS) -> Dict[str, Dict[str, str]]:
+    """
+    Group file summaries by the top-level package they belong to.
+
+    Directories shared by all files (the repository folder, source roots such as
+    src/main/java, a common root package) are skipped, so the first directory that
+    differs names the view. Packages with fewer than `min_files` files, and the smallest
+    packages beyond `max_views`, are combined into one "(other)" view.
+    """
+    if not summaries:
+        return {}
+    directories = {path: PurePosixPath(path).parent.parts for path in summaries}
+    prefix = os.path.commonprefix(list(directories.values()))
+    stripped = {path: strip_source_root(parts[len(prefix):]) for path, parts in directories.items()}
+    shared = os.path.commonprefix(list(stripped.values()))
+
+    packages: Dict[str, Dict[str, str]] = defaultdict(dict)
+    for path in sorted(summaries):
+        parts = stripped[path][len(shared):]
+        packages[parts[0] if parts else ROOT_PACKAGE][path] = summaries[path]
+
+    views = {}
+    other = {}
+    for name, files in sorted(packages.items(), key=lambda item: (-len(item[1]), item[0])):
+        if len(files) >= min_files and len(views) < max_views:
+            views[name] = files
+        else:
+            other.update(files)
+    if other:
+        views[OTHER_VIEW] = dict(sorted(other.items()))
+    return views
+
+
+def first_sentence(summary: str, max_chars: int = OVERVIEW_SUMMARY_CHARS) -> str:
+    """Return the first sentence of a summary on one line, cut to `max_chars`."""
+    text = ' '.join(summary.replace('*', '').replace('#', '').split())
+    end = text.find('. ')
+    if 0 < end < max_chars:
+        return text[:end + 1]
+    return text[:max_chars].rstrip() + ('...' if len(text) > max_chars else '')
+
+
+def build_view_summary(name: str, files: Dict[str, str]) -> str:
+    """Return the summary a package view is drawn from: the full summaries of its files."""
+    entries = "\n".join(f"Filename: {path}\n{summary}\n" for path, summary in files.items())
+    return f"Part of the codebase: {name}\n\n{entries}"
+
+
+def build_overview_summary(views: Dict[str, Dict[str, str]]) -> str:
+    """
+    Return the summary the overview is drawn from: one section per view, describing its
+    most substantial files (by summary length) in one sentence each.
+    """
+    sections = [f"The codebase consists of {len(views)} parts. Draw each part as one component "
+                f"and show how the parts interact."]
+    for name, files in views.items():
+        lines = [f"Part: {name} ({len(files)} files)"]
+        selected = sorted(files, key=lambda path: len(files[path]), reverse=True)[:DIAGRAM_OVERVIEW_FILES_PER_VIEW]
+        lines.extend(f"- {path}: {first_sentence(files[path])}" for path in sorted(selected))
+        if len(files) > len(selected):
+            lines.append(f"- and {len(files) - len(selected)} more files")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+def view_slug(name: str, used_slugs: set) -> str:
+    """Return a unique directory name for a view."""
+    base_slug = re.sub(r'[^a-zA-Z0-9_.\-]', '_', name).strip('_') or 'root'
+    slug = base_slug
+    suffix = 2
+    while slug in used_slugs:
+        slug = f"{base_slug}_{suffix}"
+        suffix += 1
+    used_slugs.add(slug)
+    return slug
+
+
+def load_view_manifest(views_dir: Path) -> Dict[str, Dict]:
+    """Return the views of the previous run by directory name, or an empty dict."""
+    manifest_file = views_dir / VIEW_MANIFEST_NAME
+    if not manifest_file.exists():
+        return {}
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return {entry["slug"]: entry for entry in json.load(f)}
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        logging.warning("Ignoring unreadable view manifest %s: %s", manifest_file, e)
+        return {}
+
+
+def latest_png(view_dir: Path, output_format: str) -> Optional[str]:
+    """Return the name of the newest rendered diagram in a view directory, removing older renderings."""
+    pngs = sorted(view_dir.glob(f"{output_format}_diagram_*.png"), key=lambda png: png.stat().st_mtime)
+    for old_png in pngs[:-1]:
+        old_png.unlink()
+    return pngs[-1].name if pngs else None
+
+
+def generate_views(
+    summaries: Dict[str, str],
+    renderer: Optional[BaseRenderer],
+    output_dir: Path,
+    generate_view: Callable[[str, Optional[BaseRenderer], Path], bool],
+    output_format: str,
+    model: str,
+    workers: int = DIAGRAM_VIEW_WORKERS,
+    min_files: int = DIAGRAM_VIEW_MIN_FILES,
+    max_views: int = DIAGRAM_MAX_VIEWS,
+    coverage: Optional[str] = None,
+) -> Optional[bool]:
+    """
+    Draw an overview and one diagram per top-level package, `workers` views at a time.
+
+    `generate_view(view_summary, renderer, view_dir)` draws one view into its own
+    directory below output_dir/views and returns whether it rendered (e.g.
+    main.generate_llm_diagram). LLM requests of different views run concurrently;
+    rendering is serialized. A view whose prompt, model and `coverage` title (the note
+    generate_view puts above a partial run's diagrams) are unchanged since the last run
+    keeps its rendered diagram, so a code change only redraws the affected views and
+    the overview. Writes diagram_index.md linking all views. Returns whether all views
+    rendered, or None when the codebase has fewer than two parts to draw.
+    """
+    views = partition_summaries(summaries, min_files, max_views)
+    if len(views) < 2:
+        logging.info("The codebase has fewer than two packages to draw; drawing a single diagram.")
+        return None
+
+    view_summaries = {OVERVIEW_VIEW: build_overview_summary(views)}
+    view_summaries.update((name, build_view_summary(name, files)) for name, files in views.items())
+    file_counts = {OVERVIEW_VIEW: len(summaries), **{name: len(files) for name, files in views.items()}}
+    used_slugs = set()
+    slugs = {name: view_slug(name, used_slugs) for name in view_summaries}
+
+    views_dir = output_dir / VIEWS_DIR_NAME
+    previous_views = load_view_manifest(views_dir)
+    shared_renderer = SerializedRenderer(renderer) if renderer is not None else None
+
+    def draw(name: str) -> Dict:
+        slug = slugs[name]
+        view_dir = views_dir / slug
+        summary = view_summaries[name]
+        key = content_hash(f"{model}\n{coverage or ''}\n{generate_diagram_prompt(summary, output_format)}")
+        entry = {"name": name, "slug": slug, "files": file_counts[name], "key": key, "ok": False, "png": None}
+
+        previous = previous_views.get(slug, {})
+        if (shared_renderer is not None and previous.get("key") == key and previous.get("ok")
+                and previous.get("png") and (view_dir / previous["png"]).exists()):
+            logging.info("View %s is unchanged; keeping %s", name, previous['png'])
+            return {**entry, "ok": True, "png": previous["png"]}
+
+        logging.info("Generating view %s (%s files)...", name, file_counts[name])
+        try:
+            entry["ok"] = bool(generate_view(summary, shared_renderer, view_dir))
+        except Exception as e:
+            logging.error("Failed to generate view %s: %s", name, e)
+        if entry["ok"]:
+            entry["png"] = latest_png(view_dir, output_format)
+        return entry
+
+    names = list(view_summaries)
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="diagram-view") as executor:
+        entries = list(executor.map(draw, names))
+
+    if shared_renderer is not None:
+        save_output_to_file(json.dumps(entries, indent=2), views_dir / VIEW_MANIFEST_NAME)
+    index_file = write_diagram_index(entries, output_dir, output_format)
+    logging.info("Diagram index with %s views saved to %s", len(entries), index_file)
+    return all(entry["ok"] for entry in entries)
+
+
+def write_diagram_index(entries: List[Dict], output_dir: Path, output_format: str) -> Path:
+    """Write a Markdown page showing every view with links to its prompt and diagram code."""
+    lines = ["# Architecture Views", ""]
+    lines.extend(
+        f"- [{'Overview' if entry['name'] == OVERVIEW_VIEW else entry['name']}](#{entry['slug'].lower()}) "
+        f"({entry['files']} files)"
+        for entry in entries
+    )
+    for entry in entries:
+        view_path = f"{VIEWS_DIR_NAME}/{entry['slug']}"
+        title = 'Overview' if entry['name'] == OVERVIEW_VIEW else entry['name']
+        lines.extend(["", f'<a id="{entry["slug"].lower()}"></a>', f"## {title}", ""])
+        if entry["png"]:
+            lines.append(f"![{title}]({view_path}/{entry['png']})")
+        else:
+            lines.append("Not rendered; the prompt can be used with another LLM.")
+        links = [f"[Prompt]({view_path}/{output_format}_prompt.txt)"]
+        if (output_dir / VIEWS_DIR_NAME / entry['slug'] / f"{output_format}_diagram.txt").exists():
+            links.append(f"[Diagram code]({view_path}/{output_format}_diagram.txt)")
+        lines.extend(["", " | ".join(links)])
+    index_file = output_dir / DIAGRAM_INDEX_NAME
+    save_output_to_file("\n".join(lines) + "\n", index_file)
+    return index_file
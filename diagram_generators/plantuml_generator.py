@@ -2,6 +2,7 @@ import logging
 from pathlib import Path
 from config import OUTPUT_DIR, DEFAULT_DIAGRAM_MODEL
 from llm_interface import generate_response_with_llm, DIAGRAM_SYSTEM_PROMPT
+from llm_cache import template_version
 
 # Updated PlantUML Prompt Template with explicit instructions
 PLANTUML_PROMPT_TEMPLATE = """**Objective:**
@@ -39,8 +40,11 @@ def generate_plantuml_prompt(combined_summary: str) -> str:
     prompt = PLANTUML_PROMPT_TEMPLATE.format(combined_summary=combined_summary)
     return prompt
 
-def generate_plantuml_code(prompt: str) -> str:
+def generate_plantuml_code(prompt: str, model: str = DEFAULT_DIAGRAM_MODEL) -> str:
     """Generate PlantUML diagram code based on the provided prompt."""
     # Generate the diagram code by sending the prompt to the LLM
-    diagram_code = generate_response_with_llm(prompt, DIAGRAM_SYSTEM_PROMPT, model=DEFAULT_DIAGRAM_MODEL)
+    diagram_code = generate_response_with_llm(
+        prompt, DIAGRAM_SYSTEM_PROMPT, model=model,
+        prompt_version=template_version(PLANTUML_PROMPT_TEMPLATE),
+    )
     return diagram_code  # Ensure a valid string is returned
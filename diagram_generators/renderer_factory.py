@@ -1,5 +1,6 @@
 import importlib
 import logging
+import threading
 
 def get_renderer(diagram_type: str):
     """
@@ -33,4 +34,17 @@ def get_renderer(diagram_type: str):
 
     except AttributeError:
         logging.error(f"Renderer class {class_name} not found in module: {module_name}")
-        raise ValueError(f"Renderer class {class_name} not found for diagram type: {diagram_type}")
\ No newline at end of file
+        raise ValueError(f"Renderer class {class_name} not found for diagram type: {diagram_type}")
+
+def start_renderer_in_background(renderer) -> threading.Thread:
+    """Start the renderer's expensive resources from a daemon thread while other work continues."""
+    def start():
+        try:
+            renderer.start()
+        except Exception as e:
+            # The renderer retries on first use; the error will surface there if it persists
+            logging.warning("Background start of renderer %s failed: %s", type(renderer).__name__, e)
+
+    thread = threading.Thread(target=start, name="renderer-start", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,256 @@
+import argparse
+import logging
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional
+from config import (
+    DEFAULT_SUMMARIZATION_MODEL,
+    OUTPUT_DIR,
+    READER_WORKERS,
+    LLM_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    READER_ISOLATION,
+    RUN_METRICS_FILE,
+    RUN_METRICS_HISTORY_FILE,
+)
+from helpers import is_irrelevant_file, read_combined_summary, run_git, save_output_to_file
+from file_readers import read_bytes
+from llm_interface import summarize_file_content
+from llm_cache import content_hash
+from pipeline import RunMetrics, run_pipeline
+from reader_pool import ReaderPool
+from summary_store import SummaryStore, METADATA_FIELDS
+
+# Git status letters reported by `git diff --name-status`
+STATUS_NAMES = {
+    'A': "Added",
+    'M': "Modified",
+    'D': "Deleted",
+    'R': "Renamed",
+    'C': "Copied",
+    'T': "Type changed",
+}
+
+
+@dataclass
+class FileChange:
+    """One entry of `git diff --name-status`."""
+    status: str
+    path: str
+    old_path: Optional[str] = None
+    similarity: Optional[int] = None
+
+
+def get_changed_files(repo_directory: Path, base: str, head: str) -> List[FileChange]:
+    """List the files changed between two revisions, detecting renames and copies."""
+    output = run_git(repo_directory, 'diff', '--name-status', '-z', '-M', '-C', base, head)
+    fields = output.decode('utf-8', 'surrogateescape').split('\0')
+    changes = []
+    position = 0
+    while position < len(fields) and fields[position]:
+        status = fields[position]
+        letter = status[0]
+        if letter in ('R', 'C'):
+            changes.append(FileChange(letter, fields[position + 2], fields[position + 1], int(status[1:] or 0)))
+            position += 3
+        else:
+            changes.append(FileChange(letter, fields[position + 1]))
+            position += 2
+    return changes
+
+
+def blob_sizes(repo_directory: Path, revision: str) -> Dict[str, int]:
+    """Return the size of every file at a revision, keyed by its path in the repository."""
+    output = run_git(repo_directory, 'ls-tree', '--full-tree', '-r', '-l', '-z', revision)
+    sizes = {}
+    for entry in output.decode('utf-8', 'surrogateescape').split('\0'):
+        if not entry:
+            continue
+        info, path = entry.split('\t', 1)
+        size = info.split()[3]
+        if size != '-':
+            sizes[path] = int(size)
+    return sizes
+
+
+def read_blob(repo_directory: Path, revision: str, path: str) -> bytes:
+    """Read a file's content at a revision straight from the object database, without a checkout."""
+    return run_git(repo_directory, 'cat-file', 'blob', f"{revision}:{path}")
+
+
+def summary_key(repo_directory: Path, path: str) -> Path:
+    """Return the path a file is listed under in the combined summary of a full run."""
+    return repo_directory / PurePosixPath(path)
+
+
+def summarize_diff(
+    repo_directory: Path,
+    base: str,
+    head: str,
+    summarization_model: str = DEFAULT_SUMMARIZATION_MODEL,
+    base_summary_file: Optional[Path] = None,
+    output_dir: Path = OUTPUT_DIR,
+) -> Dict[str, List[FileChange]]:
+    """
+    Summarize only the files changed between `base` and `head` and update the combined summary.
+
+    Added, modified and copied files (and renamed files whose content changed) are read
+    from git at `head`, summarized and added to the summary store. Summaries of
+    unchanged files are taken from `base_summary_file` when given, otherwise from the
+    latest summaries of the repository in the summary store. Deleted files are dropped
+    from the combined summary and from the summary store, and renamed files move to
+    their new path in the store. Writes change_summary.md, an updated
+    combined_summary.txt and the run metrics to `output_dir` and returns the changes
+    grouped by status.
+    """
+    store = SummaryStore()
+    if base_summary_file is not None:
+        summaries = read_combined_summary(base_summary_file)
+    else:
+        summaries = {
+            str(summary_key(repo_directory, record["source_path"])): record["summary"]
+            for record in store.iter_latest(str(repo_directory))
+        }
+    if not summaries:
+        logging.warning("No previous summaries of %s; the combined summary will only contain the changed files.",
+                        repo_directory)
+
+    changes = get_changed_files(repo_directory, base, head)
+    metrics = RunMetrics()
+    metrics.increment("files_total", len(changes))
+    logging.info("%s files changed between %s and %s", len(changes), base, head)
+
+    repository = str(repo_directory)
+    # The ignore rules look at the files as they are at `head`, not in the working tree
+    sizes = blob_sizes(repo_directory, head)
+    removed_paths = []
+    to_summarize = []
+    for change in changes:
+        key = str(summary_key(repo_directory, change.path))
+        if change.status == 'D':
+            summaries.pop(key, None)
+            removed_paths.append(change.path)
+            continue
+        if change.old_path is not None and change.status == 'R':
+            old_summary = summaries.pop(str(summary_key(repo_directory, change.old_path)), None)
+            removed_paths.append(change.old_path)
+            if change.similarity == 100 and old_summary:
+                # Pure rename: the content and therefore the summary are unchanged
+                summaries[key] = old_summary
+                record = store.get(repository, change.old_path)
+                if record is not None:
+                    store.put(repository, change.path, record["content_hash"], record["summary"],
+                              **{field: record[field] for field in METADATA_FIELDS})
+                continue
+        if is_irrelevant_file(repo_directory / change.path, file_size=sizes.get(change.path, 0)):
+            logging.info("Skipping irrelevant file: %s", change.path)
+            metrics.increment("files_skipped")
+            continue
+        to_summarize.append(change)
+
+    if removed_paths:
+        store.delete(repository, removed_paths)
+    # Documents are extracted in reader processes, as in a full run
+    reader_pool = ReaderPool() if READER_ISOLATION else None
+
+    def read_change(change: FileChange) -> str:
+        data = read_blob(repo_directory, head, change.path)
+        return reader_pool.read_bytes(data, change.path) if reader_pool else read_bytes(data, change.path)
+
+    def process_change(change: FileChange, file_content: str) -> str:
+        response_info = {"source_chars": len(file_content)}
+        summary = summarize_file_content(
+            change.path, file_content, summarization_model, metrics=metrics, response_info=response_info
+        )
+        if summary:
+            store.put(repository, change.path, content_hash(file_content), summary,
+                      **{"model": summarization_model, **response_info})
+        return summary
+
+    changed_summaries: Dict[str, str] = {}
+
+    def handle_summary(change: FileChange, summary: Optional[str], error: Optional[Exception]):
+        if error is not None:
+            logging.error("Error generating summary for file %s: %s", change.path, error)
+            metrics.increment("files_failed")
+        elif summary:
+            summaries[str(summary_key(repo_directory, change.path))] = summary
+            changed_summaries[change.path] = summary
+            metrics.increment("files_summarized")
+        else:
+            logging.warning("No summary generated for %s", change.path)
+            metrics.increment("files_empty")
+
+    try:
+        run_pipeline(
+            to_summarize,
+            read_change,
+            process_change,
+            handle_summary,
+            reader_workers=READER_WORKERS,
+            llm_workers=LLM_WORKERS,
+            queue_size=PIPELINE_QUEUE_SIZE,
+            metrics=metrics,
+        )
+    finally:
+        if reader_pool:
+            reader_pool.close()
+        store.close()
+
+    combined_summary = "\n".join(f"Filename: {path}\n{summary}\n" for path, summary in summaries.items())
+    save_output_to_file(combined_summary, output_dir / "combined_summary.txt")
+    save_output_to_file(format_change_summary(base, head, changes, changed_summaries),
+                        output_dir / "change_summary.md")
+    logging.info("Change summary and updated combined summary saved to %s", output_dir)
+    metrics.save(output_dir / RUN_METRICS_FILE.name, RUN_METRICS_HISTORY_FILE)
+
+    grouped: Dict[str, List[FileChange]] = {}
+    for change in changes:
+        grouped.setdefault(STATUS_NAMES.get(change.status, change.status), []).append(change)
+    return grouped
+
+
+def format_change_summary(base: str, head: str, changes: List[FileChange], changed_summaries: Dict[str, str]) -> str:
+    """Render the changed files and their new summaries as Markdown."""
+    lines = [f"# Changes between {base} and {head}", ""]
+    counts: Dict[str, int] = {}
+    for change in changes:
+        counts[change.status] = counts.get(change.status, 0) + 1
+    lines.append(", ".join(f"{STATUS_NAMES.get(status, status)}: {count}" for status, count in sorted(counts.items())))
+    lines.append("")
+    for change in changes:
+        status = STATUS_NAMES.get(change.status, change.status)
+        if change.old_path is not None:
+            lines.append(f"## {status}: {change.old_path} -> {change.path}")
+        else:
+            lines.append(f"## {status}: {change.path}")
+        summary = changed_summaries.get(change.path)
+        if summary:
+            lines.extend(["", summary])
+        elif change.status == 'R' and change.similarity == 100:
+            lines.extend(["", "Content unchanged."])
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    """Command line entry point for summarizing the changes between two git revisions."""
+    parser = argparse.ArgumentParser(description="Summarize only the files changed between two git revisions.")
+    parser.add_argument("base", help="Base revision, e.g. the target branch of a merge request.")
+    parser.add_argument("head", nargs='?', default="HEAD", help="Revision with the changes (default: HEAD).")
+    parser.add_argument("--repo", type=Path, default=Path("repo"), help="Git repository to analyze.")
+    parser.add_argument("--base-summary", type=Path,
+                        help="Combined summary of the base revision (default: the latest stored summaries).")
+    parser.add_argument("--model", default=DEFAULT_SUMMARIZATION_MODEL, help="Summarization model.")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR,
+                        help="Directory for change_summary.md, combined_summary.txt and the run metrics.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    grouped = summarize_diff(args.repo, args.base, args.head, args.model, args.base_summary, args.output_dir)
+    for status, changes in grouped.items():
+        print(f"{status}: {len(changes)}")
+
+
+if __name__ == "__main__":
+    main()
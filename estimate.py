@@ -0,0 +1,294 @@
+import argparse
+import json
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional
+from config import (
+    DEFAULT_SUMMARIZATION_MODEL,
+    OUTPUT_DIR,
+    READER_WORKERS,
+    READER_ISOLATION,
+    LLM_WORKERS,
+    RUN_METRICS_HISTORY_FILE,
+    SMALL_FILE_BATCHING,
+)
+from helpers import estimate_tokens, save_output_to_file
+from file_readers import get_reader, is_text_reader, read_bytes
+from file_batching import FileBatch, FILE_HEADER
+from archive_source import ArchiveMember
+from model_manager import get_model_profile, warm_up_model
+from llm_client import LLMRequestError
+from reader_pool import ReaderPool
+from llm_interface import (
+    SYSTEM_PROMPT,
+    BATCH_SYSTEM_PROMPT,
+    FILE_SUMMARY_PROMPT_TEMPLATE,
+    build_batch_prompt,
+    build_summary_prompt,
+    cached_file_summary,
+    collect_files,
+    plan_pipeline_items,
+    read_source_file,
+    request_llm,
+    route_model,
+)
+
+ESTIMATE_REPORT_NAME = "estimate.json"
+# Runs of the history used for the throughput, most recent first
+HISTORY_RUNS = 10
+
+
+def load_throughput(history_file: Path, model: str, runs: int = HISTORY_RUNS) -> Optional[Dict]:
+    """
+    Return the LLM throughput measured in the last `runs` runs of a model, from the run
+    metrics history, or None if no run of the model generated anything.
+
+    The throughput is given as seconds per token (prompt and completion tokens together)
+    and completion tokens per file, which assumes a mix of prompt and completion tokens
+    similar to the past runs.
+    """
+    if not history_file.exists():
+        return None
+    entries = []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("model") == model and entry.get("files_generated") and entry.get("generation_seconds"):
+                entries.append(entry)
+    entries = entries[-runs:]
+    tokens = sum(entry.get("prompt_tokens", 0) + entry.get("completion_tokens", 0) for entry in entries)
+    if not tokens:
+        return None
+    files = sum(entry["files_generated"] for entry in entries)
+    return {
+        "source": f"{len(entries)} past runs in {history_file}",
+        "seconds_per_token": sum(entry["generation_seconds"] for entry in entries) / tokens,
+        "completion_tokens_per_file": sum(entry.get("completion_tokens", 0) for entry in entries) / files,
+    }
+
+
+def calibrate(model: str, relative_path: str, file_content: str) -> Optional[Dict]:
+    """
+    Measure the throughput with one summary request for a sample file. The model is
+    loaded first, so the time it takes to load is not counted. The summary is discarded.
+    """
+    warm_up_model(model)
+    user_prompt = build_summary_prompt(relative_path, file_content)[0]
+    info = {}
+    logging.info("Calibrating with a summary of %s...", relative_path)
+    request_llm(user_prompt, SYSTEM_PROMPT, model, info)
+    tokens = (info.get("prompt_tokens") or 0) + (info.get("completion_tokens") or 0)
+    if not tokens or not info.get("llm_seconds"):
+        logging.warning("The calibration request returned no token counts.")
+        return None
+    return {
+        "source": f"calibration request for {relative_path}",
+        "seconds_per_token": info["llm_seconds"] / tokens,
+        "completion_tokens_per_file": info.get("completion_tokens") or 0,
+    }
+
+
+def directory_key(relative_path: PurePosixPath, depth: int) -> str:
+    """Return the directory a file is counted under: its first `depth` directories."""
+    parts = relative_path.parent.parts[:depth]
+    return "/".join(parts) if parts else "."
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration as e.g. 2h 05m, 12m 30s or 45s."""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def estimate_repository(
+    directory: Path,
+    model: str = DEFAULT_SUMMARIZATION_MODEL,
+    depth: int = 2,
+    read_documents: bool = False,
+    calibration: str = 'auto',
+) -> Dict:
+    """
+    Estimate the tokens and time a summarization run of a repository would take,
+    without summarizing anything.
+
+    Files are selected and their readers chosen as in llm_interface.summarize_codebase.
+    Text files are read to build their prompts and to look up their summaries in the
+    LLM cache; documents (PDF, Office, images) are only extracted with `read_documents`,
+    otherwise their tokens are estimated from their size and they count as uncached.
+    The time is projected from the throughput of past runs of the model or, with
+    `calibration` 'auto' and no history or with 'always', from one calibration request;
+    'never' reports tokens only. Returns a report with totals and a breakdown by
+    directory, `depth` directories deep.
+    """
+    relevant_files, skipped_files = collect_files(directory)
+    num_ctx = get_model_profile(model).get('num_ctx')
+    # Tokens every single-file request spends on the instructions
+    overhead_tokens = estimate_tokens(SYSTEM_PROMPT + FILE_SUMMARY_PROMPT_TEMPLATE)
+    reader_pool = ReaderPool() if read_documents and READER_ISOLATION else None
+
+    def read(file_path) -> str:
+        if isinstance(file_path, ArchiveMember):
+            data = file_path.read_bytes()
+            return reader_pool.read_bytes(data, file_path.name) if reader_pool else read_bytes(data, file_path.name)
+        return reader_pool.read(file_path) if reader_pool else read_source_file(file_path)
+
+    def inspect(file_path) -> Dict:
+        relative_path = file_path.relative_to(directory)
+        reader = get_reader(file_path.suffix)
+        # Only token counts are kept, so memory does not grow with the repository
+        entry = {"path": relative_path, "reader": reader.__module__.split('.')[-1], "cached": False,
+                 "tokens": 0, "content_tokens": None, "size_estimated": False}
+        if not is_text_reader(reader) and not read_documents:
+            size = file_path.size if isinstance(file_path, ArchiveMember) else file_path.stat().st_size
+            # About four bytes per token, as in helpers.estimate_tokens; a request cannot exceed the context
+            tokens = overhead_tokens + (size + 3) // 4
+            entry.update(tokens=min(tokens, num_ctx) if num_ctx else tokens, size_estimated=True)
+            return entry
+        try:
+            content = read(file_path)
+        except Exception as e:
+            logging.warning("Could not read %s: %s", file_path, e)
+            entry["unreadable"] = True
+            return entry
+        user_prompt = build_summary_prompt(relative_path.as_posix(), content)[0]
+        file_model = route_model(relative_path.as_posix(), content, model)
+        entry.update(
+            tokens=estimate_tokens(SYSTEM_PROMPT + user_prompt), content_tokens=estimate_tokens(content),
+            cached=cached_file_summary(relative_path.as_posix(), content, file_model) is not None,
+        )
+        return entry
+
+    logging.info("Inspecting %s files...", len(relevant_files))
+    try:
+        with ThreadPoolExecutor(max_workers=max(READER_WORKERS, 1)) as executor:
+            entries = dict(zip(relevant_files, executor.map(inspect, relevant_files)))
+
+        throughput = None if calibration == 'always' else load_throughput(RUN_METRICS_HISTORY_FILE, model)
+        samples = sorted((file_path for file_path, entry in entries.items()
+                          if entry["content_tokens"] is not None and not entry["cached"]),
+                         key=lambda file_path: entries[file_path]["tokens"])
+        if throughput is None and calibration != 'never' and samples:
+            # A file of median size stands for the repository
+            sample = samples[len(samples) // 2]
+            try:
+                throughput = calibrate(model, entries[sample]["path"].as_posix(), read(sample))
+            except LLMRequestError as e:
+                logging.warning("Calibration request failed: %s", e)
+    finally:
+        if reader_pool:
+            reader_pool.close()
+
+    # Batched files share the instructions of their request
+    requests = sum(1 for entry in entries.values() if not entry["cached"] and not entry.get("unreadable"))
+    if SMALL_FILE_BATCHING:
+        batch_overhead = estimate_tokens(BATCH_SYSTEM_PROMPT + build_batch_prompt([]))
+        for item in plan_pipeline_items(relevant_files, directory):
+            if not isinstance(item, FileBatch):
+                continue
+            pending = [entries[f] for f in item.files
+                       if not entries[f]["cached"] and entries[f]["content_tokens"] is not None]
+            if len(pending) < 2:
+                continue
+            requests -= len(pending) - 1
+            for entry in pending:
+                header = FILE_HEADER.format(number=1, path=entry["path"].as_posix())
+                entry["tokens"] = estimate_tokens(header) + entry["content_tokens"] + batch_overhead // len(pending)
+
+    completion_per_file = throughput["completion_tokens_per_file"] if throughput else 0
+    rows = defaultdict(lambda: {"files": 0, "skipped": 0, "cached": 0, "unreadable": 0, "size_estimated": 0,
+                                "prompt_tokens": 0, "completion_tokens": 0})
+    for file_path in skipped_files:
+        rows[directory_key(PurePosixPath(file_path.relative_to(directory).as_posix()), depth)]["skipped"] += 1
+    for entry in entries.values():
+        row = rows[directory_key(PurePosixPath(entry["path"]), depth)]
+        row["files"] += 1
+        for flag in ("cached", "unreadable", "size_estimated"):
+            row[flag] += bool(entry.get(flag))
+        if not entry["cached"] and not entry.get("unreadable"):
+            row["prompt_tokens"] += entry["tokens"]
+            row["completion_tokens"] += round(completion_per_file)
+
+    for row in rows.values():
+        row["llm_seconds"] = round((row["prompt_tokens"] + row["completion_tokens"]) *
+                                   throughput["seconds_per_token"], 1) if throughput else None
+    llm_seconds = sum(row["llm_seconds"] for row in rows.values()) if throughput else None
+    return {
+        "repository": str(directory),
+        "model": model,
+        "files": len(entries),
+        "skipped": len(skipped_files),
+        "cached": sum(row["cached"] for row in rows.values()),
+        "requests": requests,
+        "prompt_tokens": sum(row["prompt_tokens"] for row in rows.values()),
+        "completion_tokens": sum(row["completion_tokens"] for row in rows.values()),
+        "throughput": throughput,
+        "llm_workers": LLM_WORKERS,
+        "llm_seconds": llm_seconds,
+        # Assumes the LLM_WORKERS requests in flight are served in parallel at the measured speed
+        "wall_seconds": round(llm_seconds / max(LLM_WORKERS, 1), 1) if throughput else None,
+        "readers": dict(Counter(entry["reader"] for entry in entries.values()).most_common()),
+        "directories": [{"directory": name, **row} for name, row in
+                        sorted(rows.items(), key=lambda item: (-item[1]["prompt_tokens"], item[0]))],
+    }
+
+
+def format_report(report: Dict) -> str:
+    """Return the estimate as a table by directory followed by the totals."""
+    header = f"{'Directory':<48} {'Files':>7} {'Skipped':>8} {'Cached':>7} {'Tokens':>11} {'Est. time':>10}"
+    lines = [header, "-" * len(header)]
+    for row in report["directories"]:
+        time_text = format_duration(row["llm_seconds"]) if row["llm_seconds"] is not None else "-"
+        lines.append(f"{row['directory'][-48:]:<48} {row['files']:>7} {row['skipped']:>8} {row['cached']:>7} "
+                     f"{row['prompt_tokens'] + row['completion_tokens']:>11,} {time_text:>10}")
+    lines.append("")
+    lines.append(f"Files to summarize: {report['files']} ({report['cached']} cached, {report['skipped']} skipped), "
+                 f"{report['requests']} LLM requests")
+    lines.append(f"Estimated tokens: {report['prompt_tokens']:,} prompt, {report['completion_tokens']:,} completion")
+    lines.append("Readers: " + ", ".join(f"{name} {count}" for name, count in report["readers"].items()))
+    size_estimated = sum(row["size_estimated"] for row in report["directories"])
+    if size_estimated:
+        lines.append(f"{size_estimated} documents were estimated from their size and counted as uncached "
+                     f"(use --read-documents to extract them)")
+    if report["throughput"]:
+        lines.append(f"Estimated time: {format_duration(report['wall_seconds'])} with {report['llm_workers']} "
+                     f"LLM workers, from {report['throughput']['source']}")
+    else:
+        lines.append("Estimated time: unknown, no throughput measured (run without --no-calibrate)")
+    return "\n".join(lines)
+
+
+def main():
+    """Command line entry point for estimating a summarization run."""
+    parser = argparse.ArgumentParser(
+        description="Estimate the tokens and time of summarizing a repository without summarizing it."
+    )
+    parser.add_argument("repo", type=Path, nargs='?', default=Path("repo"), help="Repository to estimate.")
+    parser.add_argument("--model", default=DEFAULT_SUMMARIZATION_MODEL, help="Summarization model.")
+    parser.add_argument("--depth", type=int, default=2, help="Directory levels of the breakdown.")
+    parser.add_argument("--read-documents", action="store_true",
+                        help="Extract PDF, Office and image files instead of estimating them from their size.")
+    calibration = parser.add_mutually_exclusive_group()
+    calibration.add_argument("--calibrate", action="store_const", const='always', dest="calibration",
+                             help="Measure the throughput with one request even if past runs are available.")
+    calibration.add_argument("--no-calibrate", action="store_const", const='never', dest="calibration",
+                             help="Never send a request; without past runs only tokens are estimated.")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR, help=f"Where to write {ESTIMATE_REPORT_NAME}.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    report = estimate_repository(args.repo, args.model, args.depth, args.read_documents, args.calibration or 'auto')
+    save_output_to_file(json.dumps(report, indent=2), args.output_dir / ESTIMATE_REPORT_NAME)
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from config import BATCH_MAX_FILE_TOKENS, BATCH_TOKEN_BUDGET, BATCH_MAX_FILES
+
+# Header that introduces a file in a batch prompt and its summary in the response
+FILE_HEADER = "=== FILE {number}: {path} ==="
+SUMMARY_HEADER = "=== FILE {number} ==="
+# Accepts the summary headers with Markdown decoration around them and with the path repeated after the number
+SUMMARY_HEADER_PATTERN = re.compile(r'^[#*>\s]*=+\s*FILE\s+(\d+)\b[^\n]*$', re.MULTILINE)
+
+
+class FileBatch:
+    """Small files summarized together in one LLM request; a pipeline item like a single file."""
+
+    def __init__(self, files: Optional[List] = None, tokens: int = 0):
+        self.files = list(files or [])
+        # Estimated tokens of the files' content
+        self.tokens = tokens
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __str__(self) -> str:
+        return f"batch of {len(self.files)} files starting with {self.files[0]}"
+
+
+def plan_batches(
+    files: Sequence,
+    estimate_tokens: Callable[[object], Optional[int]],
+    group_key: Callable[[object], object],
+    max_file_tokens: int = BATCH_MAX_FILE_TOKENS,
+    token_budget: int = BATCH_TOKEN_BUDGET,
+    max_files: int = BATCH_MAX_FILES,
+) -> List:
+    """
+    Return the pipeline items for a list of files: the files themselves, with small ones
+    packed into FileBatch objects.
+
+    A file is small when `estimate_tokens(file)` is not None and at most `max_file_tokens`.
+    Small files with the same `group_key` (e.g. their directory) share batches of up to
+    `max_files` files and `token_budget` estimated tokens. A batch takes the place of
+    its first file in the list; a batch that ends up with a single file is replaced by it.
+    """
+    items = []
+    open_batches: Dict[object, FileBatch] = {}
+    for file in files:
+        tokens = estimate_tokens(file)
+        if tokens is None or tokens > max_file_tokens:
+            items.append(file)
+            continue
+        key = group_key(file)
+        batch = open_batches.get(key)
+        if batch is None or len(batch) >= max_files or batch.tokens + tokens > token_budget:
+            batch = open_batches[key] = FileBatch()
+            items.append(batch)
+        batch.files.append(file)
+        batch.tokens += tokens
+    return [item.files[0] if isinstance(item, FileBatch) and len(item) == 1 else item for item in items]
+
+
+def format_batch_files(entries: Sequence[Tuple[str, str]]) -> str:
+    """Return the numbered (path, content) entries as they are embedded in a batch prompt."""
+    return "\n\n".join(
+        f"{FILE_HEADER.format(number=number, path=path)}\n{content}"
+        for number, (path, content) in enumerate(entries, start=1)
+    )
+
+
+def parse_batch_response(response: str, count: int) -> Dict[int, str]:
+    """
+    Split a batch response into summaries by file number (1-based).
+
+    Files without a section, with an empty section or with a number outside the batch
+    are left out; a number given twice makes its file count as missing, since the
+    sections cannot be told apart.
+    """
+    matches = list(SUMMARY_HEADER_PATTERN.finditer(response))
+    summaries: Dict[int, str] = {}
+    duplicates = set()
+    for position, match in enumerate(matches):
+        number = int(match.group(1))
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(response)
+        summary = response[match.end():end].strip()
+        if not 1 <= number <= count or not summary:
+            continue
+        if number in summaries:
+            duplicates.add(number)
+        summaries[number] = summary
+    for number in duplicates:
+        del summaries[number]
+    return summaries
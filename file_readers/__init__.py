@@ -2,13 +2,14 @@ import os
 import glob
 import importlib
 import logging
+import tempfile
 
 # Initialize a registry of readers
 readers = {}
 
 def default_reader(file_path):
     """Default text file reader if no specific reader is found for the file extension."""
-    logging.debug(f"No specific reader for file extension, using default text reader for {file_path}")
+    logging.debug("No specific reader for file extension, using default text reader for %s", file_path)
     from .text_reader import read_file as read_text_file
     return read_text_file(file_path)
 
@@ -18,8 +19,8 @@ module_files = glob.glob(os.path.join(module_dir, '*.py'))
 
 for module_file in module_files:
     module_name = os.path.basename(module_file)[:-3]  # Strip the .py extension
-    if module_name == '__init__':
-        continue  # Skip the __init__.py file
+    if module_name.startswith('_'):
+        continue  # Skip __init__.py and helper modules shared by the readers
 
     try:
         # Dynamically import the module
@@ -39,9 +40,34 @@ for module_file in module_files:
 def get_reader(file_extension):
     """Return the appropriate reader based on the file extension, or default to text reader."""
     reader = readers.get(file_extension.lower(), default_reader)
-    reader_name = reader.__module__.split('.')[-1]
-    if reader == default_reader:
-        logging.info(f"No specific reader found for extension '{file_extension}'. Using default reader '{reader_name}'.")
-    else:
-        logging.info(f"Found specific reader '{reader_name}' for extension '{file_extension}'.")
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        reader_name = reader.__module__.split('.')[-1]
+        if reader == default_reader:
+            logging.debug("No specific reader found for extension '%s'. Using default reader '%s'.",
+                          file_extension, reader_name)
+        else:
+            logging.debug("Found specific reader '%s' for extension '%s'.", reader_name, file_extension)
     return reader
+
+def is_text_reader(reader):
+    """Return True for the plain text reader, which decodes files without parsing them."""
+    from .text_reader import read_file as read_text_file
+    return reader is read_text_file or reader is default_reader
+
+def read_bytes(data, file_name):
+    """
+    Extract the text of a file given as raw bytes, e.g. a blob read from git.
+
+    Text files are decoded in memory; other formats are written to a temporary file
+    with the same extension and passed to their reader.
+    """
+    from .text_reader import decode_bytes
+    file_extension = os.path.splitext(file_name)[1]
+    reader = get_reader(file_extension)
+    if is_text_reader(reader):
+        return decode_bytes(data)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = os.path.join(temp_dir, f"blob{file_extension}")
+        with open(temp_path, 'wb') as temp_file:
+            temp_file.write(data)
+        return reader(temp_path)
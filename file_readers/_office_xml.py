@@ -0,0 +1,132 @@
+import posixpath
+import re
+import zipfile
+from typing import Callable, Iterator, List, Set
+from xml.etree.ElementTree import Element, ParseError, fromstring, iterparse
+
+# Word processing, drawing and package namespaces of Office Open XML (.docx, .pptx)
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+P_NS = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+R_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+MC_NS = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+# Text namespace of OpenDocument (.odt, .odp)
+TEXT_NS = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+
+# Errors raised for files that are not valid documents; readers fall back to their library on these
+DOCUMENT_ERRORS = (zipfile.BadZipFile, KeyError, ParseError)
+
+SLIDE_PART_PATTERN = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+
+
+def iter_paragraphs(xml_file, paragraph_tags: Set[str], paragraph_text: Callable[[Element], str],
+                    skip_tags: Set[str] = frozenset()) -> Iterator[str]:
+    """
+    Stream an XML document and yield the text of each paragraph as soon as it ends.
+
+    Parsed elements are discarded after every paragraph, so memory stays bounded by
+    the largest paragraph rather than the document. A paragraph nested in another one
+    (e.g. in a text box or a footnote) is yielded on its own and left out of the outer
+    paragraph. Paragraphs inside `skip_tags` elements are not yielded.
+    """
+    open_elements: List[Element] = []
+    open_paragraphs = 0
+    skipping = 0
+    for event, elem in iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            open_elements.append(elem)
+            open_paragraphs += elem.tag in paragraph_tags
+            skipping += elem.tag in skip_tags
+            continue
+        open_elements.pop()
+        skipping -= elem.tag in skip_tags
+        if elem.tag not in paragraph_tags:
+            continue
+        open_paragraphs -= 1
+        if not skipping:
+            yield paragraph_text(elem)
+        if open_paragraphs == 0 and open_elements:
+            # Everything parsed so far under the parent is complete and already yielded
+            del open_elements[-1][:]
+        else:
+            tail = elem.tail
+            elem.clear()
+            elem.tail = tail
+
+
+def _ooxml_paragraph_text(paragraph: Element, text_tag: str, break_tags: Set[str], tab_tag: str = '') -> str:
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == text_tag:
+            parts.append(node.text or '')
+        elif node.tag in break_tags:
+            parts.append('\n')
+        elif node.tag == tab_tag:
+            parts.append('\t')
+    return ''.join(parts)
+
+
+def _odf_paragraph_text(elem: Element) -> str:
+    parts = [elem.text or '']
+    for child in elem:
+        if child.tag == TEXT_NS + 's':
+            parts.append(' ' * int(child.get(TEXT_NS + 'c', 1)))
+        elif child.tag == TEXT_NS + 'tab':
+            parts.append('\t')
+        elif child.tag == TEXT_NS + 'line-break':
+            parts.append('\n')
+        else:
+            # Spans, links and other inline elements, at any depth
+            parts.append(_odf_paragraph_text(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+
+def iter_docx_text(file_path) -> Iterator[str]:
+    """Yield the paragraphs of a .docx file's body, including those in tables and text boxes."""
+    def paragraph_text(paragraph: Element) -> str:
+        return _ooxml_paragraph_text(paragraph, W_NS + 't', {W_NS + 'br', W_NS + 'cr'}, W_NS + 'tab')
+
+    with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as part:
+        # Text boxes are stored twice, as drawing and as fallback for older readers
+        yield from iter_paragraphs(part, {W_NS + 'p'}, paragraph_text, skip_tags={MC_NS + 'Fallback'})
+
+
+def slide_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Return the slide parts of a .pptx archive in presentation order."""
+    try:
+        relationships = fromstring(archive.read('ppt/_rels/presentation.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target') for rel in relationships.iter(PACKAGE_REL_NS + 'Relationship')}
+        presentation = fromstring(archive.read('ppt/presentation.xml'))
+        parts = []
+        for slide_id in presentation.iter(P_NS + 'sldId'):
+            target = targets.get(slide_id.get(R_NS + 'id'))
+            if target:
+                parts.append(target.lstrip('/') if target.startswith('/')
+                             else posixpath.normpath(posixpath.join('ppt', target)))
+        if parts:
+            return parts
+    except (KeyError, ParseError):
+        pass
+    # Without a readable slide list, order the slides by the number in their file name
+    numbered = [(int(match.group(1)), name) for name in archive.namelist()
+                if (match := SLIDE_PART_PATTERN.match(name))]
+    return [name for _, name in sorted(numbered)]
+
+
+def iter_pptx_text(file_path) -> Iterator[str]:
+    """Yield the paragraphs of all shapes and tables of a .pptx file, slide by slide."""
+    def paragraph_text(paragraph: Element) -> str:
+        return _ooxml_paragraph_text(paragraph, A_NS + 't', {A_NS + 'br'})
+
+    with zipfile.ZipFile(file_path) as archive:
+        for name in slide_parts(archive):
+            with archive.open(name) as part:
+                yield from iter_paragraphs(part, {A_NS + 'p'}, paragraph_text, skip_tags={MC_NS + 'Fallback'})
+
+
+def iter_odf_text(file_path) -> Iterator[str]:
+    """Yield the paragraphs and headings of an OpenDocument file (.odt, .odp), including nested spans."""
+    with zipfile.ZipFile(file_path) as archive, archive.open('content.xml') as part:
+        yield from iter_paragraphs(part, {TEXT_NS + 'p', TEXT_NS + 'h'}, _odf_paragraph_text)
@@ -1,10 +1,22 @@
-import docx
 import logging
+from ._office_xml import DOCUMENT_ERRORS, iter_docx_text
+
+try:
+    import docx
+except ImportError:
+    docx = None
 
 FILE_EXTENSIONS = ['.docx']
 
 def read_file(file_path):
-    """Read contents from a .docx file."""
+    """Read contents from a .docx file, streaming its XML and falling back to python-docx."""
+    try:
+        return '\n'.join(iter_docx_text(file_path))
+    except DOCUMENT_ERRORS as e:
+        logging.warning("Fast extraction failed for docx file %s, using python-docx: %s", file_path, e)
+    if docx is None:
+        logging.error("Error reading docx file %s: python-docx is not installed", file_path)
+        return ""
     try:
         doc = docx.Document(file_path)
         full_text = []
@@ -1,15 +1,129 @@
-from bs4 import BeautifulSoup
 import logging
+from html.parser import HTMLParser
+from config import HTML_READER_MODE, HTML_KEEP_HEADINGS, HTML_MAX_TEXT_BYTES
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
 
 FILE_EXTENSIONS = ['.html', '.htm', '.xhtml']
 
+# Elements whose content is code or markup, not text
+SKIPPED_TAGS = {'script', 'style', 'template'}
+# Elements that start a new line of text
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'caption', 'dd', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'td', 'th', 'title', 'tr', 'ul',
+}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+# Elements whose line breaks and indentation are kept, such as code listings
+PREFORMATTED_TAGS = {'pre', 'textarea'}
+# Characters fed to the parser at a time
+READ_CHUNK_CHARS = 64 * 1024
+
+
+class _TextExtractor(HTMLParser):
+    """Collect the visible text of an HTML document line by line while it is being parsed."""
+
+    def __init__(self, keep_headings: bool, max_bytes: int):
+        super().__init__(convert_charrefs=True)
+        self.keep_headings = keep_headings
+        self.max_bytes = max_bytes
+        self.lines = []
+        self.size = 0
+        self.full = False
+        self._current = []
+        # Estimated bytes of the text in _current once its whitespace is collapsed
+        self._current_size = 0
+        self._skip_depth = 0
+        self._pre_depth = 0
+        self._heading_level = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in HEADING_TAGS:
+            self._end_line()
+            self._heading_level = int(tag[1])
+        elif tag in BLOCK_TAGS or tag in PREFORMATTED_TAGS:
+            self._end_line()
+        if tag in PREFORMATTED_TAGS:
+            self._pre_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in HEADING_TAGS or tag in BLOCK_TAGS or tag in PREFORMATTED_TAGS:
+            self._end_line()
+        if tag in PREFORMATTED_TAGS:
+            self._pre_depth = max(self._pre_depth - 1, 0)
+
+    def handle_data(self, data):
+        if self._skip_depth or self.full:
+            return
+        data_size = len(' '.join(data.split()).encode('utf-8')) + 1
+        remaining = self.max_bytes - self.size - self._current_size
+        if data_size > remaining:
+            # Text without block boundaries, e.g. one huge <span>, must not grow past the budget either
+            data = ' ' + ' '.join(data.split()).encode('utf-8')[:max(remaining, 0)].decode('utf-8', 'ignore')
+            self.full = True
+        self._current.append(data)
+        self._current_size += data_size
+
+    def _end_line(self):
+        text = ''.join(self._current)
+        self._current = []
+        self._current_size = 0
+        if self._pre_depth:
+            # Keep the line breaks and indentation of preformatted text
+            text = '\n'.join(line.rstrip() for line in text.split('\n')).strip('\n')
+        else:
+            # Collapse all whitespace, including the newlines and indentation of the markup
+            text = ' '.join(text.split())
+        heading_level, self._heading_level = self._heading_level, 0
+        if not text:
+            return
+        if heading_level and self.keep_headings:
+            text = f"{'#' * heading_level} {text}"
+        self.lines.append(text)
+        self.size += len(text.encode('utf-8')) + 1
+        self.full = self.full or self.size >= self.max_bytes
+
+    def close(self):
+        super().close()
+        self._end_line()
+
+
+def extract_text(file_path, keep_headings: bool = HTML_KEEP_HEADINGS, max_bytes: int = HTML_MAX_TEXT_BYTES) -> str:
+    """
+    Extract the visible text of an HTML file with an incremental parser.
+
+    Script, style and template content is dropped, whitespace is collapsed to one line
+    per block element except in preformatted text (pre), and headings become Markdown headings when `keep_headings` is
+    set. Reading stops once `max_bytes` of text have been extracted.
+    """
+    parser = _TextExtractor(keep_headings, max_bytes)
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        while not parser.full:
+            chunk = f.read(READ_CHUNK_CHARS)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
+    return '\n'.join(parser.lines)
+
+
 def read_file(file_path):
     """Extract text from an HTML file."""
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-            html_content = f.read()
-        soup = BeautifulSoup(html_content, 'html.parser')
-        return soup.get_text(separator='\n')
+        if HTML_READER_MODE == 'soup' and BeautifulSoup is not None:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                html_content = f.read()
+            soup = BeautifulSoup(html_content, 'html.parser')
+            return soup.get_text(separator='\n')
+        return extract_text(file_path)
     except Exception as e:
         logging.error(f"Error reading HTML file {file_path}: {e}")
         return ""
@@ -1,21 +1,34 @@
 import logging
-from odf.opendocument import load
-from odf.draw import Frame
-from odf.text import P
+from ._office_xml import DOCUMENT_ERRORS, iter_odf_text
+
+try:
+    from odf.opendocument import load
+    from odf.draw import Frame
+    from odf.text import P
+    from odf import teletype
+except ImportError:
+    load = None
 
 FILE_EXTENSIONS = ['.odp']
 
 def read_file(file_path):
-    """Read contents from an .odp (OpenDocument Presentation) file."""
+    """Read contents from an .odp (OpenDocument Presentation) file, streaming content.xml and falling back to odfpy."""
+    try:
+        return '\n'.join(iter_odf_text(file_path))
+    except DOCUMENT_ERRORS as e:
+        logging.warning("Fast extraction failed for odp file %s, using odfpy: %s", file_path, e)
+    if load is None:
+        logging.error("Error reading odp file %s: odfpy is not installed", file_path)
+        return ""
     try:
         doc = load(file_path)
         full_text = []
         for elem in doc.getElementsByType(Frame):
             text_elem = elem.getElementsByType(P)
             for te in text_elem:
-                if te.firstChild:
-                    full_text.append(str(te.firstChild.data))
+                # extractText includes the text of nested spans, not only the first child
+                full_text.append(teletype.extractText(te))
         return '\n'.join(full_text)
     except Exception as e:
         logging.error(f"Error reading odp file {file_path}: {e}")
-        return ""
\ No newline at end of file
+        return ""
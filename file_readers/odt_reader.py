@@ -1,18 +1,31 @@
 import logging
-from odf.opendocument import load
-from odf.text import P
+from ._office_xml import DOCUMENT_ERRORS, iter_odf_text
+
+try:
+    from odf.opendocument import load
+    from odf.text import P
+    from odf import teletype
+except ImportError:
+    load = None
 
 FILE_EXTENSIONS = ['.odt']
 
 def read_file(file_path):
-    """Read contents from an .odt (OpenDocument Text) file."""
+    """Read contents from an .odt (OpenDocument Text) file, streaming content.xml and falling back to odfpy."""
+    try:
+        return '\n'.join(iter_odf_text(file_path))
+    except DOCUMENT_ERRORS as e:
+        logging.warning("Fast extraction failed for odt file %s, using odfpy: %s", file_path, e)
+    if load is None:
+        logging.error("Error reading odt file %s: odfpy is not installed", file_path)
+        return ""
     try:
         doc = load(file_path)
         full_text = []
         for elem in doc.getElementsByType(P):
-            if elem.firstChild:
-                full_text.append(str(elem.firstChild.data))
+            # extractText includes the text of nested spans, not only the first child
+            full_text.append(teletype.extractText(elem))
         return '\n'.join(full_text)
     except Exception as e:
         logging.error(f"Error reading odt file {file_path}: {e}")
-        return ""
\ No newline at end of file
+        return ""
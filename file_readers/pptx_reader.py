@@ -1,11 +1,23 @@
 # file_readers/pptx_reader.py
 import logging
-from pptx import Presentation
+from ._office_xml import DOCUMENT_ERRORS, iter_pptx_text
+
+try:
+    from pptx import Presentation
+except ImportError:
+    Presentation = None
 
 FILE_EXTENSIONS = ['.pptx']
 
 def read_file(file_path):
-    """Read contents from a .pptx file."""
+    """Read contents from a .pptx file, streaming its slide XML and falling back to python-pptx."""
+    try:
+        return '\n'.join(iter_pptx_text(file_path))
+    except DOCUMENT_ERRORS as e:
+        logging.warning("Fast extraction failed for pptx file %s, using python-pptx: %s", file_path, e)
+    if Presentation is None:
+        logging.error("Error reading pptx file %s: python-pptx is not installed", file_path)
+        return ""
     try:
         prs = Presentation(file_path)
         full_text = []
@@ -16,4 +28,4 @@ def read_file(file_path):
         return '\n'.join(full_text)
     except Exception as e:
         logging.error(f"Error reading pptx file {file_path}: {e}")
-        return ""
\ No newline at end of file
+        return ""
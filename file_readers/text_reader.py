@@ -8,16 +8,34 @@ FILE_EXTENSIONS = [
     '.j2', '.tf', '.tfvars', '.properties', '.jsp', '.do', '.mvc', '.config'
 ]
 
+def detect_encoding(file_path):
+    """Detect the encoding of a text file from its first bytes."""
+    with open(file_path, 'rb') as file:
+        raw_data = file.read(10000)
+        result = chardet.detect(raw_data)
+        return result['encoding'] if result['encoding'] else 'utf-8'
+
+def decode_bytes(data):
+    """Decode the raw bytes of a text file, detecting the encoding the same way as read_file."""
+    result = chardet.detect(data[:10000])
+    return data.decode(result['encoding'] or 'utf-8', errors='replace')
+
 def read_file(file_path):
     """Read plain text files with proper encoding."""
     try:
-        with open(file_path, 'rb') as file:
-            raw_data = file.read(10000)
-            result = chardet.detect(raw_data)
-            encoding = result['encoding'] if result['encoding'] else 'utf-8'
-
+        encoding = detect_encoding(file_path)
         with open(file_path, 'r', encoding=encoding, errors='replace') as file:
             return file.read()
     except Exception as e:
         logging.error(f"Error reading text file {file_path}: {e}")
-        return ""
\ No newline at end of file
+        return ""
+
+def iter_file_chunks(file_path, chunk_size=65536):
+    """Yield the text of a file in chunks of at most chunk_size characters, without loading it whole."""
+    encoding = detect_encoding(file_path)
+    with open(file_path, 'r', encoding=encoding, errors='replace') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
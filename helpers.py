@@ -1,7 +1,9 @@
 from pathlib import Path
 import re
+import subprocess
 import uuid
 from datetime import datetime
+from typing import Optional
 
 def generate_unique_filename(base_name: str, extension: str) -> str:
     """Generate a unique filename with timestamp and unique ID."""
@@ -10,17 +12,67 @@ def generate_unique_filename(base_name: str, extension: str) -> str:
     safe_base_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', base_name)
     return f"{safe_base_name}_{timestamp}_{unique_id}.{extension}"
 
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a text (roughly four characters per token for code)."""
+    return (len(text) + 3) // 4
+
+def parse_combined_summary(text: str) -> dict:
+    """Split a combined summary into an ordered mapping of file path to summary text."""
+    matches = list(re.finditer(r'^Filename: (.+)$', text, re.MULTILINE))
+    summaries = {}
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(text)
+        summaries[match.group(1).strip()] = text[match.end():end].strip()
+    return summaries
+
+def read_combined_summary(combined_summary_file: Path) -> dict:
+    """Parse a combined summary file into an ordered mapping of file path to summary text."""
+    if not combined_summary_file.exists():
+        return {}
+    return parse_combined_summary(combined_summary_file.read_text(encoding='utf-8'))
+
+def run_git(repo_directory: Path, *args: str) -> bytes:
+    """Run a git command in the repository and return its raw output."""
+    result = subprocess.run(['git', '-C', str(repo_directory), *args], capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout
+
 def save_output_to_file(content: str, file_path: Path):
     """Save output to a file."""
     file_path.parent.mkdir(parents=True, exist_ok=True)
     with open(file_path, 'w', encoding='utf-8') as f:
         f.write(content)
 
-def is_irrelevant_file(file_path: Path) -> bool:
-    """Determine if a file should be excluded from analysis."""
-    # Define the maximum file size (in bytes) for source code files
-    MAX_FILE_SIZE = 500 * 1024  # 500KB
+# Directories whose files are excluded from analysis
+IRRELEVANT_DIRECTORIES = [
+    # Test directories
+    'test', 'tests', 'spec', 'specs', 'mock', 'mocks', 'stub', 'stubs', 'fixtures', 'benchmark', 'benchmarks', 'ct', 'it', 'performance'
+    # Version control and IDE directories
+    '.git', '.svn', '.hg', '.idea', '.vscode', '__pycache__', '.tox', '.pytest_cache',
+    # Build and dependency directories
+    'build', 'dist', 'node_modules', 'env', 'venv', 'target', 'out', 'bin', 'obj', 'lib', 'libs',
+    'generated', 'gen', 'public', 'private', 'release', 'debug', 'bower_components',
+    # CI/CD and deployment directories
+    '.circleci', '.github', '.gitlab', '.azure', '.vagrant', '.docker', '.dockerignore',
+    # Coverage and report directories
+    'coverage', 'reports', 'logs',
+]
+
+def in_irrelevant_directory(file_path: Path) -> bool:
+    """Return True if any directory in the path is excluded from analysis (tests, build output, VCS data)."""
+    return any(dir_name.lower() == part.lower() for dir_name in IRRELEVANT_DIRECTORIES for part in file_path.parts)
 
+# Maximum size (in bytes) of a file that is summarized
+MAX_FILE_SIZE = 500 * 1024  # 500KB
+
+def is_irrelevant_file(file_path: Path, file_size: Optional[int] = None) -> bool:
+    """
+    Determine if a file should be excluded from analysis.
+
+    `file_size` is used instead of the size on disk for files that are not on disk,
+    such as archive members.
+    """
     # List of irrelevant file extensions
     irrelevant_extensions = [
         # Compiled and binary files
@@ -39,21 +91,6 @@ def is_irrelevant_file(file_path: Path) -> bool:
         '.iml', '.bak',  # IntelliJ IDEA files
     ]
 
-    # List of irrelevant directories
-    irrelevant_directories = [
-        # Test directories
-        'test', 'tests', 'spec', 'specs', 'mock', 'mocks', 'stub', 'stubs', 'fixtures', 'benchmark', 'benchmarks', 'ct', 'it', 'performance'
-        # Version control and IDE directories
-        '.git', '.svn', '.hg', '.idea', '.vscode', '__pycache__', '.tox', '.pytest_cache',
-        # Build and dependency directories
-        'build', 'dist', 'node_modules', 'env', 'venv', 'target', 'out', 'bin', 'obj', 'lib', 'libs',
-        'generated', 'gen', 'public', 'private', 'release', 'debug', 'bower_components',
-        # CI/CD and deployment directories
-        '.circleci', '.github', '.gitlab', '.azure', '.vagrant', '.docker', '.dockerignore',
-        # Coverage and report directories
-        'coverage', 'reports', 'logs',
-    ]
-
     # List of irrelevant filenames
     irrelevant_filenames = [
         # Common non-code files
@@ -71,7 +108,7 @@ def is_irrelevant_file(file_path: Path) -> bool:
         return True
 
     # Check if the file is in an irrelevant directory
-    if any(dir_name.lower() == part.lower() for dir_name in irrelevant_directories for part in file_path.parts):
+    if in_irrelevant_directory(file_path):
         return True
 
     # Check for irrelevant filenames
@@ -79,7 +116,9 @@ def is_irrelevant_file(file_path: Path) -> bool:
         return True
 
     # Exclude large files (e.g., files larger than 500KB)
-    if file_path.is_file() and file_path.stat().st_size > MAX_FILE_SIZE:
+    if file_size is None and file_path.is_file():
+        file_size = file_path.stat().st_size
+    if file_size is not None and file_size > MAX_FILE_SIZE:
         return True
 
     # Exclude build files commonly found in various languages and frameworks
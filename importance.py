@@ -0,0 +1,114 @@
+import logging
+import math
+import re
+import time
+from collections import Counter
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+from config import IMPORTANCE_WEIGHTS, IMPORTANCE_CHURN_SINCE
+from helpers import run_git
+from complexity import CODE_EXTENSIONS
+from archive_source import ArchiveMember
+from diagram_generators.import_graph import ImportGraph
+
+# File names (without extension) of programs' entry points and of web routing modules
+ENTRY_POINT_STEMS = ['main', 'app', 'application', 'index', 'server', '__main__', 'manage', 'wsgi', 'asgi',
+                     'routes', 'router', 'urls', 'views']
+# Class-like names such as OrderController, PaymentHandler or ShopApplication
+ENTRY_POINT_NAME_PATTERN = re.compile(r'(?:Application|Controller|Handler|Resource|Endpoint|Router)$')
+ENTRY_POINT_PATTERN = re.compile(
+    r'^if\s+__name__\s*==\s*[\'"]__main__[\'"]'
+    r'|\bstatic\s+void\s+main\s*\('
+    r'|@(?:RestController|Controller|SpringBootApplication|WebServlet)\b'
+    r'|^func\s+main\s*\('
+    r'|^\s*int\s+main\s*\('
+    r'|@(?:app|router|bp|blueprint)\.(?:route|get|post|put|patch|delete)\b',
+    re.MULTILINE,
+)
+# Only the start of a file is searched for entry point patterns
+ENTRY_POINT_SCAN_BYTES = 64 * 1024
+
+
+def import_fan_in(directory: Path) -> Counter:
+    """Count the files of the repository that import each source file (see diagram_generators.import_graph)."""
+    graph = ImportGraph(directory).build()
+    return Counter(target.as_posix() for _, target in graph.edges)
+
+
+def git_churn(directory: Path, since: Optional[str] = IMPORTANCE_CHURN_SINCE) -> Counter:
+    """
+    Count the commits that changed each file below `directory`, keyed by the path
+    relative to it. Directories outside a git repository have no churn.
+    """
+    try:
+        prefix = run_git(directory, 'rev-parse', '--show-prefix').decode('utf-8', 'surrogateescape').strip()
+        args = ['-c', 'core.quotePath=false', 'log', '--format=', '--name-only', '--no-renames']
+        if since:
+            args.append(f'--since={since}')
+        output = run_git(directory, *args, '--', '.')
+    except (OSError, RuntimeError) as e:
+        logging.info("No git history for the importance ranking of %s: %s", directory, e)
+        return Counter()
+    churn = Counter()
+    for line in output.decode('utf-8', 'surrogateescape').splitlines():
+        if line and line.startswith(prefix):
+            churn[line[len(prefix):]] += 1
+    return churn
+
+
+def is_entry_point(file_path) -> bool:
+    """Return True if a file looks like an entry point: a main program, an application class, a controller or routes."""
+    name = PurePosixPath(file_path.name)
+    stem = name.name.split('.')[0]
+    if stem.lower() in ENTRY_POINT_STEMS or ENTRY_POINT_NAME_PATTERN.search(stem):
+        return True
+    if isinstance(file_path, ArchiveMember) or name.suffix.lower() not in CODE_EXTENSIONS:
+        return False
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            return ENTRY_POINT_PATTERN.search(f.read(ENTRY_POINT_SCAN_BYTES)) is not None
+    except OSError:
+        return False
+
+
+def _normalized(value: float, largest: float) -> float:
+    # Logarithmic, so that one huge file or one heavily imported module does not flatten all others
+    return math.log1p(value) / math.log1p(largest) if largest > 0 else 0.0
+
+
+def importance_scores(files: List, directory: Path, weights: Dict[str, float] = IMPORTANCE_WEIGHTS) -> Dict[str, float]:
+    """
+    Score how important each file is for understanding the repository, keyed by its path
+    relative to `directory`: the weighted sum of how many files import it, how often it
+    changed (git churn), its size and whether it is an entry point, each scaled to 0..1.
+    """
+    started = time.perf_counter()
+    fan_in = import_fan_in(directory)
+    churn = git_churn(directory)
+    metrics = {}
+    for file_path in files:
+        relative_path = file_path.relative_to(directory).as_posix()
+        size = file_path.size if isinstance(file_path, ArchiveMember) else file_path.stat().st_size
+        metrics[relative_path] = {
+            "fan_in": fan_in.get(relative_path, 0),
+            "churn": churn.get(relative_path, 0),
+            "size": size,
+            "entry_point": 1 if is_entry_point(file_path) else 0,
+        }
+    largest = {name: max((values[name] for values in metrics.values()), default=0) for name in weights}
+    scores = {
+        relative_path: round(sum(weight * _normalized(values.get(name, 0), largest[name])
+                                 for name, weight in weights.items()), 4)
+        for relative_path, values in metrics.items()
+    }
+    logging.info("Scored the importance of %d files in %.1fs (%d entry points, %d files with git history)",
+                 len(scores), time.perf_counter() - started,
+                 sum(1 for values in metrics.values() if values['entry_point']), len(churn))
+    return scores
+
+
+def rank_files(files: List, directory: Path) -> Tuple[List, Dict[str, float]]:
+    """Return the files ordered from the most to the least important, and their importance scores."""
+    scores = importance_scores(files, directory)
+    ranked = sorted(files, key=lambda f: -scores[f.relative_to(directory).as_posix()])
+    return ranked, scores
@@ -0,0 +1,345 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zipfile
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config import CACHE_DB_FILE
+
+# Version of the exported cache bundle layout; bump when the entry format changes
+BUNDLE_FORMAT = "insightcode-llm-cache"
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_MANIFEST_NAME = "manifest.json"
+BUNDLE_ENTRIES_NAME = "entries.jsonl"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    cache_key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    source_path TEXT,
+    created_at REAL NOT NULL,
+    prompt_version TEXT,
+    system_hash TEXT
+)
+"""
+
+# Columns added after the first schema version, created on open for older databases
+TAG_COLUMNS = ["prompt_version", "system_hash"]
+
+# Tags that entries can be listed, measured and purged by
+TAG_FIELDS = ["model", "prompt_version", "system_hash"]
+
+# Number of free pages released per step of the background compaction
+COMPACTION_PAGES_PER_STEP = 256
+
+
+def content_hash(text: str) -> str:
+    """Return the SHA-256 hex digest of a piece of text."""
+    return sha256(text.encode('utf-8', errors='replace')).hexdigest()
+
+
+def template_version(template: str) -> str:
+    """Return a short version tag for a prompt template, derived from its text."""
+    return content_hash(template)[:12]
+
+
+def generate_cache_key(content: str, system_prompt: str, model: str) -> str:
+    """
+    Generate a content-addressed cache key.
+
+    Only stable inputs take part in the key: the model, the system prompt and the
+    prompt content. Callers should leave path metadata (such as the location of the
+    repository on disk) out of `content` so that keys survive checkouts in another
+    directory and renamed files.
+    """
+    key_material = json.dumps(
+        {"model": model, "system": content_hash(system_prompt), "content": content_hash(content)},
+        sort_keys=True,
+    )
+    return sha256(key_material.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed store for LLM responses that can be shared between threads and machines."""
+
+    def __init__(self, db_path: Path = CACHE_DB_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        # Incremental auto-vacuum only takes effect on new databases or after a full VACUUM
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        existing_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(llm_cache)")}
+        for column in TAG_COLUMNS:
+            if column not in existing_columns:
+                self._conn.execute(f"ALTER TABLE llm_cache ADD COLUMN {column} TEXT")
+        self._conn.commit()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """Return the cached response for a key, or None if it is not cached."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(
+        self,
+        cache_key: str,
+        response: str,
+        model: str,
+        source_path: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        system_hash: Optional[str] = None,
+    ):
+        """Store a response under the given key and tags, replacing any previous entry."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(cache_key, model, response, source_path, created_at, prompt_version, system_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, model, response, source_path, time.time(), prompt_version, system_hash),
+            )
+            self._conn.commit()
+
+    def __contains__(self, cache_key: str) -> bool:
+        return self.get(cache_key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def summarize_tags(self, group_by: str = "model") -> List[Dict]:
+        """
+        Return the number of entries, the stored response size and the age range per
+        value of a tag.
+        """
+        if group_by not in TAG_FIELDS:
+            raise ValueError(f"Unknown cache tag '{group_by}'. Use one of: {', '.join(TAG_FIELDS)}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {group_by}, COUNT(*), SUM(LENGTH(CAST(response AS BLOB))), MIN(created_at), MAX(created_at) "
+                f"FROM llm_cache GROUP BY {group_by} ORDER BY COUNT(*) DESC"
+            ).fetchall()
+        return [
+            {"tag": value, "entries": count, "bytes": size or 0, "oldest": oldest, "newest": newest}
+            for value, count, size, oldest, newest in rows
+        ]
+
+    def stats(self) -> Dict:
+        """Return the entry count, response size and on-disk size of the cache."""
+        with self._lock:
+            entries, response_bytes = self._conn.execute(
+                "SELECT COUNT(*), SUM(LENGTH(CAST(response AS BLOB))) FROM llm_cache"
+            ).fetchone()
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return {
+            "entries": entries,
+            "response_bytes": response_bytes or 0,
+            "file_bytes": page_size * page_count,
+            "reclaimable_bytes": page_size * freelist_count,
+        }
+
+    def purge(
+        self,
+        model: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        system_hash: Optional[str] = None,
+        older_than: Optional[float] = None,
+        keep_prompt_versions: Optional[Iterable[str]] = None,
+        keep_system_hashes: Optional[Iterable[str]] = None,
+        dry_run: bool = False,
+    ) -> int:
+        """
+        Delete the entries that match every given filter and return how many matched.
+
+        `older_than` is an age in seconds. `keep_prompt_versions` and
+        `keep_system_hashes` select entries whose prompt version or system hash is
+        missing or not in the given set; given together, an entry matches if either tag
+        does. This is how stale entries for changed prompts are found.
+        """
+        conditions = []
+        params = []
+        for column, value in (("model", model), ("prompt_version", prompt_version), ("system_hash", system_hash)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if older_than is not None:
+            conditions.append("created_at < ?")
+            params.append(time.time() - older_than)
+        stale_conditions = []
+        for column, keep in (("prompt_version", keep_prompt_versions), ("system_hash", keep_system_hashes)):
+            if keep is not None:
+                keep = list(keep)
+                placeholders = ", ".join("?" for _ in keep) or "NULL"
+                stale_conditions.append(f"{column} IS NULL OR {column} NOT IN ({placeholders})")
+                params.extend(keep)
+        if stale_conditions:
+            conditions.append(f"({' OR '.join(stale_conditions)})")
+        if not conditions:
+            raise ValueError("Refusing to purge without a filter; use clean_cache to drop the whole cache.")
+
+        where_clause = " AND ".join(conditions)
+        with self._lock:
+            if dry_run:
+                return self._conn.execute(f"SELECT COUNT(*) FROM llm_cache WHERE {where_clause}", params).fetchone()[0]
+            deleted = self._conn.execute(f"DELETE FROM llm_cache WHERE {where_clause}", params).rowcount
+            self._conn.commit()
+        logging.info("Purged %s cache entries", deleted)
+        return deleted
+
+    def compact(self, full: bool = False, max_pages: Optional[int] = None) -> int:
+        """
+        Reclaim free pages and return the number of bytes released.
+
+        The default incremental mode releases at most `max_pages` pages and only holds
+        the lock briefly. A full compaction rewrites the database with VACUUM, which
+        also switches databases created before incremental auto-vacuum to that mode.
+        """
+        before = self.stats()["file_bytes"]
+        with self._lock:
+            if full:
+                self._conn.execute("VACUUM")
+            elif max_pages is None:
+                self._conn.execute("PRAGMA incremental_vacuum")
+            else:
+                self._conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})")
+            self._conn.commit()
+        return max(before - self.stats()["file_bytes"], 0)
+
+    def start_background_compaction(self, pages_per_step: int = COMPACTION_PAGES_PER_STEP, pause: float = 0.5):
+        """Release free pages in small steps from a daemon thread so that a run is not blocked."""
+        def compact_in_steps():
+            try:
+                released = 0
+                while self.stats()["reclaimable_bytes"] > 0:
+                    step = self.compact(max_pages=pages_per_step)
+                    if step == 0:
+                        break
+                    released += step
+                    time.sleep(pause)
+                if released:
+                    logging.info("Background cache compaction released %s bytes", released)
+            except sqlite3.Error as e:
+                logging.warning("Background cache compaction stopped: %s", e)
+
+        thread = threading.Thread(target=compact_in_steps, name="cache-compaction", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def export_bundle(self, bundle_path: Path) -> int:
+        """
+        Export all cache entries to a portable zip bundle.
+
+        The bundle contains a JSON Lines file with one entry per line and a manifest
+        recording the format version, the number of entries and a SHA-256 checksum of
+        the entries file. Returns the number of exported entries.
+        """
+        bundle_path = Path(bundle_path)
+        bundle_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cache_key, model, response, source_path, created_at, prompt_version, system_hash "
+                "FROM llm_cache ORDER BY cache_key"
+            ).fetchall()
+
+        entries_hash = sha256()
+        lines = []
+        for cache_key, model, response, source_path, created_at, prompt_version, system_hash in rows:
+            entry = {
+                "key": cache_key,
+                "model": model,
+                "response": response,
+                "source_path": source_path,
+                "created_at": created_at,
+                "prompt_version": prompt_version,
+                "system_hash": system_hash,
+                "sha256": content_hash(response),
+            }
+            line = json.dumps(entry, ensure_ascii=False) + "\n"
+            entries_hash.update(line.encode('utf-8'))
+            lines.append(line)
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "version": BUNDLE_FORMAT_VERSION,
+            "created_at": time.time(),
+            "entry_count": len(lines),
+            "entries_sha256": entries_hash.hexdigest(),
+        }
+
+        with zipfile.ZipFile(bundle_path, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr(BUNDLE_MANIFEST_NAME, json.dumps(manifest, indent=2))
+            bundle.writestr(BUNDLE_ENTRIES_NAME, "".join(lines))
+
+        logging.info("Exported %s cache entries to %s", len(lines), bundle_path)
+        return len(lines)
+
+    def import_bundle(self, bundle_path: Path, overwrite: bool = False) -> int:
+        """
+        Import entries from a bundle created by `export_bundle`.
+
+        The manifest format and version, the checksum of the entries file and the
+        checksum of every individual response are verified before anything is written.
+        Existing entries are kept unless `overwrite` is set. Returns the number of
+        imported entries.
+        """
+        with zipfile.ZipFile(bundle_path, 'r') as bundle:
+            manifest = json.loads(bundle.read(BUNDLE_MANIFEST_NAME).decode('utf-8'))
+            entries_data = bundle.read(BUNDLE_ENTRIES_NAME)
+
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"Not an LLM cache bundle: {bundle_path}")
+        if manifest.get("version") != BUNDLE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported cache bundle version {manifest.get('version')} "
+                f"(expected {BUNDLE_FORMAT_VERSION})"
+            )
+        if sha256(entries_data).hexdigest() != manifest.get("entries_sha256"):
+            raise ValueError(f"Cache bundle {bundle_path} failed the integrity check")
+
+        entries = [json.loads(line) for line in entries_data.decode('utf-8').splitlines() if line]
+        if len(entries) != manifest.get("entry_count"):
+            raise ValueError(
+                f"Cache bundle {bundle_path} contains {len(entries)} entries, "
+                f"manifest declares {manifest.get('entry_count')}"
+            )
+        for entry in entries:
+            if content_hash(entry["response"]) != entry["sha256"]:
+                raise ValueError(f"Corrupt entry {entry['key']} in cache bundle {bundle_path}")
+
+        conflict_clause = "OR REPLACE" if overwrite else "OR IGNORE"
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT {conflict_clause} INTO llm_cache "
+                "(cache_key, model, response, source_path, created_at, prompt_version, system_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        e["key"], e["model"], e["response"], e.get("source_path"),
+                        e.get("created_at") or time.time(), e.get("prompt_version"), e.get("system_hash"),
+                    )
+                    for e in entries
+                ],
+            )
+            self._conn.commit()
+            imported = self._conn.total_changes - before
+
+        logging.info("Imported %s of %s cache entries from %s", imported, len(entries), bundle_path)
+        return imported
@@ -0,0 +1,396 @@
+import json
+import logging
+import random
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    LLM_WORKERS,
+    OLLAMA_URLS,
+    LLM_CONNECT_TIMEOUT,
+    LLM_FIRST_TOKEN_TIMEOUT,
+    LLM_IDLE_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF_BASE,
+    LLM_RETRY_BACKOFF_MAX,
+    LLM_HEDGING,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    CIRCUIT_BREAKER_FAILURES,
+    CIRCUIT_BREAKER_RESET_SECONDS,
+)
+
+# Connections kept open to the LLM server: one per LLM worker plus room for warm-up, release and hedged calls
+HTTP_POOL_SIZE = max(LLM_WORKERS * 2 + 2, 4)
+# HTTP status codes worth retrying: overload and server-side failures
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Number of recent request durations kept per model to estimate the hedging threshold
+LATENCY_WINDOW = 200
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide HTTP session for LLM requests.
+
+    The session keeps connections to the LLM server open between requests, so every
+    file, diagram and repository analyzed in the same process reuses the same pool.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max(len(OLLAMA_URLS), 2), pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+class LLMRequestError(Exception):
+    """
+    A request to the LLM server failed; `transient` errors are worth retrying. Only an
+    `endpoint_failure` (no connection, a stalled stream or a 5xx response) counts
+    against the endpoint's circuit breaker; a 404 for an unknown model does not.
+    """
+
+    def __init__(self, message: str, transient: bool = True, endpoint_failure: bool = True):
+        super().__init__(message)
+        self.transient = transient
+        self.endpoint_failure = endpoint_failure
+
+
+class CircuitOpenError(LLMRequestError):
+    """All LLM endpoints failed repeatedly and are not being called until their reset time."""
+
+    def __init__(self, message: str):
+        super().__init__(message, transient=False)
+
+
+class RequestCancelled(LLMRequestError):
+    """The request was stopped because a hedged duplicate answered first; the endpoint is not to blame."""
+
+    def __init__(self, message: str):
+        super().__init__(message, transient=False, endpoint_failure=False)
+
+
+class CircuitBreaker:
+    """
+    Stop calling an endpoint after `failure_threshold` consecutive failures.
+
+    After `reset_seconds` one trial request is let through; its success closes the
+    circuit again, its failure keeps it open for another `reset_seconds`.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_BREAKER_FAILURES,
+                 reset_seconds: float = CIRCUIT_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def available(self) -> bool:
+        """Return True if `allow` would let a request through now, without claiming the trial request."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            return not self._trial_running and time.monotonic() - self._opened_at >= self.reset_seconds
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now; with an open circuit this claims the one trial request."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial_running and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_cancelled(self):
+        """Give up the trial request without a verdict on the endpoint, e.g. after a cancellation or a 404."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+
+class LatencyTracker:
+    """Recent request durations per model, used to decide when a request is slow enough to hedge."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+        self.window = window
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model: str, fraction: float, min_samples: int) -> Optional[float]:
+        """Return the duration below which `fraction` of the recent requests finished, or None without enough data."""
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+def _shutdown_connection(response):
+    """
+    Shut down the socket of a streaming response, so a read blocked on it in another
+    thread returns at once. Closing the response would wait for that read to time out.
+    """
+    raw = response.raw
+    if hasattr(raw, 'shutdown'):
+        # urllib3 2.3 and later
+        raw.shutdown()
+        return
+    sock = getattr(getattr(raw, '_connection', None), 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _StreamWatchdog:
+    """Stop a streaming response when the first token or the next token takes too long, or on cancellation."""
+
+    def __init__(self, response, first_token_timeout: float, idle_timeout: float,
+                 cancel_event: Optional[threading.Event]):
+        self.response = response
+        self.first_token_timeout = first_token_timeout
+        self.idle_timeout = idle_timeout
+        self.cancel_event = cancel_event
+        self.started = time.monotonic()
+        self.last_progress = None
+        self.reason = None
+        self.cancelled = False
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="llm-stream-watchdog", daemon=True)
+        self._thread.start()
+
+    def progress(self):
+        self.last_progress = time.monotonic()
+
+    def _watch(self):
+        while not self._done.wait(0.25):
+            now = time.monotonic()
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                self.cancelled = True
+                self.reason = "cancelled"
+            elif self.last_progress is None and now - self.started > self.first_token_timeout:
+                self.reason = f"no first token within {self.first_token_timeout}s"
+            elif self.last_progress is not None and now - self.last_progress > self.idle_timeout:
+                self.reason = f"stream idle for more than {self.idle_timeout}s"
+            if self.reason:
+                _shutdown_connection(self.response)
+                return
+
+    def stop(self):
+        self._done.set()
+
+
+class OllamaClient:
+    """
+    Client for Ollama's streaming generate API with timeouts, retries, hedging and a
+    circuit breaker per endpoint.
+
+    A request waits at most `connect_timeout` to connect, `first_token_timeout` for the
+    first streamed token (which includes loading the model) and `idle_timeout` between
+    tokens. Transient failures are retried with exponential backoff and full jitter,
+    moving on to the next healthy endpoint. With several endpoints and hedging enabled,
+    a request still running after the `hedge_percentile` latency of recent requests is
+    duplicated on another endpoint and the first response wins.
+    """
+
+    def __init__(self, urls: Optional[List[str]] = None, connect_timeout: float = LLM_CONNECT_TIMEOUT,
+                 first_token_timeout: float = LLM_FIRST_TOKEN_TIMEOUT, idle_timeout: float = LLM_IDLE_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, hedging: bool = LLM_HEDGING,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE):
+        self.urls = list(urls or OLLAMA_URLS)
+        self.connect_timeout = connect_timeout
+        self.first_token_timeout = first_token_timeout
+        self.idle_timeout = idle_timeout
+        self.max_retries = max_retries
+        self.hedging = hedging and len(self.urls) > 1
+        self.hedge_percentile = hedge_percentile
+        self.breakers = {url: CircuitBreaker() for url in self.urls}
+        self.latency = LatencyTracker()
+        self._rotation = 0
+        self._rotation_lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="llm-hedge") \
+            if self.hedging else None
+
+    def _healthy_urls(self) -> List[str]:
+        """Return the endpoints whose circuit would allow a request, starting at the next one in rotation."""
+        with self._rotation_lock:
+            start = self._rotation
+            self._rotation = (self._rotation + 1) % len(self.urls)
+        ordered = self.urls[start:] + self.urls[:start]
+        return [url for url in ordered if self.breakers[url].available()]
+
+    def generate(self, payload: Dict) -> Tuple[str, Dict]:
+        """Send a generate request and return the response text and Ollama's final stream message."""
+        body = json.dumps(payload)
+        model = payload.get("model", "")
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            urls = self._healthy_urls()
+            if not urls:
+                raise CircuitOpenError(f"All LLM endpoints are failing; not sending requests for up to "
+                                       f"{CIRCUIT_BREAKER_RESET_SECONDS}s. Last error: {last_error}")
+            try:
+                started = time.monotonic()
+                result = self._generate_hedged(urls, body, model)
+                self.latency.record(model, time.monotonic() - started)
+                return result
+            except LLMRequestError as e:
+                last_error = e
+                if not e.transient or attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, min(LLM_RETRY_BACKOFF_MAX, LLM_RETRY_BACKOFF_BASE * 2 ** attempt))
+                logging.warning("LLM request failed (%s); retry %d/%d in %.1fs",
+                                e, attempt + 1, self.max_retries, delay)
+                time.sleep(delay)
+        raise last_error
+
+    def _generate_hedged(self, urls: List[str], body: str, model: str) -> Tuple[str, Dict]:
+        threshold = None
+        if self.hedging and len(urls) > 1:
+            threshold = self.latency.percentile(model, self.hedge_percentile, LLM_HEDGE_MIN_SAMPLES)
+        if threshold is None:
+            return self._stream(urls[0], body)
+
+        cancel_events = [threading.Event(), threading.Event()]
+        futures = {self._hedge_pool.submit(self._stream, urls[0], body, cancel_events[0]): 0}
+        done, _ = wait(futures, timeout=threshold)
+        if not done:
+            logging.info("LLM request slower than %.1fs; sending a hedged request to %s", threshold, urls[1])
+            futures[self._hedge_pool.submit(self._stream, urls[1], body, cancel_events[1])] = 1
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except LLMRequestError as e:
+                    error = e
+                    continue
+                # Stop the other request; its endpoint is not blamed for the cancellation
+                for other, index in futures.items():
+                    if other is not future:
+                        cancel_events[index].set()
+                return result
+        raise error
+
+    def _stream(self, url: str, body: str, cancel_event: Optional[threading.Event] = None) -> Tuple[str, Dict]:
+        breaker = self.breakers[url]
+        # Only the endpoint that gets the request claims the trial request of an open circuit
+        if not breaker.allow():
+            raise LLMRequestError(f"{url}: circuit open", transient=True)
+        try:
+            result = self._read_stream(url, body, cancel_event)
+        except LLMRequestError as e:
+            if e.endpoint_failure:
+                breaker.record_failure()
+            else:
+                breaker.record_cancelled()
+            raise
+        breaker.record_success()
+        return result
+
+    def _read_stream(self, url: str, body: str, cancel_event: Optional[threading.Event]) -> Tuple[str, Dict]:
+        try:
+            response = get_session().post(
+                url, data=body, headers={'Content-Type': 'application/json'}, stream=True,
+                timeout=(self.connect_timeout, self.first_token_timeout),
+            )
+        except requests.RequestException as e:
+            raise LLMRequestError(f"{url}: {e}")
+
+        logging.debug("Response status code: %s", response.status_code)
+        if response.status_code != 200:
+            transient = response.status_code in TRANSIENT_STATUS_CODES
+            message = f"{url}: HTTP {response.status_code}"
+            logging.debug("Response content: %s", response.text)
+            response.close()
+            raise LLMRequestError(message, transient=transient, endpoint_failure=response.status_code >= 500)
+
+        watchdog = _StreamWatchdog(response, self.first_token_timeout, self.idle_timeout, cancel_event)
+        content = []
+        final = {}
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                watchdog.progress()
+                try:
+                    data = json.loads(line.decode('utf-8'))
+                except json.JSONDecodeError as e:
+                    logging.error("JSONDecodeError: %s", e)
+                    logging.debug("Line content: %s", line)
+                    continue
+                if 'error' in data:
+                    raise LLMRequestError(f"{url}: {data['error']}", transient=False, endpoint_failure=False)
+                # Check if 'response' field is present
+                if 'response' in data:
+                    content.append(data['response'])
+                if data.get('done', False):
+                    final = data
+                    break
+        except (requests.RequestException, AttributeError, ValueError, OSError) as e:
+            # Shutting down the connection from the watchdog surfaces here as a read error
+            if watchdog.cancelled:
+                raise RequestCancelled(f"{url}: cancelled")
+            raise LLMRequestError(watchdog.reason or f"{url}: {e}")
+        finally:
+            watchdog.stop()
+            response.close()
+        if watchdog.cancelled:
+            raise RequestCancelled(f"{url}: cancelled")
+        if watchdog.reason:
+            raise LLMRequestError(watchdog.reason)
+        if not final:
+            raise LLMRequestError(f"{url}: stream ended before the response was complete")
+        return "".join(content), final
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    """Return the process-wide LLM client, so all callers share its circuit breakers and latency history."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
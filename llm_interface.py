@@ -1,16 +1,55 @@
 import logging
 from pathlib import Path
-from config import OLLAMA_URL, DEFAULT_SUMMARIZATION_MODEL, CACHE_DIR, OUTPUT_DIR, CLEAN_CACHE_ON_STARTUP
-from helpers import save_output_to_file, generate_unique_filename, is_irrelevant_file
-from file_readers import get_reader
-import requests
+from typing import Callable, Dict, List, Optional, Tuple
+from config import (
+    DEFAULT_SUMMARIZATION_MODEL,
+    CACHE_DIR,
+    OUTPUT_DIR,
+    CLEAN_CACHE_ON_STARTUP,
+    CACHE_BUNDLE_ON_STARTUP,
+    CACHE_COMPACT_ON_STARTUP,
+    READER_WORKERS,
+    READER_ISOLATION,
+    LLM_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    RUN_METRICS_FILE,
+    RUN_METRICS_HISTORY_FILE,
+    DEFAULT_PROMPT_MODE,
+    PROMPT_MODE_BY_EXTENSION,
+    SKELETON_BODY_SAMPLE_LINES,
+    SKELETON_MIN_FILE_CHARS,
+    EXPORT_LOOSE_SUMMARIES,
+    SUMMARIES_DIR,
+    UNPROCESSED_DIR,
+    ARCHIVE_INGESTION,
+    SMALL_FILE_BATCHING,
+    BATCH_TOKENS_PER_SUMMARY,
+    MODEL_ROUTING,
+    ROUTING_SMALL_MODEL,
+    ROUTING_MAX_SIMPLE_SCORE,
+    ROUTING_ESCALATE,
+    ROUTING_MIN_SUMMARY_CHARS,
+    BUDGET_SECONDS,
+    BUDGET_TOKENS,
+    PENDING_FILES_FILE,
+)
+from helpers import is_irrelevant_file, in_irrelevant_directory, save_output_to_file
+from file_readers import get_reader, is_text_reader, read_bytes
+from llm_cache import LLMCache, generate_cache_key, content_hash, template_version
+from model_manager import apply_model_profile, get_model_profile
+from llm_client import get_client, LLMRequestError
+from pipeline import RunMetrics, RunBudget, BudgetExhausted, run_pipeline
+from code_skeleton import extract_skeleton
+from complexity import complexity_score
+from log_setup import log_event
+from summary_store import SummaryStore
+from reader_pool import ReaderPool, ReaderError, record_unprocessed
+from archive_source import ArchiveMember, is_archive, iter_archive_members, skip_binary_jars
+from file_batching import FileBatch, plan_batches, format_batch_files, parse_batch_response, SUMMARY_HEADER
+from importance import rank_files
 import json
-import shelve
-from hashlib import md5
 import shutil
-
-# Set up logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+import time
 
 # Updated File Summary Prompt Template
 
@@ -31,6 +70,44 @@ Do not include any code generation, feedback, suggestions, or any additional tex
 {file_content}
 """
 
+# Prompt used when the file content has been reduced to a structural outline
+SKELETON_SUMMARY_PROMPT_TEMPLATE = """
+Summarize the content of the following file by describing its purpose, functionality, and the key components it contains. The summary should cover:
+
+1. **Purpose**: The main goal or function of the file within the project.
+2. **Key Components**: Describe important classes, functions, or modules and their roles.
+3. **Data Flow**: Explain how data is processed or manipulated by this file (inputs/outputs).
+4. **Dependencies**: List any external or internal libraries, APIs, or other files it interacts with.
+5. **Interactions**: Describe how this file communicates with other parts of the system.
+
+The file content is given as a structural outline: imports, declarations, signatures, docstrings and comments are complete, while function bodies are shortened and omitted lines are marked with "...". Do not mention that the content is an outline.
+
+Do not include any code generation, feedback, suggestions, or any additional text unrelated to the actual file content. Focus only on factual information from the file content.
+
+**File being summarized**: {file_path}
+
+**File outline**:
+{file_content}
+"""
+
+# Prompt used to summarize several small files in one request (see file_batching.py)
+BATCH_SUMMARY_PROMPT_TEMPLATE = """
+Summarize each of the following {file_count} files separately by describing its purpose, functionality, and the key components it contains. For each file, cover:
+
+1. **Purpose**: The main goal or function of the file within the project.
+2. **Key Components**: Describe important classes, functions, or modules and their roles.
+3. **Data Flow**: Explain how data is processed or manipulated by this file (inputs/outputs).
+4. **Dependencies**: List any external or internal libraries, APIs, or other files it interacts with.
+5. **Interactions**: Describe how this file communicates with other parts of the system.
+
+Start the summary of each file with a line containing only its header, exactly like "{summary_header}" for file 1, and summarize the files in the order given. Every file must get its own summary; do not combine files.
+
+Do not include any code generation, feedback, suggestions, or any additional text unrelated to the actual file content. Focus only on factual information from the file content.
+
+**Files being summarized**:
+{files}
+"""
+
 # Updated System Prompt to improve LLM behavior
 SYSTEM_PROMPT = """
 You are a code summarization assistant. Your task is to provide concise, high-level summaries of code files, focusing on their purpose, functionality, and role within the broader project.
@@ -42,6 +119,16 @@ You are a code summarization assistant. Your task is to provide concise, high-le
 Your response should be the summary only.
 """
 
+BATCH_SYSTEM_PROMPT = """
+You are a code summarization assistant. Your task is to provide concise, high-level summaries of several code files, focusing on the purpose, functionality, and role of each file within the broader project.
+
+- Do not include code snippets or technical details like variable names or function names.
+- Do not include any preambles, confirmations, or apologies.
+- Do not include any feedback, suggestions, or potential improvements.
+
+Your response should be the headers and summaries only.
+"""
+
 DIAGRAM_SYSTEM_PROMPT = """You are a diagram code generation assistant. Your task is to generate valid and accurate diagram code in the requested format, based solely on the provided prompts.
 
 ### Guidelines:
@@ -67,156 +154,719 @@ def clean_cache():
         logging.info("Cache directory cleaned.")
 
 _cache_cleaned = False  # Global flag to track if the cache has been cleaned
+_cache = None  # Shared cache instance, opened on first use
 
-def init_cache() -> shelve.Shelf:
-    """Initialize the shelve cache and clean it only once if required."""
-    global _cache_cleaned
+def init_cache() -> LLMCache:
+    """Initialize the shared LLM cache, cleaning it and importing a bundle only once if required."""
+    global _cache_cleaned, _cache
+    if _cache is not None:
+        return _cache
     if CLEAN_CACHE_ON_STARTUP and not _cache_cleaned:
         clean_cache()
         _cache_cleaned = True
     logging.debug("Initializing cache directory")
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    return shelve.open(str(CACHE_DIR / 'llm_cache.db'))
-
-def generate_cache_key(user_prompt: str, system_prompt: str, model: str) -> str:
-    """Generate a unique hash for cache key based on input."""
-    key_string = f"{model}_{system_prompt}_{user_prompt}"
-    cache_key = md5(key_string.encode()).hexdigest()
-    logging.debug(f"Generated cache key: {cache_key} for prompt: {user_prompt[:50]}")
-    return cache_key
-
-def generate_response_with_llm(user_prompt: str, system_prompt: str, model: str) -> str:
-    """Call the LLM via API to generate responses with caching."""
+    _cache = LLMCache()
+    if CACHE_BUNDLE_ON_STARTUP:
+        bundle_path = Path(CACHE_BUNDLE_ON_STARTUP)
+        if bundle_path.exists():
+            _cache.import_bundle(bundle_path)
+        else:
+            logging.warning("Cache bundle %s not found; starting with the local cache only.", bundle_path)
+    if CACHE_COMPACT_ON_STARTUP:
+        _cache.start_background_compaction()
+    return _cache
+
+def request_llm(
+    user_prompt: str,
+    system_prompt: str,
+    model: str,
+    response_info: Optional[Dict] = None,
+    options: Optional[Dict] = None,
+) -> str:
+    """
+    Send one prompt to the LLM without consulting the cache and return the response.
+
+    `options` override the Ollama options of the model's profile for this request.
+    `response_info` is filled as in generate_response_with_llm.
+    """
+    logging.info("Sending request to LLM with model '%s' and prompt size %d", model, len(user_prompt))
+
+    payload = apply_model_profile({
+        "model": model,
+        "prompt": user_prompt,
+        "system": system_prompt
+    })
+    if options:
+        payload["options"] = {**payload.get("options", {}), **options}
+
+    # The payload holds the whole file and is only serialized for the log when DEBUG is enabled
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Payload: %s", json.dumps(payload))
+
+    started = time.perf_counter()
+    response_content, final = get_client().generate(payload)
+
+    if response_info is not None:
+        response_info.update(
+            cached=False,
+            prompt_tokens=final.get('prompt_eval_count'),
+            completion_tokens=final.get('eval_count'),
+        )
+
+    if not response_content:
+        logging.warning("Unexpected response or no response.")
+        return ""
+
+    if response_info is not None:
+        response_info["llm_seconds"] = round(time.perf_counter() - started, 3)
+    return response_content
+
+
+def generate_response_with_llm(
+    user_prompt: str,
+    system_prompt: str,
+    model: str,
+    cache_content: Optional[str] = None,
+    source_path: Optional[str] = None,
+    prompt_version: Optional[str] = None,
+    response_info: Optional[Dict] = None,
+) -> str:
+    """
+    Call the LLM via API to generate responses with caching.
+
+    The cache key is derived from `cache_content` when given, otherwise from the full
+    user prompt. Pass the prompt without path metadata as `cache_content` to make the
+    cached response independent of where the file lives; `source_path` is stored with
+    the entry for reference only. New entries are tagged with the model, the
+    `prompt_version` of the template that built the prompt and a hash of the system
+    prompt, so that stale entries can be purged selectively.
+
+    If `response_info` is given, it is filled with whether the response came from the
+    cache and, for generated responses, the token counts reported by Ollama and the
+    seconds the request took. Requests that still fail after the client's retries raise
+    llm_client.LLMRequestError.
+    """
     cache = init_cache()
-    cache_key = generate_cache_key(user_prompt, system_prompt, model)
+    cache_key = generate_cache_key(user_prompt if cache_content is None else cache_content, system_prompt, model)
+    logging.debug("Generated cache key: %s for prompt: %.50s", cache_key, user_prompt)
 
     # Check if the result is already cached
-    if cache_key in cache:
-        logging.info(f"Fetching result from cache for prompt: {user_prompt[:50]}...")
-        response_content = cache[cache_key]
-        cache.close()
-        return response_content
+    cached_response = cache.get(cache_key)
+    if cached_response is not None:
+        logging.debug("Fetching result from cache for prompt: %.50s...", user_prompt)
+        if response_info is not None:
+            response_info["cached"] = True
+        return cached_response
 
     # If not cached, call the LLM API
     try:
-        logging.info(f"Sending request to LLM with model '{model}' and prompt size {len(user_prompt)}")
-
-        payload = {
-            "model": model,
-            "prompt": user_prompt,
-            "system": system_prompt
-        }
-
-        logging.debug(f"Payload: {json.dumps(payload)}")
-
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(OLLAMA_URL, data=json.dumps(payload), headers=headers, stream=True)
-
-        logging.debug(f"Response status code: {response.status_code}")
-
-        if response.status_code != 200:
-            logging.error(f"Failed to generate response with LLM: HTTP {response.status_code}")
-            logging.debug(f"Response content: {response.text}")
-            cache.close()
-            return ""
-
-        # Read the streaming response
-        response_content = ""
-        for line in response.iter_lines():
-            if line:
-                try:
-                    data = json.loads(line.decode('utf-8'))
-                    # Check if 'response' field is present
-                    if 'response' in data:
-                        response_content += data['response']
-                    if data.get('done', False):
-                        break
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSONDecodeError: {e}")
-                    logging.debug(f"Line content: {line}")
-                    continue
-
+        response_content = request_llm(user_prompt, system_prompt, model, response_info)
         if not response_content:
-            logging.warning("Unexpected response or no response.")
-            logging.debug(f"Complete raw response: {response.text}")
-            cache.close()
             return ""
 
         # Cache the result
         logging.debug("Caching the generated response.")
-        cache[cache_key] = response_content
-        cache.close()
+        cache.put(
+            cache_key, response_content, model, source_path,
+            prompt_version=prompt_version, system_hash=content_hash(system_prompt)[:12],
+        )
 
         return response_content
 
     except Exception as e:
-        logging.error(f"Failed to generate response with LLM: {e}")
-        cache.close()
+        logging.error("Failed to generate response with LLM: %s", e)
         raise e
         
 
-def summarize_codebase(directory: Path, summarization_model: str = DEFAULT_SUMMARIZATION_MODEL) -> str:
-    """Summarize the entire repository and save individual summaries with unique filenames."""
-
-    # Create a directory for saving individual summaries
-    summaries_dir = OUTPUT_DIR / "summaries"
-    summaries_dir.mkdir(parents=True, exist_ok=True)
-
+def read_source_file(file_path: Path) -> str:
+    """Read a source file with the reader registered for its extension."""
+    file_extension = file_path.suffix
+    reader = get_reader(file_extension)
+    reader_name = reader.__module__.split('.')[-1]
+    logging.debug("Reading file %s using reader '%s' for extension '%s'", file_path, reader_name, file_extension)
+    try:
+        file_content = reader(file_path)
+        logging.debug("Read content from file %s", file_path)
+        return file_content
+    except Exception as e:
+        logging.error("Error reading file %s with reader '%s': %s", file_path, reader_name, e)
+        raise
+
+
+def get_prompt_mode(file_extension: str) -> str:
+    """Return the configured prompt mode ('full' or 'skeleton') for a file extension."""
+    return PROMPT_MODE_BY_EXTENSION.get(file_extension.lower(), DEFAULT_PROMPT_MODE)
+
+
+def prepare_prompt_content(relative_path: str, file_content: str):
+    """
+    Apply the prompt mode for the file's extension and return the content to embed in
+    the prompt together with the matching prompt template.
+    """
+    file_extension = Path(relative_path).suffix
+    if get_prompt_mode(file_extension) == 'skeleton' and len(file_content) >= SKELETON_MIN_FILE_CHARS:
+        skeleton = extract_skeleton(file_content, file_extension, SKELETON_BODY_SAMPLE_LINES)
+        if skeleton is not file_content:
+            logging.debug("Skeleton for %s: %d of %d characters", relative_path, len(skeleton), len(file_content))
+            return skeleton, SKELETON_SUMMARY_PROMPT_TEMPLATE
+    return file_content, FILE_SUMMARY_PROMPT_TEMPLATE
+
+
+def build_summary_prompt(relative_path: str, file_content: str) -> Tuple[str, str, str, str]:
+    """
+    Return the prompt that summarizes one file as (user prompt, cache content, prompt
+    content, template); the cache content is the prompt without the path.
+    """
+    prompt_content, prompt_template = prepare_prompt_content(relative_path, file_content)
+    # The path is relative to the repository root and left out of the cache key,
+    # so summaries are reused across checkouts and renames.
+    user_prompt = prompt_template.format(file_path=relative_path, file_content=prompt_content)
+    cache_content = prompt_template.format(file_path="", file_content=prompt_content)
+    return user_prompt, cache_content, prompt_content, prompt_template
+
+
+def batch_cache_key(file_content: str, summarization_model: str) -> str:
+    """Return the cache key of a file's summary from a batch request, the same whatever the other files are."""
+    return generate_cache_key(build_batch_prompt([("", file_content)]), BATCH_SYSTEM_PROMPT, summarization_model)
+
+
+def cached_file_summary(relative_path: str, file_content: str, summarization_model: str) -> Optional[Tuple[str, str]]:
+    """
+    Return the cached summary of a file's content and the prompt mode it was made with,
+    or None. Summaries from batch requests count as well.
+    """
+    cache = init_cache()
+    _, cache_content, _, prompt_template = build_summary_prompt(relative_path, file_content)
+    summary = cache.get(generate_cache_key(cache_content, SYSTEM_PROMPT, summarization_model))
+    if summary is not None:
+        return summary, 'skeleton' if prompt_template is SKELETON_SUMMARY_PROMPT_TEMPLATE else 'full'
+    summary = cache.get(batch_cache_key(file_content, summarization_model))
+    if summary is not None:
+        return summary, 'batch'
+    return None
+
+
+def route_model(relative_path: str, file_content: str, summarization_model: str) -> str:
+    """
+    Return the model that summarizes a file: with MODEL_ROUTING, ROUTING_SMALL_MODEL
+    for files whose complexity score is at most ROUTING_MAX_SIMPLE_SCORE, otherwise
+    `summarization_model`.
+    """
+    if not MODEL_ROUTING:
+        return summarization_model
+    file_extension = Path(relative_path).suffix
+    is_document = not is_text_reader(get_reader(file_extension))
+    score = complexity_score(file_content, file_extension, is_document)
+    logging.debug("Complexity score of %s: %.1f", relative_path, score)
+    return ROUTING_SMALL_MODEL if score <= ROUTING_MAX_SIMPLE_SCORE else summarization_model
+
+
+def summarize_file_content(
+    relative_path: str,
+    file_content: str,
+    summarization_model: str,
+    metrics: Optional[RunMetrics] = None,
+    response_info: Optional[Dict] = None,
+) -> str:
+    """
+    Summarize the content of one file with the LLM; `response_info` is filled as in
+    generate_response_with_llm, plus the model that wrote the summary.
+
+    With MODEL_ROUTING, simple files go to ROUTING_SMALL_MODEL (see route_model). With
+    ROUTING_ESCALATE, a file is summarized again with `summarization_model` when the
+    small model's summary is shorter than ROUTING_MIN_SUMMARY_CHARS or its request fails.
+    """
+    user_prompt, cache_content, prompt_content, prompt_template = build_summary_prompt(relative_path, file_content)
+    if response_info is not None:
+        response_info["prompt_mode"] = 'skeleton' if prompt_template is SKELETON_SUMMARY_PROMPT_TEMPLATE else 'full'
+    if metrics is not None:
+        metrics.increment("source_chars", len(file_content))
+        metrics.increment("prompt_chars", len(prompt_content))
+
+    def generate(model: str) -> str:
+        if response_info is not None:
+            response_info["model"] = model
+        # A summary from an earlier batch request is reused like one made for the file alone
+        cached = cached_file_summary(relative_path, file_content, model)
+        if cached is not None:
+            if response_info is not None:
+                response_info.update(cached=True, prompt_mode=cached[1])
+            return cached[0]
+        return generate_response_with_llm(
+            user_prompt, SYSTEM_PROMPT, model,
+            cache_content=cache_content, source_path=relative_path,
+            prompt_version=template_version(prompt_template),
+            response_info=response_info,
+        )
+
+    model = route_model(relative_path, file_content, summarization_model)
+    if model == summarization_model:
+        return generate(model)
+    try:
+        summary = generate(model)
+    except LLMRequestError as e:
+        if not ROUTING_ESCALATE:
+            raise
+        logging.warning("The small model failed on %s: %s", relative_path, e)
+        summary = ""
+    if not ROUTING_ESCALATE or len(summary.strip()) >= ROUTING_MIN_SUMMARY_CHARS:
+        if metrics is not None:
+            metrics.increment("files_small_model")
+        return summary
+    logging.info("Summary of %s by %s is too short; escalating to %s", relative_path, model, summarization_model)
+    if metrics is not None:
+        metrics.increment("files_escalated")
+    return generate(summarization_model)
+
+
+def build_batch_prompt(entries: List[Tuple[str, str]]) -> str:
+    """Return the prompt that summarizes several files, given as (relative path, content), at once."""
+    return BATCH_SUMMARY_PROMPT_TEMPLATE.format(
+        file_count=len(entries), summary_header=SUMMARY_HEADER.format(number=1), files=format_batch_files(entries),
+    )
+
+
+def summarize_file_batch(
+    entries: List[Tuple[str, str]],
+    summarization_model: str,
+    metrics: Optional[RunMetrics] = None,
+) -> List[Tuple[Optional[str], Dict]]:
+    """
+    Summarize several small files, given as (relative path, content), in one LLM request.
+
+    Each file is looked up in the cache first, under the key of a request for that file
+    alone and of a batch holding only that file, so cached summaries are reused no matter
+    which files a batch is packed with. The other files are sent together and the
+    response is split into one summary per file, which is cached per file. Returns
+    (summary, response_info) per entry; the summary is None for files the batch did not
+    summarize (a single uncached file, a failed request or a missing section), which the
+    caller summarizes one by one. With ROUTING_ESCALATE, summaries of the small model
+    shorter than ROUTING_MIN_SUMMARY_CHARS are also None, so that the caller escalates.
+    """
+    cache = init_cache()
+    # A batch goes to the small model only if all its files are simple
+    models = {route_model(relative_path, file_content, summarization_model) for relative_path, file_content in entries}
+    escalate = False
+    if len(models) == 1:
+        model = models.pop()
+        escalate = ROUTING_ESCALATE and model != summarization_model
+        summarization_model = model
+
+    def too_short(summary: str) -> bool:
+        return escalate and len(summary.strip()) < ROUTING_MIN_SUMMARY_CHARS
+
+    results: List[Tuple[Optional[str], Dict]] = [(None, {}) for _ in entries]
+    short = set()
+    for index, (relative_path, file_content) in enumerate(entries):
+        cached = cached_file_summary(relative_path, file_content, summarization_model)
+        if cached is not None and too_short(cached[0]):
+            short.add(index)
+        elif cached is not None:
+            results[index] = (cached[0], {"cached": True, "prompt_mode": cached[1], "model": summarization_model})
+
+    pending = [index for index, (summary, _) in enumerate(results) if summary is None and index not in short]
+    if len(pending) < 2:
+        return results
+
+    user_prompt = build_batch_prompt([entries[index] for index in pending])
+    # A batch needs room for all its summaries; a profile's num_predict is sized for one
+    num_predict = get_model_profile(summarization_model).get('num_predict')
+    needed = BATCH_TOKENS_PER_SUMMARY * len(pending)
+    options = {"num_predict": needed} if num_predict is not None and 0 <= num_predict < needed else None
+    batch_info = {}
+    try:
+        response = request_llm(user_prompt, BATCH_SYSTEM_PROMPT, summarization_model, batch_info, options)
+    except LLMRequestError as e:
+        logging.warning("Batch request for %s files failed; summarizing them one by one: %s", len(pending), e)
+        response = ""
+
+    summaries = parse_batch_response(response, len(pending))
+    short_summaries = [number for number, summary in summaries.items() if too_short(summary)]
+    for number in short_summaries:
+        del summaries[number]
+    if short_summaries:
+        logging.info("%s batch summaries by %s are too short; summarizing those files one by one",
+                     len(short_summaries), summarization_model)
+    if metrics is not None:
+        metrics.increment("batch_requests")
+        metrics.increment("batch_files_summarized", len(summaries))
+        metrics.increment("batch_files_fallback", len(pending) - len(summaries))
+    if len(summaries) < len(pending):
+        logging.warning("Batch response covered %s of %s files; summarizing the others one by one",
+                        len(summaries), len(pending))
+
+    # Tokens and time of the request are shared by the files it summarized
+    def share(value):
+        return None if value is None else round(value / len(pending), 3)
+
+    for number, index in enumerate(pending, start=1):
+        summary = summaries.get(number)
+        if summary is None:
+            continue
+        relative_path, file_content = entries[index]
+        cache.put(
+            batch_cache_key(file_content, summarization_model), summary, summarization_model, relative_path,
+            prompt_version=template_version(BATCH_SUMMARY_PROMPT_TEMPLATE),
+            system_hash=content_hash(BATCH_SYSTEM_PROMPT)[:12],
+        )
+        results[index] = (summary, {
+            "cached": False, "prompt_mode": 'batch', "model": summarization_model,
+            "prompt_tokens": share(batch_info.get("prompt_tokens")),
+            "completion_tokens": share(batch_info.get("completion_tokens")),
+            "llm_seconds": share(batch_info.get("llm_seconds")),
+        })
+    return results
+
+
+def batch_token_estimate(file_path) -> Optional[int]:
+    """Estimate the tokens of a file from its size, or return None if it is not plain text and cannot be batched."""
+    if not is_text_reader(get_reader(file_path.suffix)):
+        return None
+    size = file_path.size if isinstance(file_path, ArchiveMember) else file_path.stat().st_size
+    # Same ratio as helpers.estimate_tokens: about four bytes per token
+    return (size + 3) // 4
+
+
+def collect_files(directory: Path, metrics: Optional[RunMetrics] = None) -> Tuple[List, List[Path]]:
+    """
+    Walk a repository and return the files to summarize and the files skipped by the
+    ignore rules. With ARCHIVE_INGESTION, the files to summarize include the members of
+    archives (see archive_source.ArchiveMember).
+    """
+    metrics = metrics or RunMetrics()
     all_files = [f for f in directory.glob('**/*') if f.is_file()]
-    total_files = len(all_files)
-    combined_summary = []
-
-    logging.info(f"Starting codebase summarization... Total files to process: {total_files}")
-
-    # Process each file and save the summaries
-    for idx, file_path in enumerate(all_files, start=1):
-        if is_irrelevant_file(file_path):
-            logging.info(f"Skipping irrelevant file: {file_path}")
+    metrics.increment("files_total", len(all_files))
+
+    relevant_files = []
+    skipped_files = []
+    archives = []
+    for file_path in all_files:
+        if ARCHIVE_INGESTION and is_archive(file_path.name) and not in_irrelevant_directory(file_path):
+            archives.append(file_path)
+        elif is_irrelevant_file(file_path):
+            logging.debug("Skipping irrelevant file: %s", file_path)
+            log_event("file_skipped", path=str(file_path))
+            metrics.increment("files_skipped")
+            skipped_files.append(file_path)
+        else:
+            relevant_files.append(file_path)
+
+    # The files inside archives are summarized in place, like files on disk
+    kept_archives = set(skip_binary_jars(str(archive) for archive in archives))
+    for archive in archives:
+        if str(archive) not in kept_archives:
+            logging.debug("Skipping binary jar with a sources jar: %s", archive)
+            log_event("file_skipped", path=str(archive))
+            metrics.increment("files_skipped")
+            skipped_files.append(archive)
             continue
-
-        file_extension = file_path.suffix
-        reader = get_reader(file_extension)
-        reader_name = reader.__module__.split('.')[-1]
-        logging.info(f"Processing file {idx}/{total_files} ({file_path.name}) using reader '{reader_name}' for extension '{file_extension}'")
-
-        # Read file content
+        members = list(iter_archive_members(archive, directory))
+        logging.info("Found %s relevant files in archive %s", len(members), archive)
+        metrics.increment("archive_members", len(members))
+        relevant_files.extend(members)
+    return relevant_files, skipped_files
+
+
+def plan_pipeline_items(relevant_files: List, directory: Path) -> List:
+    """Return the pipeline items for the files to summarize: the files, or with SMALL_FILE_BATCHING files and batches."""
+    if not SMALL_FILE_BATCHING:
+        return relevant_files
+    items = plan_batches(relevant_files, batch_token_estimate, lambda f: f.relative_to(directory).parent)
+    batches = [item for item in items if isinstance(item, FileBatch)]
+    logging.info("Packed %s small files into %s batches", sum(len(batch) for batch in batches), len(batches))
+    return items
+
+
+def coverage_note(metrics: RunMetrics) -> Optional[str]:
+    """Describe how much of the repository a budgeted run summarized, or return None if it left no files undone."""
+    counters = metrics.counters
+    deferred = int(counters.get("files_deferred", 0))
+    if not deferred:
+        return None
+    summarized = int(counters.get("files_summarized", 0))
+    total = summarized + deferred + int(counters.get("files_failed", 0)) + int(counters.get("files_empty", 0))
+    return (f"Partial coverage: {summarized} of {total} files summarized, the most important first; "
+            f"{deferred} files are left for the next run (see {PENDING_FILES_FILE.name}).")
+
+
+def load_pending_files(pending_file: Path, directory: Path) -> List[str]:
+    """Return the files the last budgeted run of `directory` left undone, most important first."""
+    try:
+        with open(pending_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logging.warning("Ignoring unreadable %s: %s", pending_file, e)
+        return []
+    if data.get("repository") != str(directory):
+        return []
+    return [entry["path"] for entry in data.get("files", [])]
+
+
+def resume_order(ranked_files: List, directory: Path, pending: List[str]) -> List:
+    """
+    Order ranked files so that a budgeted run continues where the last one stopped: files
+    it summarized (and new files) keep their rank and come first, since they are cache hits
+    that cost no budget, followed by the files it left undone in their saved order.
+    """
+    position = {path: index for index, path in enumerate(pending)}
+    done = [f for f in ranked_files if f.relative_to(directory).as_posix() not in position]
+    undone = [f for f in ranked_files if f.relative_to(directory).as_posix() in position]
+    undone.sort(key=lambda f: position[f.relative_to(directory).as_posix()])
+    return done + undone
+
+
+def save_pending_files(pending_file: Path, directory: Path, deferred: List, scores: Dict[str, float]):
+    """Write the files a budgeted run left undone, most important first, or remove the list if there are none."""
+    if not deferred:
+        pending_file.unlink(missing_ok=True)
+        return
+    files = [file_path.relative_to(directory).as_posix() for file_path in deferred]
+    data = {
+        "repository": str(directory),
+        "files": [{"path": path, "importance": scores.get(path)} for path in files],
+    }
+    pending_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(pending_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def summarize_codebase(
+    directory: Path,
+    summarization_model: str = DEFAULT_SUMMARIZATION_MODEL,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    output_dir: Path = OUTPUT_DIR,
+    metrics: Optional[RunMetrics] = None,
+    budget_seconds: Optional[float] = BUDGET_SECONDS,
+    budget_tokens: Optional[int] = BUDGET_TOKENS,
+    reader_pool: Optional[ReaderPool] = None,
+) -> str:
+    """
+    Summarize the entire repository and store each summary in the summary store.
+
+    Files are read by a pool of reader threads ahead of the LLM workers (see
+    `pipeline.run_pipeline`), and each summary is appended to the combined summary as
+    soon as it and all summaries before it are done. `progress_callback`, if given, is
+    called with the number of processed files and the total number of files after
+    each file is handled. The combined summary and metrics are written to `output_dir`;
+    pass `metrics` to read the run's counters afterwards. With ARCHIVE_INGESTION, files
+    inside archives are summarized in place under paths like app.war!/WEB-INF/web.xml.
+    With SMALL_FILE_BATCHING, small text files of the same directory are summarized
+    together (see summarize_file_batch). A `reader_pool` passed in is used instead of
+    starting reader processes for this run, and is left open.
+
+    With a `budget_seconds` or `budget_tokens` limit, files are summarized from the most
+    to the least important (see importance.rank_files) until the budget is spent. Files
+    left undone are listed in pending_files.json. The next budgeted run takes the files
+    summarized so far from the cache and continues with that list (see resume_order).
+    The combined summary of a partial run starts with a note on its coverage (see
+    coverage_note).
+    """
+    budget = RunBudget(budget_seconds, budget_tokens)
+    store = SummaryStore()
+    repository = str(directory)
+
+    if metrics is None:
+        metrics = RunMetrics()
+    metrics.labels.setdefault("repository", str(directory))
+    metrics.labels.setdefault("model", summarization_model)
+    relevant_files, _ = collect_files(directory, metrics)
+
+    total_files = len(relevant_files)
+    scores = {}
+    if budget:
+        relevant_files, scores = rank_files(relevant_files, directory)
+        pending = load_pending_files(output_dir / PENDING_FILES_FILE.name, directory)
+        if pending:
+            logging.info("Continuing the last budgeted run: %d files were left undone", len(pending))
+            relevant_files = resume_order(relevant_files, directory, pending)
+    items = plan_pipeline_items(relevant_files, directory)
+    combined_summary = []
+    deferred = []
+    processed = 0
+
+    logging.info("Starting codebase summarization... Total files to process: %s", total_files)
+
+    def process_file(file_path: Path, file_content: str):
+        relative_path = file_path.relative_to(directory).as_posix()
+        if budget.exhausted() and cached_file_summary(
+            relative_path, file_content, route_model(relative_path, file_content, summarization_model),
+        ) is None:
+            raise BudgetExhausted(f"The budget was spent before {relative_path}")
+        started = time.perf_counter()
+        response_info = {"source_chars": len(file_content)}
+        summary = summarize_file_content(
+            relative_path, file_content, summarization_model, metrics=metrics, response_info=response_info
+        )
+        if response_info.get("cached") is False:
+            budget.spend((response_info.get("prompt_tokens") or 0) + (response_info.get("completion_tokens") or 0))
+        log_event(
+            "file_summarized", path=str(file_path), seconds=round(time.perf_counter() - started, 3),
+            summary_chars=len(summary or ""), **response_info,
+        )
+        return summary, content_hash(file_content), response_info
+
+    def file_outcome(file_path: Path, file_content: str) -> tuple:
         try:
-            file_content = reader(file_path)
-            logging.debug(f"Read content from file {file_path}")
+            return process_file(file_path, file_content), None
         except Exception as e:
-            logging.error(f"Error reading file {file_path} with reader '{reader_name}': {e}")
-            continue
-
-        # Prepare the prompt for summarization
-        user_prompt = FILE_SUMMARY_PROMPT_TEMPLATE.format(file_path=file_path, file_content=file_content)
-
-        # Generate the summary using the LLM
-        try:
-            summary = generate_response_with_llm(user_prompt, SYSTEM_PROMPT, summarization_model)
-            if summary:
-                # Save each summary in the summaries directory with a unique filename
-                summary_filename = generate_unique_filename(file_path.stem, "txt")
-                summary_file_path = summaries_dir / summary_filename
-                save_output_to_file(summary, summary_file_path)
-                logging.info(f"Summary saved to {summary_file_path}")
-
-                # Add to the combined summary with the filename
-                combined_summary.append(f"Filename: {file_path}\n{summary}\n")
+            return None, e
+
+    def process_batch(batch: FileBatch, contents: list):
+        # Returns (result, error) per file of the batch, as process_file and the reader would
+        if budget.exhausted():
+            # No new batch request; process_file still takes the summaries found in the cache
+            return [(None, error) if error is not None else file_outcome(file_path, content)
+                    for file_path, (content, error) in zip(batch.files, contents)]
+        readable = [(file_path, content) for file_path, (content, error) in zip(batch.files, contents) if error is None]
+        started = time.perf_counter()
+        batch_results = summarize_file_batch(
+            [(file_path.relative_to(directory).as_posix(), content) for file_path, content in readable],
+            summarization_model, metrics=metrics,
+        )
+        seconds = round((time.perf_counter() - started) / max(len(readable), 1), 3)
+        outcomes = {}
+        for (file_path, content), (summary, response_info) in zip(readable, batch_results):
+            if summary is None:
+                outcomes[file_path] = file_outcome(file_path, content)
+                continue
+            if response_info.get("cached") is False:
+                budget.spend((response_info.get("prompt_tokens") or 0) + (response_info.get("completion_tokens") or 0))
+            metrics.increment("source_chars", len(content))
+            metrics.increment("prompt_chars", len(content))
+            response_info = {"source_chars": len(content), **response_info}
+            log_event(
+                "file_summarized", path=str(file_path), seconds=seconds, summary_chars=len(summary),
+                batch_size=len(readable), **response_info,
+            )
+            outcomes[file_path] = ((summary, content_hash(content), response_info), None)
+        return [outcomes.get(file_path, (None, error)) for file_path, (_, error) in zip(batch.files, contents)]
+
+    def process_item(item, content):
+        if isinstance(item, FileBatch):
+            return process_batch(item, content)
+        return process_file(item, content)
+
+    combined_summary_file = output_dir / "combined_summary.txt"
+    combined_summary_file.parent.mkdir(parents=True, exist_ok=True)
+    # The unprocessed files of earlier runs are replaced by those of this run
+    unprocessed_dir = output_dir / UNPROCESSED_DIR.name
+    shutil.rmtree(unprocessed_dir, ignore_errors=True)
+    owns_reader_pool = reader_pool is None and READER_ISOLATION
+    if owns_reader_pool:
+        reader_pool = ReaderPool()
+
+    def read_file(file_path):
+        if isinstance(file_path, ArchiveMember):
+            data = file_path.read_bytes()
+            return reader_pool.read_bytes(data, file_path.name) if reader_pool else read_bytes(data, file_path.name)
+        return reader_pool.read(file_path) if reader_pool else read_source_file(file_path)
+
+    def read_item(item):
+        if budget.exhausted():
+            # Files are not even read once the budget is spent
+            raise BudgetExhausted("The budget was spent")
+        if not isinstance(item, FileBatch):
+            return read_file(item)
+        # The files of a batch succeed or fail on their own: (content, error) per file
+        contents = []
+        for file_path in item.files:
+            try:
+                contents.append((read_file(file_path), None))
+            except Exception as e:
+                contents.append((None, e))
+        return contents
+    with open(combined_summary_file, 'w', encoding='utf-8') as combined_output:
+
+        def handle_summary(file_path: Path, result: Optional[tuple], error: Optional[Exception]):
+            nonlocal processed
+            processed += 1
+            summary = result[0] if result else None
+            if isinstance(error, BudgetExhausted):
+                deferred.append(file_path)
+                log_event("file_deferred", path=str(file_path))
+                metrics.increment("files_deferred")
+            elif error is not None:
+                logging.error("Error generating summary for file %s: %s", file_path, error)
+                if isinstance(error, ReaderError):
+                    metrics.increment(f"files_{error.reason}")
+                    record_unprocessed(file_path, file_path.relative_to(directory).as_posix(), unprocessed_dir, error)
+                log_event("file_failed", path=str(file_path), error=str(error),
+                          reason=getattr(error, 'reason', None))
+                metrics.increment("files_failed")
+            elif summary:
+                _, file_hash, response_info = result
+                if response_info.get("cached") is False:
+                    # Work the LLM did in this run; estimate.py projects run times from these counters
+                    metrics.increment("files_generated")
+                    metrics.increment("prompt_tokens", response_info.get("prompt_tokens") or 0)
+                    metrics.increment("completion_tokens", response_info.get("completion_tokens") or 0)
+                    metrics.increment("generation_seconds", response_info.get("llm_seconds") or 0)
+                store.put(
+                    repository, file_path.relative_to(directory).as_posix(), file_hash, summary,
+                    **{"model": summarization_model, **response_info},
+                )
+
+                # Stream the summary into the combined summary with the filename
+                entry = f"Filename: {file_path}\n{summary}\n"
+                combined_output.write(("\n" if combined_summary else "") + entry)
+                combined_output.flush()
+                combined_summary.append(entry)
+                metrics.increment("files_summarized")
             else:
-                logging.warning(f"No summary generated for {file_path}")
-        except Exception as e:
-            logging.error(f"Error generating summary for file {file_path}: {e}")
-            continue
+                logging.warning("No summary generated for %s", file_path)
+                log_event("file_empty", path=str(file_path))
+                metrics.increment("files_empty")
+
+            # Log progress in percentage, at INFO level only when it passes a whole percent
+            progress_percentage = (processed / total_files) * 100
+            level = logging.INFO if processed * 100 // total_files != (processed - 1) * 100 // total_files \
+                else logging.DEBUG
+            logging.log(level, "Progress: %.2f%% (%d/%d files processed)", progress_percentage, processed, total_files)
+            if progress_callback:
+                progress_callback(processed, total_files)
+
+        def handle_item(item, result: Optional[list], error: Optional[Exception]):
+            if not isinstance(item, FileBatch):
+                handle_summary(item, result, error)
+                return
+            for file_path, (file_result, file_error) in zip(item.files, result or [(None, error)] * len(item)):
+                handle_summary(file_path, file_result, file_error)
 
-        # Log progress in percentage
-        progress_percentage = (idx / total_files) * 100
-        logging.info(f"Progress: {progress_percentage:.2f}% ({idx}/{total_files} files processed)")
-
-    # Combine all summaries and save to combined_summary.txt
-    combined_summary_text = "\n".join(combined_summary)
-    combined_summary_file = OUTPUT_DIR / "combined_summary.txt"
-    save_output_to_file(combined_summary_text, combined_summary_file)
-    logging.info(f"Combined summary saved to {combined_summary_file}")
+        try:
+            run_pipeline(
+                items,
+                read_item,
+                process_item,
+                handle_item,
+                reader_workers=READER_WORKERS,
+                llm_workers=LLM_WORKERS,
+                queue_size=PIPELINE_QUEUE_SIZE,
+                metrics=metrics,
+            )
+        finally:
+            if owns_reader_pool:
+                reader_pool.close()
+
+    note = coverage_note(metrics)
+    if note:
+        # Mark the partial coverage at the top, where parse_combined_summary ignores it
+        save_output_to_file("\n".join([note + "\n", *combined_summary]), combined_summary_file)
+        logging.warning("Budget spent after %.0fs and %.0f tokens: %s files are left for the next run",
+                        budget.elapsed(), budget.spent_tokens, len(deferred))
+    save_pending_files(output_dir / PENDING_FILES_FILE.name, directory, deferred, scores)
+    logging.info("Combined summary saved to %s", combined_summary_file)
+    # Forget summaries of files that no longer exist in the repository
+    store.prune(repository, [f.relative_to(directory).as_posix() for f in relevant_files])
+    if EXPORT_LOOSE_SUMMARIES:
+        count = store.export_loose_files(output_dir / SUMMARIES_DIR.name, repository)
+        logging.info("Exported %s summaries to %s", count, output_dir / SUMMARIES_DIR.name)
+    store.close()
+    metrics.save(output_dir / RUN_METRICS_FILE.name, RUN_METRICS_HISTORY_FILE)
 
     # Combine all summaries and return
+    if note and combined_summary:
+        combined_summary.insert(0, note + "\n")
     return "\n".join(combined_summary)
@@ -0,0 +1,121 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from pathlib import Path
+from typing import Optional, Union
+from config import OUTPUT_DIR, LOG_LEVEL, CONSOLE_LOG_LEVEL, LOG_EVENTS
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_FILE_NAME = "script_run.log"
+EVENTS_FILE_NAME = "events.jsonl"
+
+# Logger for structured per-file events; its records only go to the JSONL event stream
+EVENTS_LOGGER_NAME = "insightcode.events"
+_events_logger = logging.getLogger(EVENTS_LOGGER_NAME)
+_events_logger.propagate = False
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _EventRecordFilter(logging.Filter):
+    """Pass only event records, or only regular records when `events` is False."""
+
+    def __init__(self, events: bool):
+        super().__init__()
+        self.events = events
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return hasattr(record, 'event_fields') == self.events
+
+
+class JsonlEventHandler(logging.FileHandler):
+    """Write event records as one JSON object per line."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            event = {"time": round(record.created, 3), "event": record.getMessage(), **record.event_fields}
+            self.stream.write(json.dumps(event, default=str) + "\n")
+            self.flush()
+        except Exception:
+            self.handleError(record)
+
+
+def _level_number(level: Union[str, int]) -> int:
+    return level if isinstance(level, int) else logging.getLevelName(level.upper())
+
+
+def configure_logging(log_dir: Path = OUTPUT_DIR, level: Union[str, int] = LOG_LEVEL,
+                      console_level: Union[str, int] = CONSOLE_LOG_LEVEL,
+                      events: bool = LOG_EVENTS) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a file handler, the console and the event stream.
+
+    Logging calls format the message on the calling thread (QueueHandler.prepare) and put
+    the record on an in-memory queue; a single listener thread does the writing, so
+    pipeline workers never wait for the disk or the terminal. Calling this again
+    replaces the previous configuration.
+    """
+    global _listener
+    stop_logging()
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    file_handler = logging.FileHandler(log_dir / LOG_FILE_NAME, mode="w", encoding="utf-8")
+    file_handler.setLevel(_level_number(level))
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(_level_number(console_level))
+    handlers = [file_handler, console_handler]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handler.addFilter(_EventRecordFilter(events=False))
+    if events:
+        event_handler = JsonlEventHandler(log_dir / EVENTS_FILE_NAME, mode="w", encoding="utf-8")
+        event_handler.addFilter(_EventRecordFilter(events=True))
+        handlers.append(event_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    # The root level is the lowest level any handler wants, so records nobody writes are dropped at the call site
+    root.setLevel(min(_level_number(level), _level_number(console_level)))
+
+    for handler in _events_logger.handlers[:]:
+        _events_logger.removeHandler(handler)
+    if events:
+        _events_logger.addHandler(queue_handler)
+        _events_logger.setLevel(logging.INFO)
+    else:
+        _events_logger.setLevel(logging.CRITICAL + 1)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Write out all queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def events_enabled() -> bool:
+    """Return True when structured events are being recorded."""
+    return _events_logger.isEnabledFor(logging.INFO) and bool(_events_logger.handlers)
+
+
+def log_event(event: str, **fields):
+    """Record a structured event, e.g. log_event("file_summarized", path=..., seconds=...)."""
+    if events_enabled():
+        _events_logger.info(event, extra={"event_fields": fields})
+
+
+atexit.register(stop_logging)
@@ -1,41 +1,44 @@
+import argparse
+import json
 import logging
 from pathlib import Path
-from config import (
-    OUTPUT_DIR,
-    DEFAULT_SUMMARIZATION_MODEL,
-    OUTPUT_FORMAT,
-    GENERATE_DIAGRAM,
-    DEFAULT_DIAGRAM_MODEL,
-    MAX_FIX_ATTEMPTS,
-)
-from helpers import generate_unique_filename, save_output_to_file
+from typing import Dict, Optional
+import config
+from config import OUTPUT_DIR, DEFAULT_DIAGRAM_MODEL, MODEL_ROUTING, ROUTING_SMALL_MODEL
+from helpers import generate_unique_filename, save_output_to_file, parse_combined_summary
 from file_readers import get_reader
 from diagram_generators import generate_diagram_prompt, generate_diagram_code
-from diagram_generators.renderer_factory import get_renderer
-from llm_interface import summarize_codebase, generate_response_with_llm, DIAGRAM_SYSTEM_PROMPT
+from diagram_generators.renderer_factory import get_renderer, start_renderer_in_background
+from diagram_generators.import_graph import generate_import_graph_diagram
+from diagram_generators.multi_view import generate_views
+from llm_interface import summarize_codebase, generate_response_with_llm, coverage_note, DIAGRAM_SYSTEM_PROMPT
+from llm_cache import template_version
+from model_manager import DiagramModelWarmUp, release_model
+from pipeline import RunMetrics
+from log_setup import configure_logging
 import re
 
-def configure_logging():
-    """Configure logging with a file handler and console output."""
-    log_dir = OUTPUT_DIR
-    log_file = log_dir / "script_run.log"
-
-    # Ensure the log directory exists
-    log_dir.mkdir(parents=True, exist_ok=True)
-
-    # Clear any existing logging handlers
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-
-    # Set up the logging configuration
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_file, mode="w"),  # File logging
-            logging.StreamHandler(),  # Console logging
-        ],
-    )
+# Settings from config.py that can be overridden per run (e.g. per repository in a batch)
+OVERRIDABLE_SETTINGS = [
+    'OUTPUT_FORMAT',
+    'DEFAULT_SUMMARIZATION_MODEL',
+    'DEFAULT_DIAGRAM_MODEL',
+    'GENERATE_DIAGRAM',
+    'MAX_FIX_ATTEMPTS',
+    'WARM_UP_DIAGRAM_MODEL',
+    'DIAGRAM_WARM_UP_AT_PROGRESS',
+    'RELEASE_SUMMARIZATION_MODEL',
+    'DIAGRAM_SOURCE',
+    'IMPORT_GRAPH_PACKAGE_DEPTH',
+    'IMPORT_GRAPH_MIN_EDGE_WEIGHT',
+    'IMPORT_GRAPH_LABEL_CLUSTERS',
+    'DIAGRAM_VIEWS',
+    'DIAGRAM_VIEW_MIN_FILES',
+    'DIAGRAM_MAX_VIEWS',
+    'DIAGRAM_VIEW_WORKERS',
+    'BUDGET_SECONDS',
+    'BUDGET_TOKENS',
+]
 
 def clean_diagram_code(diagram_code: str, diagram_type: str) -> str:
     """
@@ -61,10 +64,20 @@ def clean_diagram_code(diagram_code: str, diagram_type: str) -> str:
     
     return cleaned_code
 
-def fix_diagram_code_with_llm(diagram_code: str, error_message: str, diagram_type: str) -> str:
-    """Use LLM to fix the diagram code based on the error message."""
-    # Create a prompt to send to the LLM
-    prompt_template = """**Objective:**
+def add_diagram_title(diagram_code: str, diagram_type: str, title: str) -> str:
+    """Put a title above the diagram, such as the coverage note of a budgeted run, unless it is already there."""
+    if title in diagram_code:
+        return diagram_code
+    if diagram_type.lower() == 'plantuml':
+        lines = diagram_code.splitlines()
+        position = 1 if lines and lines[0].startswith('@start') else 0
+        return "\n".join(lines[:position] + [f"title {title}"] + lines[position:])
+    # Mermaid takes the title from YAML front matter; a JSON string is a valid YAML scalar
+    if diagram_code.startswith('---\n'):
+        return f"---\ntitle: {json.dumps(title)}\n{diagram_code[4:]}"
+    return f"---\ntitle: {json.dumps(title)}\n---\n{diagram_code}"
+
+FIX_DIAGRAM_PROMPT_TEMPLATE = """**Objective:**
 
 Based on the provided diagram code and the error message, fix the diagram code so that it renders correctly.
 
@@ -93,132 +106,278 @@ Based on the provided diagram code and the error message, fix the diagram code s
 Provide the corrected diagram code.
 """
 
-    prompt = prompt_template.format(diagram_code=diagram_code, error_message=error_message)
+def resolve_settings(overrides: Optional[Dict] = None) -> Dict:
+    """Return the overridable settings from config.py with `overrides` applied."""
+    overrides = overrides or {}
+    unknown = set(overrides) - set(OVERRIDABLE_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    settings = {name: getattr(config, name) for name in OVERRIDABLE_SETTINGS}
+    settings.update(overrides)
+    return settings
+
+def fix_diagram_code_with_llm(
+    diagram_code: str, error_message: str, diagram_type: str, model: str = DEFAULT_DIAGRAM_MODEL
+) -> str:
+    """Use LLM to fix the diagram code based on the error message."""
+    # Create a prompt to send to the LLM
+    prompt = FIX_DIAGRAM_PROMPT_TEMPLATE.format(diagram_code=diagram_code, error_message=error_message)
     # Use the LLM to generate the fixed diagram code
     fixed_diagram_code = generate_response_with_llm(
-        prompt, DIAGRAM_SYSTEM_PROMPT, model=DEFAULT_DIAGRAM_MODEL
+        prompt, DIAGRAM_SYSTEM_PROMPT, model=model,
+        prompt_version=template_version(FIX_DIAGRAM_PROMPT_TEMPLATE),
     )
     # Clean the fixed diagram code
     fixed_diagram_code = clean_diagram_code(fixed_diagram_code, diagram_type)
     return fixed_diagram_code.strip()
 
-def main():
-    """Main function to run the summarization and diagram generation process."""
-    # Step 1: Configure logging
-    configure_logging()
-
-    # Log when the script starts
-    logging.info("Script started.")
+def generate_import_graph_output(
+    repo_directory: Path, renderer, output_dir: Path = OUTPUT_DIR, settings: Optional[Dict] = None
+) -> bool:
+    """Generate the diagram from the repository's import graph and render it; no fix attempts are needed."""
+    settings = settings or resolve_settings()
+    output_format = settings['OUTPUT_FORMAT']
+    logging.info("Generating %s diagram from the import graph...", output_format)
+    label_model = settings['DEFAULT_SUMMARIZATION_MODEL'] if settings['IMPORT_GRAPH_LABEL_CLUSTERS'] else None
+    diagram_code = generate_import_graph_diagram(
+        repo_directory, output_format, settings['IMPORT_GRAPH_PACKAGE_DEPTH'],
+        settings['IMPORT_GRAPH_MIN_EDGE_WEIGHT'], label_model,
+    )
+    diagram_code_filepath = output_dir / f"{output_format}_import_graph.txt"
+    save_output_to_file(diagram_code, diagram_code_filepath)
+    logging.info("Import graph diagram code saved to %s", diagram_code_filepath)
 
     try:
-        # Step 2: Set repository directory path
-        repo_directory = Path("repo")  # Change to your repository path
-
-        # Step 3: Summarize the codebase
+        png_filepath = renderer.generate_png(diagram_code, output_dir)
+    except Exception as e:
+        logging.error("Failed to render the import graph diagram: %s", e)
+        return False
+    logging.info("Import graph diagram PNG generated and saved to %s.", png_filepath)
+    return True
+
+def generate_llm_diagram(
+    codebase_summary: str, renderer, output_dir: Path, settings: Dict, coverage: Optional[str] = None
+) -> bool:
+    """
+    Have the diagram model draw the architecture diagram, fixing the code with the LLM when rendering fails.
+    `coverage`, the coverage note of a budgeted run that left files undone, becomes the diagram's title.
+    """
+    output_format = settings['OUTPUT_FORMAT']
+    diagram_model = settings['DEFAULT_DIAGRAM_MODEL']
+    max_fix_attempts = settings['MAX_FIX_ATTEMPTS']
+
+    # Generate diagram prompt and save it
+    logging.info("Generating %s diagram prompt...", output_format)
+    diagram_prompt = generate_diagram_prompt(codebase_summary, output_format)
+
+    # Save the diagram prompt to a fixed filename in the output directory
+    prompt_filename = f"{output_format}_prompt.txt"
+    prompt_filepath = output_dir / prompt_filename
+    save_output_to_file(diagram_prompt, prompt_filepath)
+    logging.info("%s prompt saved to %s", output_format.capitalize(), prompt_filepath)
+
+    if renderer is None:
+        return False
+
+    logging.info("Generating %s diagram...", output_format)
+
+    # Generate the initial diagram code
+    diagram_code = generate_diagram_code(diagram_prompt, output_format, diagram_model)
+
+    # Clean the diagram code
+    diagram_code = clean_diagram_code(diagram_code, output_format)
+    if coverage:
+        diagram_code = add_diagram_title(diagram_code, output_format, coverage)
+
+    # Save the initial diagram code
+    diagram_code_filename = f"{output_format}_diagram.txt"
+    diagram_code_filepath = output_dir / diagram_code_filename
+    save_output_to_file(diagram_code, diagram_code_filepath)
+
+    attempt = 0
+    success = False
+    error_messages = []
+    diagram_codes = [diagram_code]
+
+    while attempt < max_fix_attempts and not success:
+        try:
+            # Try to render the diagram
+            png_filepath = renderer.generate_png(diagram_codes[-1], output_dir)
+            if png_filepath:
+                logging.info("%s diagram PNG generated and saved to %s.", output_format.capitalize(), png_filepath)
+                success = True
+            else:
+                logging.warning("Failed to generate %s diagram PNG.", output_format)
+                raise Exception("Rendering returned no PNG filepath.")
+        except Exception as e:
+            attempt += 1
+            error_message = str(e)
+            logging.error("Error during rendering attempt %s: %s", attempt, error_message)
+            error_messages.append(error_message)
+            if attempt < max_fix_attempts:
+                logging.info("Attempting to fix the diagram code using LLM (Attempt %s/%s)...", attempt, max_fix_attempts)
+
+                # Use LLM to fix the diagram code
+                fixed_diagram_code = fix_diagram_code_with_llm(
+                    diagram_codes[-1], error_message, output_format, diagram_model
+                )
+                if coverage:
+                    fixed_diagram_code = add_diagram_title(fixed_diagram_code, output_format, coverage)
+                diagram_codes.append(fixed_diagram_code)
+
+                # Save the fixed diagram code
+                fixed_diagram_code_filename = f"{output_format}_diagram_fixed_attempt_{attempt}.txt"
+                fixed_diagram_code_filepath = output_dir / fixed_diagram_code_filename
+                save_output_to_file(fixed_diagram_code, fixed_diagram_code_filepath)
+                logging.info("Fixed %s diagram code saved to %s", output_format, fixed_diagram_code_filepath)
+            else:
+                logging.error("Maximum number of fix attempts reached. Could not generate diagram.")
+                # Save error messages and diagram codes for debugging
+                debug_info = "\n\n".join(
+                    [
+                        f"Attempt {i}:\nError Message:\n{em}\n\nDiagram Code:\n{dc}"
+                        for i, (em, dc) in enumerate(zip(error_messages, diagram_codes), 1)
+                    ]
+                )
+                debug_info_filepath = output_dir / f"{output_format}_debug_info.txt"
+                save_output_to_file(debug_info, debug_info_filepath)
+                logging.info("Debug information saved to %s", debug_info_filepath)
+    if not success:
+        logging.error("Failed to generate diagram after all attempts.")
+    return success
+
+def generate_diagram_views(
+    codebase_summary: str, renderer, output_dir: Path, settings: Dict, coverage: Optional[str] = None
+) -> bool:
+    """
+    Draw an overview and one diagram per top-level package (DIAGRAM_VIEWS = 'multi'),
+    with an index page; codebases with a single package get the single diagram instead.
+    """
+    result = generate_views(
+        parse_combined_summary(codebase_summary), renderer, output_dir,
+        lambda summary, view_renderer, view_dir: generate_llm_diagram(
+            summary, view_renderer, view_dir, settings, coverage
+        ),
+        settings['OUTPUT_FORMAT'], settings['DEFAULT_DIAGRAM_MODEL'],
+        workers=settings['DIAGRAM_VIEW_WORKERS'], min_files=settings['DIAGRAM_VIEW_MIN_FILES'],
+        max_views=settings['DIAGRAM_MAX_VIEWS'], coverage=coverage,
+    )
+    if result is None:
+        return generate_llm_diagram(codebase_summary, renderer, output_dir, settings, coverage)
+    return result
+
+def run_analysis(
+    repo_directory: Path,
+    output_dir: Path = OUTPUT_DIR,
+    overrides: Optional[Dict] = None,
+    renderer=None,
+    reader_pool=None,
+) -> Dict:
+    """
+    Summarize one repository and generate its diagram, writing all output to `output_dir`.
+
+    `overrides` replaces settings from config.py for this run (see OVERRIDABLE_SETTINGS).
+    A `renderer` passed in is reused and left open, so several runs can share one browser
+    or rendering client; otherwise a renderer is created and closed here. A `reader_pool`
+    (reader_pool.ReaderPool) passed in is likewise shared and left open. Returns a report
+    with the run's status, diagram result, coverage note (None unless a budgeted run left
+    files undone) and metrics.
+    """
+    settings = resolve_settings(overrides)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    metrics = RunMetrics(labels={"repository": str(repo_directory)})
+    report = {
+        "repository": str(repo_directory), "output_dir": str(output_dir), "status": "ok", "diagram": None,
+        "coverage": None,
+    }
+
+    output_format = settings['OUTPUT_FORMAT']
+    summarization_model = settings['DEFAULT_SUMMARIZATION_MODEL']
+    diagram_model = settings['DEFAULT_DIAGRAM_MODEL']
+    owns_renderer = False
+    try:
+        # The diagram model is only needed when the LLM draws the diagram
+        use_diagram_model = settings['GENERATE_DIAGRAM'] and settings['DIAGRAM_SOURCE'] == 'llm'
+
+        if settings['GENERATE_DIAGRAM']:
+            if renderer is None:
+                renderer = get_renderer(output_format)
+                owns_renderer = True
+                if settings['DIAGRAM_SOURCE'] != 'import_graph':
+                    # Start the diagram renderer while the LLM is busy summarizing
+                    start_renderer_in_background(renderer)
+            if settings['DIAGRAM_SOURCE'] == 'import_graph':
+                # The import graph does not depend on the summaries, so render it first
+                report["diagram"] = generate_import_graph_output(repo_directory, renderer, output_dir, settings)
+
+        # Summarize the codebase, preloading the diagram model towards the end
         logging.info("Starting codebase summarization...")
-        codebase_summary = summarize_codebase(repo_directory, DEFAULT_SUMMARIZATION_MODEL)
-
-        # Step 4: Check if a summary was generated
+        warm_up = None
+        if use_diagram_model and settings['WARM_UP_DIAGRAM_MODEL'] and diagram_model != summarization_model:
+            warm_up = DiagramModelWarmUp(diagram_model, settings['DIAGRAM_WARM_UP_AT_PROGRESS'])
+        codebase_summary = summarize_codebase(
+            repo_directory, summarization_model, progress_callback=warm_up, output_dir=output_dir, metrics=metrics,
+            budget_seconds=settings['BUDGET_SECONDS'], budget_tokens=settings['BUDGET_TOKENS'],
+            reader_pool=reader_pool,
+        )
+        report["coverage"] = coverage_note(metrics)
+
+        # Free the memory held by the summarization model before the diagram model takes over
+        if use_diagram_model and settings['RELEASE_SUMMARIZATION_MODEL'] and diagram_model != summarization_model:
+            release_model(summarization_model)
+            if MODEL_ROUTING and ROUTING_SMALL_MODEL != diagram_model:
+                release_model(ROUTING_SMALL_MODEL)
+
+        # Check if a summary was generated
         if codebase_summary:
             logging.info("Codebase summary generated successfully.")
-
-            # Step 5: Generate diagram prompt and save it
-            logging.info(f"Generating {OUTPUT_FORMAT} diagram prompt...")
-            diagram_prompt = generate_diagram_prompt(codebase_summary)
-
-            # Save the diagram prompt to a fixed filename in the output directory
-            prompt_filename = f"{OUTPUT_FORMAT}_prompt.txt"
-            prompt_filepath = OUTPUT_DIR / prompt_filename
-            save_output_to_file(diagram_prompt, prompt_filepath)
-            logging.info(f"{OUTPUT_FORMAT.capitalize()} prompt saved to {prompt_filepath}")
-
-            # Step 6: Check if diagram generation is enabled
-            if GENERATE_DIAGRAM:
-                logging.info(f"Generating {OUTPUT_FORMAT} diagram...")
-
-                # Generate the initial diagram code
-                diagram_code = generate_diagram_code(diagram_prompt)
-
-                # Clean the diagram code
-                diagram_code = clean_diagram_code(diagram_code, OUTPUT_FORMAT)
-
-                # Save the initial diagram code
-                diagram_code_filename = f"{OUTPUT_FORMAT}_diagram.txt"
-                diagram_code_filepath = OUTPUT_DIR / diagram_code_filename
-                save_output_to_file(diagram_code, diagram_code_filepath)
-
-                # Get the appropriate renderer dynamically based on OUTPUT_FORMAT
-                renderer = get_renderer(OUTPUT_FORMAT)
-                attempt = 0
-                success = False
-                error_messages = []
-                diagram_codes = [diagram_code]
-
-                while attempt < MAX_FIX_ATTEMPTS and not success:
-                    try:
-                        # Try to render the diagram
-                        png_filepath = renderer.generate_png(diagram_codes[-1], OUTPUT_DIR)
-                        if png_filepath:
-                            logging.info(
-                                f"{OUTPUT_FORMAT.capitalize()} diagram PNG generated and saved to {png_filepath}."
-                            )
-                            success = True
-                        else:
-                            logging.warning(f"Failed to generate {OUTPUT_FORMAT} diagram PNG.")
-                            raise Exception("Rendering returned no PNG filepath.")
-                    except Exception as e:
-                        attempt += 1
-                        error_message = str(e)
-                        logging.error(f"Error during rendering attempt {attempt}: {error_message}")
-                        error_messages.append(error_message)
-                        if attempt < MAX_FIX_ATTEMPTS:
-                            logging.info(
-                                f"Attempting to fix the diagram code using LLM (Attempt {attempt}/{MAX_FIX_ATTEMPTS})..."
-                            )
-
-                            # Use LLM to fix the diagram code
-                            fixed_diagram_code = fix_diagram_code_with_llm(
-                                diagram_codes[-1], error_message, OUTPUT_FORMAT
-                            )
-                            diagram_codes.append(fixed_diagram_code)
-
-                            # Save the fixed diagram code
-                            fixed_diagram_code_filename = (
-                                f"{OUTPUT_FORMAT}_diagram_fixed_attempt_{attempt}.txt"
-                            )
-                            fixed_diagram_code_filepath = OUTPUT_DIR / fixed_diagram_code_filename
-                            save_output_to_file(
-                                fixed_diagram_code, fixed_diagram_code_filepath
-                            )
-                            logging.info(
-                                f"Fixed {OUTPUT_FORMAT} diagram code saved to {fixed_diagram_code_filepath}"
-                            )
-                        else:
-                            logging.error(
-                                "Maximum number of fix attempts reached. Could not generate diagram."
-                            )
-                            # Save error messages and diagram codes for debugging
-                            debug_info = "\n\n".join(
-                                [
-                                    f"Attempt {i}:\nError Message:\n{em}\n\nDiagram Code:\n{dc}"
-                                    for i, (em, dc) in enumerate(
-                                        zip(error_messages, diagram_codes), 1
-                                    )
-                                ]
-                            )
-                            debug_info_filepath = OUTPUT_DIR / f"{OUTPUT_FORMAT}_debug_info.txt"
-                            save_output_to_file(debug_info, debug_info_filepath)
-                            logging.info(f"Debug information saved to {debug_info_filepath}")
-                if not success:
-                    logging.error("Failed to generate diagram after all attempts.")
+            draw_diagram = generate_diagram_views if settings['DIAGRAM_VIEWS'] == 'multi' else generate_llm_diagram
+            if use_diagram_model:
+                report["diagram"] = draw_diagram(codebase_summary, renderer, output_dir, settings, report["coverage"])
             else:
-                logging.info("Diagram generation is disabled in the configuration.")
+                # Keep the prompt so the diagram can be drawn with an external LLM
+                draw_diagram(codebase_summary, None, output_dir, settings, report["coverage"])
+                if not settings['GENERATE_DIAGRAM']:
+                    logging.info("Diagram generation is disabled in the configuration.")
         else:
             logging.warning("No relevant files found or summarized.")
+            report["status"] = "no_files"
 
     except Exception as e:
         # Log any unexpected errors
-        logging.error(f"An error occurred: {e}")
+        logging.error("An error occurred while analyzing %s: %s", repo_directory, e)
+        report["status"] = "failed"
+        report["error"] = str(e)
+
+    finally:
+        if owns_renderer and renderer is not None:
+            renderer.close()
+
+    report["metrics"] = metrics.to_dict()
+    return report
+
+def main():
+    """Main function to run the summarization and diagram generation process."""
+    parser = argparse.ArgumentParser(description="Summarize a repository and generate its architecture diagram.")
+    parser.add_argument("repo", type=Path, nargs='?', default=Path("repo"), help="Repository to analyze.")
+    parser.add_argument("--budget-seconds", type=float,
+                        help="Summarize the most important files first and stop after this many seconds.")
+    parser.add_argument("--budget-tokens", type=int,
+                        help="Summarize the most important files first and stop after this many LLM tokens.")
+    args = parser.parse_args()
+
+    # Configure logging
+    configure_logging()
+
+    # Log when the script starts
+    logging.info("Script started.")
+
+    overrides = {}
+    if args.budget_seconds is not None:
+        overrides['BUDGET_SECONDS'] = args.budget_seconds
+    if args.budget_tokens is not None:
+        overrides['BUDGET_TOKENS'] = args.budget_tokens
+    run_analysis(args.repo, overrides=overrides)
 
     # Log when the script ends
     logging.info("Script finished.")
@@ -0,0 +1,97 @@
+import json
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+import requests
+from config import OLLAMA_URLS, MODEL_PROFILES, DEFAULT_MODEL_PROFILE, LLM_CONNECT_TIMEOUT, LLM_FIRST_TOKEN_TIMEOUT
+from llm_client import get_session
+
+# Profile keys that are sent at the top level of an Ollama request instead of in "options"
+TOP_LEVEL_PROFILE_KEYS = ['keep_alive']
+
+
+def get_model_profile(model: str) -> Dict:
+    """Return the generation profile for a model, falling back to the default profile."""
+    profile = dict(DEFAULT_MODEL_PROFILE)
+    profile.update(MODEL_PROFILES.get(model, {}))
+    return profile
+
+
+def build_generation_settings(model: str) -> Tuple[Dict, Optional[object]]:
+    """Split a model profile into Ollama generation options and the keep-alive setting."""
+    profile = get_model_profile(model)
+    options = {key: value for key, value in profile.items() if key not in TOP_LEVEL_PROFILE_KEYS}
+    return options, profile.get('keep_alive')
+
+
+def apply_model_profile(payload: Dict) -> Dict:
+    """Add the options and keep-alive from the model's profile to an Ollama request payload."""
+    options, keep_alive = build_generation_settings(payload['model'])
+    if options:
+        payload['options'] = options
+    if keep_alive is not None:
+        payload['keep_alive'] = keep_alive
+    return payload
+
+
+def _post_to_all_servers(payload: dict, action: str) -> bool:
+    """Send a non-streaming request to every configured server; return True if all of them succeeded."""
+    succeeded = True
+    for url in OLLAMA_URLS:
+        try:
+            response = get_session().post(
+                url, data=json.dumps(payload), headers={'Content-Type': 'application/json'},
+                timeout=(LLM_CONNECT_TIMEOUT, LLM_FIRST_TOKEN_TIMEOUT),
+            )
+            if response.status_code != 200:
+                logging.warning("%s failed on %s: HTTP %s", action, url, response.status_code)
+                succeeded = False
+        except requests.RequestException as e:
+            logging.warning("%s failed on %s: %s", action, url, e)
+            succeeded = False
+    return succeeded
+
+
+def warm_up_model(model: str) -> bool:
+    """
+    Load a model into Ollama's memory without generating anything.
+
+    The request carries the model's profile, because Ollama reloads a model when it is
+    later called with a different context size. With several servers configured, the
+    model is loaded on each of them, so that any of them can take a request.
+    """
+    payload = apply_model_profile({"model": model, "prompt": "", "stream": False})
+    logging.info("Warming up model '%s'...", model)
+    if not _post_to_all_servers(payload, f"Warm-up of model '{model}'"):
+        return False
+    logging.info("Model '%s' is loaded.", model)
+    return True
+
+
+def warm_up_in_background(model: str) -> threading.Thread:
+    """Start loading a model from a daemon thread and return the thread."""
+    thread = threading.Thread(target=warm_up_model, args=(model,), name=f"warm-up-{model}", daemon=True)
+    thread.start()
+    return thread
+
+
+def release_model(model: str) -> bool:
+    """Ask Ollama to unload a model immediately to free memory."""
+    payload = {"model": model, "keep_alive": 0}
+    if not _post_to_all_servers(payload, f"Releasing model '{model}'"):
+        return False
+    logging.info("Model '%s' released.", model)
+    return True
+
+
+class DiagramModelWarmUp:
+    """Progress callback that starts warming up the diagram model once summarization is far enough along."""
+
+    def __init__(self, model: str, at_progress: float):
+        self.model = model
+        self.at_progress = at_progress
+        self.thread = None
+
+    def __call__(self, processed: int, total: int):
+        if self.thread is None and total and processed / total >= self.at_progress:
+            self.thread = warm_up_in_background(self.model)
@@ -0,0 +1,193 @@
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Marker placed on a queue to tell the consuming stage that no more work will arrive
+_END_OF_STREAM = object()
+
+
+class RunMetrics:
+    """Thread-safe counters and stage timings for one run."""
+
+    def __init__(self, labels: Optional[Dict[str, str]] = None):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.finished_at = None
+        self.counters: Dict[str, float] = {}
+        # Descriptive fields written with the metrics, such as the repository
+        self.labels: Dict[str, str] = dict(labels or {})
+
+    def increment(self, name: str, amount: float = 1):
+        """Add an amount to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self) -> Dict:
+        """Return the metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            finished_at = self.finished_at or time.time()
+            return {
+                **self.labels,
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+                "wall_seconds": round(finished_at - self.started_at, 3),
+                **{name: round(value, 3) for name, value in sorted(self.counters.items())},
+            }
+
+    def save(self, metrics_file: Path, history_file: Optional[Path] = None):
+        """Write the metrics to a JSON file and optionally append them to a JSON Lines history."""
+        self.finished_at = self.finished_at or time.time()
+        data = self.to_dict()
+        metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(metrics_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        if history_file is not None:
+            history_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(data) + "\n")
+
+
+class BudgetExhausted(Exception):
+    """Raised for the items of a run that are left undone because its budget is spent."""
+
+
+class RunBudget:
+    """Thread-safe wall-clock and token limits of a run; a limit of None is no limit."""
+
+    def __init__(self, seconds: Optional[float] = None, tokens: Optional[int] = None):
+        self._lock = threading.Lock()
+        self.seconds = seconds
+        self.tokens = tokens
+        self.started = time.monotonic()
+        self.spent_tokens = 0
+
+    def __bool__(self) -> bool:
+        return self.seconds is not None or self.tokens is not None
+
+    def spend(self, tokens: int):
+        """Record tokens the LLM processed."""
+        with self._lock:
+            self.spent_tokens += tokens
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def exhausted(self) -> bool:
+        """Return True once either limit is reached; work already started is allowed to finish."""
+        with self._lock:
+            return (self.seconds is not None and self.elapsed() >= self.seconds) or \
+                (self.tokens is not None and self.spent_tokens >= self.tokens)
+
+
+def run_pipeline(
+    items: Iterable[Any],
+    read_item: Callable[[Any], Any],
+    process_item: Callable[[Any, Any], Any],
+    handle_result: Callable[[Any, Any, Optional[Exception]], None],
+    reader_workers: int = 4,
+    llm_workers: int = 1,
+    queue_size: int = 16,
+    metrics: Optional[RunMetrics] = None,
+):
+    """
+    Run items through a read stage and an LLM stage with bounded queues between them.
+
+    Reader threads call `read_item(item)` and stay ahead of the LLM threads, which call
+    `process_item(item, content)`. `handle_result(item, result, error)` runs on the
+    calling thread, once per item and in the original item order, as soon as each
+    result and all results before it are available. `error` is the exception raised by
+    either stage, in which case `result` is None.
+
+    The queues hold at most `queue_size` items each, so a slow LLM stage stops the
+    readers instead of letting extracted content pile up in memory.
+    """
+    metrics = metrics or RunMetrics()
+    work_queue = queue.Queue()
+    read_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+
+    item_count = 0
+    for index, item in enumerate(items):
+        work_queue.put((index, item))
+        item_count += 1
+    for _ in range(reader_workers):
+        work_queue.put(_END_OF_STREAM)
+
+    def put_unless_stopped(target: queue.Queue, entry) -> bool:
+        # Block on a full queue, but give up when the run is being aborted
+        while not stop_event.is_set():
+            try:
+                target.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader_loop():
+        while True:
+            entry = work_queue.get()
+            if entry is _END_OF_STREAM or stop_event.is_set():
+                return
+            index, item = entry
+            started = time.perf_counter()
+            try:
+                content, error = read_item(item), None
+            except Exception as e:
+                content, error = None, e
+            metrics.increment("read_seconds", time.perf_counter() - started)
+            if not put_unless_stopped(read_queue, (index, item, content, error)):
+                return
+
+    def llm_loop():
+        while True:
+            entry = read_queue.get()
+            if entry is _END_OF_STREAM:
+                return
+            index, item, content, error = entry
+            result = None
+            if error is None:
+                started = time.perf_counter()
+                try:
+                    result = process_item(item, content)
+                except Exception as e:
+                    error = e
+                metrics.increment("llm_seconds", time.perf_counter() - started)
+            if not put_unless_stopped(result_queue, (index, item, result, error)):
+                return
+
+    def close_stage(threads, target: queue.Queue, consumers: int):
+        # Signal the next stage once every thread of this stage has finished
+        for thread in threads:
+            thread.join()
+        for _ in range(consumers):
+            put_unless_stopped(target, _END_OF_STREAM)
+
+    readers = [threading.Thread(target=reader_loop, name=f"reader-{i}", daemon=True) for i in range(reader_workers)]
+    llm_threads = [threading.Thread(target=llm_loop, name=f"llm-{i}", daemon=True) for i in range(llm_workers)]
+    closers = [
+        threading.Thread(target=close_stage, args=(readers, read_queue, llm_workers), daemon=True),
+        threading.Thread(target=close_stage, args=(llm_threads, result_queue, 1), daemon=True),
+    ]
+    for thread in readers + llm_threads + closers:
+        thread.start()
+
+    # Hand results to the caller in item order, buffering those that finish early
+    pending = {}
+    next_index = 0
+    try:
+        while next_index < item_count:
+            entry = result_queue.get()
+            if entry is _END_OF_STREAM:
+                break
+            index, item, result, error = entry
+            pending[index] = (item, result, error)
+            while next_index in pending:
+                handle_result(*pending.pop(next_index))
+                next_index += 1
+    finally:
+        stop_event.set()
+    metrics.increment("pipeline_items", next_index)
@@ -0,0 +1,385 @@
+import argparse
+import json
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import (
+    OUTPUT_DIR,
+    QA_MODEL,
+    QA_INDEX_FILE,
+    QA_TOP_K,
+    QA_CONTEXT_TOKEN_BUDGET,
+    QA_CODE_CHUNK_LINES,
+)
+from helpers import estimate_tokens, read_combined_summary
+from llm_cache import content_hash, template_version
+from summary_store import SummaryStore
+
+INDEX_FORMAT_VERSION = 2
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'does', 'do', 'for', 'from', 'how', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where', 'which', 'who', 'why',
+    'with', 'file', 'files', 'code',
+}
+WORD_PATTERN = re.compile(r'[A-Za-z0-9_]+')
+CAMEL_CASE_PATTERN = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+
+QA_SYSTEM_PROMPT = """You answer questions about a software codebase using only the provided context, which consists of file summaries and code excerpts. Name the files your answer is based on. If the context does not contain the answer, say so."""
+
+QA_PROMPT_TEMPLATE = """**Context:**
+
+{context}
+
+---
+
+**Question:** {question}
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms, also splitting camelCase and snake_case identifiers."""
+    terms = []
+    for word in WORD_PATTERN.findall(text):
+        parts = [p for p in re.split(r'_+', word) if p]
+        sub_terms = [s.lower() for part in parts for s in CAMEL_CASE_PATTERN.findall(part)]
+        if len(sub_terms) > 1:
+            terms.append(word.lower())
+        terms.extend(sub_terms)
+    return [fold_plural(term) for term in terms if term not in STOPWORDS and len(term) > 1]
+
+
+def fold_plural(term: str) -> str:
+    """Reduce simple English plurals to their singular so 'handlers' matches 'handler'."""
+    if len(term) > 4 and term.endswith('ies'):
+        return term[:-3] + 'y'
+    if len(term) > 3 and term.endswith('s') and not term.endswith(('ss', 'us', 'is')):
+        return term[:-1]
+    return term
+
+
+class BM25Index:
+    """Persistent inverted index over summaries and code chunks, ranked with BM25."""
+
+    def __init__(self):
+        # doc_id -> {"path", "kind", "hash", "text", "length", "tf"}
+        self.docs: Dict[str, dict] = {}
+        self.df: Dict[str, int] = defaultdict(int)
+        self.total_length = 0
+        # Source files of code documents: file -> {"stamp": [mtime_ns, size], "doc_ids": [...]}
+        self.files: Dict[str, dict] = {}
+        self._postings: Optional[Dict[str, List[str]]] = None
+
+    @classmethod
+    def load(cls, index_file: Path) -> 'BM25Index':
+        """Load an index from disk, or return an empty index if there is none or it is outdated."""
+        index = cls()
+        if not index_file.exists():
+            return index
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning("Could not load Q&A index %s, rebuilding it: %s", index_file, e)
+            return index
+        if data.get("version") != INDEX_FORMAT_VERSION:
+            return index
+        index.docs = data["docs"]
+        index.df = defaultdict(int, data["df"])
+        index.total_length = data["total_length"]
+        index.files = data["files"]
+        return index
+
+    def save(self, index_file: Path):
+        """Write the index to disk."""
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(index_file, 'w', encoding='utf-8') as f:
+            json.dump(
+                {"version": INDEX_FORMAT_VERSION, "docs": self.docs, "df": self.df, "total_length": self.total_length,
+                 "files": self.files},
+                f,
+            )
+
+    def _add(self, doc_id: str, path: str, kind: str, text: str, text_hash: str):
+        tf = Counter(tokenize(f"{path}\n{text}"))
+        self.docs[doc_id] = {
+            "path": path, "kind": kind, "hash": text_hash, "text": text,
+            "length": sum(tf.values()), "tf": dict(tf),
+        }
+        for term in tf:
+            self.df[term] += 1
+        self.total_length += self.docs[doc_id]["length"]
+
+    def _remove(self, doc_id: str):
+        doc = self.docs.pop(doc_id)
+        for term in doc["tf"]:
+            self.df[term] -= 1
+            if self.df[term] <= 0:
+                del self.df[term]
+        self.total_length -= doc["length"]
+
+    def update(self, documents: Dict[str, Tuple[str, str]], kind: str) -> Tuple[int, int]:
+        """
+        Bring the documents of one kind in line with `documents` (doc_id -> (path, text)).
+
+        Only new and changed documents are tokenized; documents of this kind that are
+        no longer present are removed. Returns the number of added or changed and of
+        removed documents.
+        """
+        removed = 0
+        for doc_id in [d for d, doc in self.docs.items() if doc["kind"] == kind and d not in documents]:
+            self._remove(doc_id)
+            removed += 1
+        changed = self._upsert(documents, kind)
+        if changed or removed:
+            self._postings = None
+        return changed, removed
+
+    def _upsert(self, documents: Dict[str, Tuple[str, str]], kind: str) -> int:
+        changed = 0
+        for doc_id, (path, text) in documents.items():
+            text_hash = content_hash(text)
+            existing = self.docs.get(doc_id)
+            if existing is not None and existing["hash"] == text_hash:
+                continue
+            if existing is not None:
+                self._remove(doc_id)
+            self._add(doc_id, path, kind, text, text_hash)
+            changed += 1
+        return changed
+
+    def update_file(self, file_key: str, stamp: List[int], documents: Dict[str, Tuple[str, str]],
+                    kind: str) -> Tuple[int, int]:
+        """
+        Replace the documents read from one source file and remember the file's stamp
+        (modification time and size), so an unchanged file need not be read again.
+        Returns the number of added or changed and of removed documents.
+        """
+        removed = self.remove_file(file_key, keep=documents)
+        changed = self._upsert(documents, kind)
+        self.files[file_key] = {"stamp": stamp, "doc_ids": list(documents)}
+        if changed:
+            self._postings = None
+        return changed, removed
+
+    def remove_file(self, file_key: str, keep: Iterable[str] = ()) -> int:
+        """Remove the documents read from a source file, except those in `keep`; returns how many were removed."""
+        keep = set(keep)
+        removed = 0
+        for doc_id in self.files.pop(file_key, {}).get("doc_ids", []):
+            if doc_id in self.docs and doc_id not in keep:
+                self._remove(doc_id)
+                removed += 1
+        if removed:
+            self._postings = None
+        return removed
+
+    def search(self, query: str, top_k: int = QA_TOP_K) -> List[Tuple[float, dict]]:
+        """Return up to `top_k` (score, document) pairs for a query, best first."""
+        if not self.docs:
+            return []
+        if self._postings is None:
+            self._postings = defaultdict(list)
+            for doc_id, doc in self.docs.items():
+                for term in doc["tf"]:
+                    self._postings[term].append(doc_id)
+
+        doc_count = len(self.docs)
+        average_length = self.total_length / doc_count if doc_count else 0
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            document_frequency = self.df[term]
+            idf = math.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            for doc_id in postings:
+                doc = self.docs[doc_id]
+                frequency = doc["tf"][term]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc["length"] / (average_length or 1))
+                scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, self.docs[doc_id]) for doc_id, score in ranked]
+
+
+def load_summary_documents(combined_summary_file: Path, repository: Optional[str] = None) -> Dict[str, Tuple[str, str]]:
+    """
+    Return one document per summarized file: the latest summaries from the summary
+    store, only those of `repository` if given, or the entries of the combined summary
+    when the store has none.
+    """
+    store = SummaryStore()
+    try:
+        documents = {}
+        for record in store.iter_latest(repository):
+            path = str(Path(record["repository"]) / PurePosixPath(record["source_path"]))
+            documents[f"summary:{path}"] = (path, record["summary"])
+    finally:
+        store.close()
+    if documents:
+        return documents
+    return {
+        f"summary:{path}": (path, summary) for path, summary in read_combined_summary(combined_summary_file).items()
+    }
+
+
+def file_stamp(file_path) -> List[int]:
+    """Return the modification time and size of a file, or for an archive member those of its archive and its size."""
+    from archive_source import ArchiveMember
+
+    if isinstance(file_path, ArchiveMember):
+        return [file_path.archive.stat().st_mtime_ns, file_path.size]
+    stat = file_path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def chunk_code_documents(file_path, content: str, chunk_lines: int = QA_CODE_CHUNK_LINES) -> Dict[str, Tuple[str, str]]:
+    """Split the content of a file into documents of `chunk_lines` lines."""
+    documents = {}
+    lines = content.splitlines()
+    for start in range(0, len(lines), chunk_lines):
+        end = min(start + chunk_lines, len(lines))
+        documents[f"code:{file_path}:{start + 1}"] = (
+            f"{file_path} (lines {start + 1}-{end})", "\n".join(lines[start:end])
+        )
+    return documents
+
+
+def update_code_documents(index: BM25Index, repo_directory: Path,
+                          chunk_lines: int = QA_CODE_CHUNK_LINES) -> Tuple[int, int, int]:
+    """
+    Index chunks of the files a summarization run would summarize (llm_interface.collect_files).
+
+    Only files whose modification time or size changed since they were indexed are read
+    again; documents of files that are gone are removed. Returns the number of added or
+    changed documents, of removed documents and of files read.
+    """
+    from archive_source import ArchiveMember
+    from file_readers import read_bytes
+    from llm_interface import collect_files, read_source_file
+
+    relevant_files, _ = collect_files(repo_directory)
+    current = {str(file_path): file_path for file_path in relevant_files}
+    changed = removed = files_read = 0
+    for file_key in [key for key in index.files if key not in current]:
+        removed += index.remove_file(file_key)
+    for file_key, file_path in sorted(current.items()):
+        stamp = file_stamp(file_path)
+        if index.files.get(file_key, {}).get("stamp") == stamp:
+            continue
+        try:
+            if isinstance(file_path, ArchiveMember):
+                content = read_bytes(file_path.read_bytes(), file_path.name)
+            else:
+                content = read_source_file(file_path)
+        except Exception as e:
+            logging.warning("Could not read %s for the Q&A index: %s", file_path, e)
+            continue
+        files_read += 1
+        file_changed, file_removed = index.update_file(
+            file_key, stamp, chunk_code_documents(file_key, content, chunk_lines), "code"
+        )
+        changed, removed = changed + file_changed, removed + file_removed
+    return changed, removed, files_read
+
+
+def refresh_index(index_file: Path = QA_INDEX_FILE, repo_directory: Optional[Path] = None,
+                  repository: Optional[str] = None, output_dir: Path = OUTPUT_DIR) -> BM25Index:
+    """
+    Load the index and incrementally update it from the summaries of `repository` (all
+    repositories if None) or the combined summary in `output_dir` and, if a repo is
+    given, from the repository's files that changed since they were indexed.
+    """
+    index = BM25Index.load(index_file)
+    summaries = load_summary_documents(output_dir / "combined_summary.txt", repository)
+    changed, removed = index.update(summaries, "summary")
+    files_read = 0
+    if repo_directory is not None:
+        code_changed, code_removed, files_read = update_code_documents(index, repo_directory)
+        changed, removed = changed + code_changed, removed + code_removed
+    if changed or removed or files_read:
+        index.save(index_file)
+    logging.info("Q&A index: %s documents (%s updated, %s removed)", len(index.docs), changed, removed)
+    return index
+
+
+def select_context(results: Iterable[Tuple[float, dict]], token_budget: int) -> List[dict]:
+    """Take the best results in order until the token budget is used up."""
+    selected = []
+    used = 0
+    for _, doc in results:
+        tokens = estimate_tokens(doc["text"]) + estimate_tokens(doc["path"]) + 4
+        if used + tokens > token_budget:
+            continue
+        selected.append(doc)
+        used += tokens
+    return selected
+
+
+def build_qa_prompt(question: str, documents: List[dict]) -> str:
+    """Build the question prompt from the selected documents."""
+    context = "\n\n".join(
+        f"[{'Summary' if doc['kind'] == 'summary' else 'Code'}] {doc['path']}\n{doc['text']}" for doc in documents
+    )
+    return QA_PROMPT_TEMPLATE.format(context=context, question=question)
+
+
+def answer_question(question: str, top_k: int = QA_TOP_K, token_budget: int = QA_CONTEXT_TOKEN_BUDGET,
+                    repo_directory: Optional[Path] = None, model: str = QA_MODEL,
+                    repository: Optional[str] = None, output_dir: Path = OUTPUT_DIR) -> Tuple[str, List[dict]]:
+    """Answer a question from the most relevant summaries; returns the answer and the documents used."""
+    from llm_interface import generate_response_with_llm
+
+    index = refresh_index(output_dir / QA_INDEX_FILE.name, repo_directory, repository, output_dir)
+    documents = select_context(index.search(question, top_k), token_budget)
+    if not documents:
+        return "No relevant summaries found. Run main.py first to summarize the codebase.", []
+    prompt = build_qa_prompt(question, documents)
+    answer = generate_response_with_llm(
+        prompt, QA_SYSTEM_PROMPT, model, prompt_version=template_version(QA_PROMPT_TEMPLATE)
+    )
+    return answer, documents
+
+
+def main():
+    """Command line entry point for asking questions about the analyzed codebase."""
+    parser = argparse.ArgumentParser(description="Ask questions about the summarized codebase.")
+    parser.add_argument("question", help="The question to ask.")
+    parser.add_argument("--top-k", type=int, default=QA_TOP_K, help="Number of documents to retrieve.")
+    parser.add_argument("--budget", type=int, default=QA_CONTEXT_TOKEN_BUDGET, help="Token budget for the context.")
+    parser.add_argument("--include-code", type=Path, metavar="REPO",
+                        help="Also index chunks of the raw files in this repository.")
+    parser.add_argument("--repository", type=Path,
+                        help="Only use the summaries of this repository, given as it was passed to main.py.")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR,
+                        help="Output directory of the run that holds the combined summary and the index.")
+    parser.add_argument("--retrieve-only", action="store_true",
+                        help="Only print the retrieved documents, without calling the LLM.")
+    args = parser.parse_args()
+    repository = str(args.repository) if args.repository is not None else None
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.retrieve_only:
+        index = refresh_index(args.output_dir / QA_INDEX_FILE.name, args.include_code, repository, args.output_dir)
+        for score, doc in index.search(args.question, args.top_k):
+            print(f"{score:7.3f}  {doc['path']}")
+        return
+
+    answer, documents = answer_question(args.question, args.top_k, args.budget, args.include_code,
+                                        repository=repository, output_dir=args.output_dir)
+    print(answer)
+    if documents:
+        print("\nSources:")
+        for doc in documents:
+            print(f"- {doc['path']}")
+
+
+if __name__ == "__main__":
+    main()
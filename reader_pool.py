@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from file_readers import get_reader, is_text_reader
+from file_readers.text_reader import decode_bytes
+from config import (
+    READER_WORKERS,
+    READER_TIMEOUT_SECONDS,
+    READER_MAX_RSS_MB,
+    READER_MAX_FILES_PER_WORKER,
+)
+
+UNPROCESSED_LIST_NAME = "unprocessed.jsonl"
+# Seconds between checks of a busy reader process's time and memory use
+POLL_SECONDS = 0.2
+
+
+class ReaderError(Exception):
+    """Extracting a file in a reader process failed; `reason` names the kind of failure for the metrics."""
+    reason = "read_failed"
+
+
+class ReaderTimeout(ReaderError):
+    reason = "read_timeout"
+
+
+class ReaderMemoryExceeded(ReaderError):
+    reason = "read_memory"
+
+
+class ReaderCrashed(ReaderError):
+    reason = "read_crashed"
+
+
+def process_rss_bytes(pid: int) -> int:
+    """Return the resident memory of a process, or 0 where it cannot be read (only Linux is supported)."""
+    try:
+        with open(f"/proc/{pid}/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+class _ReaderProcess:
+    """One reader subprocess, reading requests and answering with JSON lines."""
+
+    def __init__(self):
+        self.files_read = 0
+        self.process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve())],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding='utf-8',
+            # A session of its own, so OCR tools started by a reader are killed together with it
+            start_new_session=hasattr(os, 'killpg'),
+        )
+        self._responses = queue.Queue()
+        self._stdout_thread = threading.Thread(target=self._read_responses, name="reader-process-output", daemon=True)
+        self._stdout_thread.start()
+
+    def _read_responses(self):
+        for line in self.process.stdout:
+            self._responses.put(line)
+        self._responses.put(None)
+
+    def read(self, file_path: Path, timeout: float, max_rss_bytes: int) -> str:
+        """Extract a file in the subprocess; raises a ReaderError and kills the process when a limit is hit."""
+        self.files_read += 1
+        try:
+            self.process.stdin.write(json.dumps({"path": str(file_path)}) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            self.kill()
+            raise ReaderCrashed(f"Reader process is gone: {e}")
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self._responses.get(timeout=POLL_SECONDS)
+                break
+            except queue.Empty:
+                pass
+            if time.monotonic() > deadline:
+                self.kill()
+                raise ReaderTimeout(f"Reading took longer than {timeout}s")
+            rss = process_rss_bytes(self.process.pid)
+            if max_rss_bytes and rss > max_rss_bytes:
+                self.kill()
+                raise ReaderMemoryExceeded(f"Reader used {rss // (1024 * 1024)} MB, more than "
+                                           f"{max_rss_bytes // (1024 * 1024)} MB")
+
+        if line is None:
+            self.kill()
+            raise ReaderCrashed(f"Reader process exited with code {self.process.wait()}")
+        response = json.loads(line)
+        if "error" in response:
+            raise ReaderError(response["error"])
+        return response["text"]
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self):
+        """Kill the process and anything it started."""
+        if self.process.poll() is None:
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                else:
+                    self.process.kill()
+            except OSError:
+                self.process.kill()
+        self.process.wait()
+
+    def stop(self):
+        """Ask the process to exit, killing it if it does not."""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+class ReaderPool:
+    """
+    Extract files with the registered readers in subprocesses, so that a reader that
+    hangs, leaks or crashes on one file cannot stall or take down the run.
+
+    Each read is limited to `timeout` seconds and `max_rss_mb` of resident memory
+    (checked on Linux); a process that exceeds a limit is killed and replaced. Processes
+    are also replaced after `max_files_per_worker` files to contain slow leaks. Plain
+    text files are read in the calling thread, as their reader cannot hang. `read` is
+    safe to call from several threads; at most `workers` processes run at a time.
+    """
+
+    def __init__(self, workers: int = READER_WORKERS, timeout: float = READER_TIMEOUT_SECONDS,
+                 max_rss_mb: Optional[int] = READER_MAX_RSS_MB,
+                 max_files_per_worker: int = READER_MAX_FILES_PER_WORKER):
+        self.timeout = timeout
+        self.max_rss_bytes = (max_rss_mb or 0) * 1024 * 1024
+        self.max_files_per_worker = max_files_per_worker
+        # Idle processes; None stands for a process that has not been started yet
+        self._idle = queue.Queue()
+        for _ in range(max(workers, 1)):
+            self._idle.put(None)
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def read(self, file_path: Path) -> str:
+        """Return the text of a file, raising a ReaderError when it cannot be extracted."""
+        reader = get_reader(file_path.suffix)
+        if is_text_reader(reader):
+            return reader(file_path)
+
+        process = self._idle.get()
+        try:
+            if process is None or not process.alive:
+                process = self._start_process()
+            return process.read(file_path, self.timeout, self.max_rss_bytes)
+        finally:
+            if process is not None and (not process.alive or process.files_read >= self.max_files_per_worker):
+                self._retire(process)
+                process = None
+            self._idle.put(process)
+
+    def read_bytes(self, data: bytes, file_name: str) -> str:
+        """Return the text of a file given as raw bytes, such as an archive member."""
+        file_extension = Path(file_name).suffix
+        if is_text_reader(get_reader(file_extension)):
+            return decode_bytes(data)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir) / f"member{file_extension}"
+            temp_path.write_bytes(data)
+            return self.read(temp_path)
+
+    def _start_process(self) -> _ReaderProcess:
+        process = _ReaderProcess()
+        with self._lock:
+            self._processes.add(process)
+        return process
+
+    def _retire(self, process: _ReaderProcess):
+        with self._lock:
+            self._processes.discard(process)
+        process.stop()
+
+    def close(self):
+        """Stop all reader processes."""
+        with self._lock:
+            processes = list(self._processes)
+            self._processes.clear()
+        for process in processes:
+            process.stop()
+
+
+def record_unprocessed(file_path, relative_path: str, unprocessed_dir: Path, error: Exception):
+    """Copy a file that could not be read to `unprocessed_dir` and add the reason to its list of such files."""
+    target = unprocessed_dir / relative_path
+    try:
+        if not target.resolve().is_relative_to(unprocessed_dir.resolve()):
+            raise OSError(f"{relative_path} is outside {unprocessed_dir}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(file_path, Path):
+            shutil.copy2(file_path, target)
+        else:
+            # Archive members are written out from the archive
+            target.write_bytes(file_path.read_bytes())
+    except OSError as e:
+        logging.warning("Could not copy unprocessed file %s: %s", file_path, e)
+    unprocessed_dir.mkdir(parents=True, exist_ok=True)
+    entry = {"path": relative_path, "reason": getattr(error, 'reason', ReaderError.reason), "error": str(error)}
+    with open(unprocessed_dir / UNPROCESSED_LIST_NAME, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def serve():
+    """Reader process loop: read {"path": ...} requests from stdin and answer each with one JSON line."""
+    # Keep the original stdout for the answers; anything readers print goes to stderr instead
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    for line in sys.stdin:
+        file_path = Path(json.loads(line)["path"])
+        try:
+            response = {"text": get_reader(file_path.suffix)(file_path)}
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,204 @@
+import argparse
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Iterator, Optional
+
+from config import SUMMARY_DB_FILE, SUMMARY_STORE_MMAP_BYTES, SUMMARIES_DIR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    repository TEXT NOT NULL,
+    source_path TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    model TEXT,
+    prompt_mode TEXT,
+    source_chars INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    llm_seconds REAL,
+    cached INTEGER,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (repository, source_path, content_hash)
+)
+"""
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS summaries_by_hash ON summaries (content_hash)",
+]
+
+# Metadata columns accepted by put(), in addition to the key columns and the summary
+METADATA_FIELDS = [
+    "model", "prompt_mode", "source_chars", "prompt_tokens", "completion_tokens", "llm_seconds", "cached",
+]
+
+
+class SummaryStore:
+    """
+    SQLite store of file summaries, keyed by repository, source path and content hash.
+
+    Storing a summary for a path and content that is already present replaces it and
+    makes it the latest record for that path. Lookups by path or by content hash use
+    the primary key and an index; scans read the table in insertion order, which
+    SQLite serves from the memory-mapped database file.
+    """
+
+    def __init__(self, db_path: Path = SUMMARY_DB_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(SUMMARY_STORE_MMAP_BYTES)}")
+        self._conn.execute(SCHEMA)
+        for statement in INDEXES:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def put(self, repository: str, source_path: str, content_hash: str, summary: str, **metadata):
+        """Store the summary of a file's content; metadata keys are listed in METADATA_FIELDS."""
+        unknown = set(metadata) - set(METADATA_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown summary metadata: {', '.join(sorted(unknown))}")
+        columns = ["repository", "source_path", "content_hash", "summary", "created_at", *metadata]
+        values = [repository, source_path, content_hash, summary, time.time(), *metadata.values()]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO summaries ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values,
+            )
+            self._conn.commit()
+
+    def get(self, repository: str, source_path: str, content_hash: Optional[str] = None) -> Optional[Dict]:
+        """Return the latest record for a path, or the record for a specific content of that path."""
+        query = "SELECT * FROM summaries WHERE repository = ? AND source_path = ?"
+        params = [repository, source_path]
+        if content_hash is not None:
+            query += " AND content_hash = ?"
+            params.append(content_hash)
+        with self._lock:
+            row = self._conn.execute(query + " ORDER BY rowid DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def find_by_hash(self, content_hash: str) -> Optional[Dict]:
+        """Return the latest record for a file content, from any path or repository."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM summaries WHERE content_hash = ? ORDER BY rowid DESC LIMIT 1", (content_hash,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def iter_latest(self, repository: Optional[str] = None) -> Iterator[Dict]:
+        """Yield the latest record per source path, in the order the files were summarized."""
+        query = (
+            "SELECT * FROM summaries WHERE rowid IN "
+            "(SELECT MAX(rowid) FROM summaries {where} GROUP BY repository, source_path) ORDER BY rowid"
+        )
+        params = []
+        where = ""
+        if repository is not None:
+            where = "WHERE repository = ?"
+            params.append(repository)
+        with self._lock:
+            rows = self._conn.execute(query.format(where=where), params).fetchall()
+        for row in rows:
+            yield dict(row)
+
+    def prune(self, repository: str, keep_paths: Iterable[str]) -> int:
+        """Delete the records of a repository's files that are not in `keep_paths` (e.g. deleted files)."""
+        keep_paths = set(keep_paths)
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT source_path FROM summaries WHERE repository = ?", (repository,)
+            )]
+        stale = [path for path in paths if path not in keep_paths]
+        self.delete(repository, stale)
+        if stale:
+            logging.info("Removed summaries of %d files no longer in %s", len(stale), repository)
+        return len(stale)
+
+    def delete(self, repository: str, source_paths: Iterable[str]) -> int:
+        """Delete all records of the given files of a repository; returns the number of records deleted."""
+        with self._lock:
+            cursor = self._conn.executemany(
+                "DELETE FROM summaries WHERE repository = ? AND source_path = ?",
+                [(repository, path) for path in source_paths],
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Return record counts and token and timing totals."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS records, COUNT(DISTINCT repository) AS repositories, "
+                "SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens, "
+                "SUM(llm_seconds) AS llm_seconds FROM summaries"
+            ).fetchone()
+        return {key: round(row[key] or 0, 3) for key in row.keys()}
+
+    def export_loose_files(self, output_dir: Path = SUMMARIES_DIR, repository: Optional[str] = None) -> int:
+        """
+        Write the latest summary of every file as its own text file, in the layout of
+        earlier versions: <file stem>_<timestamp>_<id>.txt. Returns the number of files.
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        count = 0
+        for record in self.iter_latest(repository):
+            stem = re.sub(r'[^a-zA-Z0-9_\-]', '_', PurePosixPath(record["source_path"]).stem)
+            timestamp = datetime.fromtimestamp(record["created_at"]).strftime("%Y%m%d%H%M%S")
+            file_name = f"{stem}_{timestamp}_{record['content_hash'][:6]}.txt"
+            (output_dir / file_name).write_text(record["summary"], encoding='utf-8')
+            count += 1
+        return count
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """Command line entry point for inspecting and exporting the summary store."""
+    parser = argparse.ArgumentParser(description="Inspect and export the file summary store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write each summary to its own text file.")
+    export_parser.add_argument("output_dir", type=Path, nargs='?', default=SUMMARIES_DIR,
+                               help="Directory for the summary files.")
+    export_parser.add_argument("--repository", help="Only summaries of this repository.")
+
+    show_parser = subparsers.add_parser("show", help="Print the latest summary of a file.")
+    show_parser.add_argument("repository", help="Repository as given to the analysis, e.g. repo.")
+    show_parser.add_argument("source_path", help="Path of the file relative to the repository.")
+
+    subparsers.add_parser("stats", help="Show record counts and token totals.")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    store = SummaryStore()
+    try:
+        if args.command == "export":
+            count = store.export_loose_files(args.output_dir, args.repository)
+            print(f"Exported {count} summaries to {args.output_dir}")
+        elif args.command == "show":
+            record = store.get(args.repository, args.source_path)
+            if record is None:
+                parser.exit(1, f"No summary stored for {args.source_path} in {args.repository}\n")
+            print(record["summary"])
+        elif args.command == "stats":
+            for key, value in store.stats().items():
+                print(f"{key + ':':<19}{value}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import zipfile
+from archive_source import is_safe_member_name, iter_archive_members
+
+
+def test_is_safe_member_name():
+    assert is_safe_member_name("docs/guide.pdf")
+    assert is_safe_member_name("a..b/c.txt")
+    for name in ["docs/../../../../escaped.pdf", "../x.txt", "/etc/passwd", "C:/x.txt", "docs\\..\\x.txt", ""]:
+        assert not is_safe_member_name(name), name
+
+
+def test_iter_archive_members_skips_names_leaving_the_archive(tmp_path):
+    archive = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("docs/guide.md", "# Guide")
+        zf.writestr("docs/../../../../escaped.md", "# Escaped")
+        zf.writestr("/abs/root.md", "# Root")
+    members = [member.members for member in iter_archive_members(archive, tmp_path)]
+    assert members == [("docs/guide.md",)]
@@ -0,0 +1,55 @@
+from code_skeleton import extract_skeleton
+
+JAVA_SOURCE = """\
+package app;
+
+import java.io.IOException;
+
+public class Reader {
+    private int count;
+
+    public String read(String path,
+                       int limit) throws IOException {
+        int a = 1;
+        int b = 2;
+        int c = 3;
+        int d = 4;
+        int e = 5;
+        return "";
+    }
+}
+"""
+
+
+def test_brace_skeleton_keeps_declarations_and_samples_bodies():
+    skeleton = extract_skeleton(JAVA_SOURCE, '.java', body_sample_lines=2)
+    assert "import java.io.IOException;" in skeleton
+    assert "private int count;" in skeleton
+    assert "int limit) throws IOException {" in skeleton
+    assert "int a = 1;" in skeleton and "int b = 2;" in skeleton
+    assert "int d = 4;" not in skeleton
+    assert skeleton.rstrip().endswith("}")
+
+
+def test_brace_skeleton_opens_body_on_signature_continuation_line():
+    source = ("void run(int a,\n         int b)\n{\n    one();\n    two();\n    three();\n}\n"
+              "int after;\n")
+    skeleton = extract_skeleton(source, '.c', body_sample_lines=1)
+    assert "one();" in skeleton
+    assert "two();" not in skeleton
+    assert "int after;" in skeleton
+
+
+def test_python_skeleton_keeps_signatures_and_docstrings():
+    source = ('import os\n\n\ndef work(path):\n    """Do the work."""\n'
+              + ''.join(f'    step{n} = {n}\n' for n in range(10)) + '    return path\n')
+    skeleton = extract_skeleton(source, '.py', body_sample_lines=2)
+    assert "import os" in skeleton
+    assert "def work(path):" in skeleton
+    assert '"""Do the work."""' in skeleton
+    assert "step9 = 9" not in skeleton
+
+
+def test_unsupported_or_broken_source_is_returned_unchanged():
+    assert extract_skeleton("a: [b", '.yaml') == "a: [b"
+    assert extract_skeleton("def broken(:\n", '.py') == "def broken(:\n"
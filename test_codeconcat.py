@@ -0,0 +1,53 @@
+import codeconcat
+from codeconcat import ShardWriter, export_corpus
+
+
+def _shard_texts(output_dir, writer):
+    return [(output_dir / shard["file"]).read_text(encoding="utf-8") for shard in writer.shards]
+
+
+def test_abort_file_removes_partial_content_across_shards(tmp_path):
+    writer = ShardWriter(tmp_path, max_bytes=300)
+    writer.start_file("a.txt")
+    writer.write_content("alpha\n")
+    writer.end_file()
+    shard = dict(writer.shards[0], files=list(writer.shards[0]["files"]))
+
+    writer.start_file("b.txt")
+    writer.write_content("b" * 500)
+    assert len(writer.shards) > 1
+    writer.abort_file()
+    assert writer.shards == [shard]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["corpus_0001.txt"]
+
+    writer.start_file("c.txt")
+    writer.write_content("gamma\n")
+    writer.end_file()
+    writer.close()
+    assert _shard_texts(tmp_path, writer)[0] == (
+        f"# File: a.txt\n\nalpha\n{codeconcat.FILE_SEPARATOR}# File: c.txt\n\ngamma\n{codeconcat.FILE_SEPARATOR}"
+    )
+    assert writer.shards[0]["bytes"] == len(_shard_texts(tmp_path, writer)[0].encode("utf-8"))
+
+
+def test_export_corpus_leaves_failed_files_out(monkeypatch, tmp_path):
+    source = tmp_path / "src"
+    source.mkdir()
+    for name in ("a.py", "b.py", "c.py"):
+        (source / name).write_text(f"# {name}\n" * 50, encoding="utf-8")
+    iter_content = codeconcat.iter_content
+
+    def failing_iter_content(file_path, extracted):
+        for number, chunk in enumerate(iter_content(file_path, extracted)):
+            yield chunk
+            if file_path.name == "b.py":
+                raise OSError("disk error")
+
+    monkeypatch.setattr(codeconcat, "CHUNK_SIZE", 100)
+    monkeypatch.setattr(codeconcat, "iter_content", failing_iter_content)
+    output_dir = tmp_path / "corpus"
+    index = export_corpus(source, output_dir, workers=1)
+    assert index["failed_files"] == ["b.py"]
+    assert [entry["path"] for shard in index["shards"] for entry in shard["files"]] == ["a.py", "c.py"]
+    corpus = "".join((output_dir / shard["file"]).read_text(encoding="utf-8") for shard in index["shards"])
+    assert "b.py" not in corpus
@@ -0,0 +1,23 @@
+from complexity import complexity_metrics
+
+
+def test_complexity_metrics_of_brace_language():
+    source = """\
+#include <stdio.h>
+// { a comment brace
+int main() {
+    if (a && b) {
+        for (;;) { puts("}{"); }
+    }
+}
+"""
+    assert complexity_metrics(source, '.C') == {"lines": 7, "depth": 3, "branches": 3, "imports": 1}
+
+
+def test_complexity_metrics_of_indented_language():
+    source = "import os\nfrom a import b\n\ndef f(x):\n    if x:\n        for y in x:\n            pass\n"
+    assert complexity_metrics(source, '.py') == {"lines": 6, "depth": 3, "branches": 2, "imports": 2}
+
+
+def test_complexity_metrics_of_other_text_count_lines_only():
+    assert complexity_metrics("if: 1\n\nfor: 2\n", '.yaml') == {"lines": 2, "depth": 0, "branches": 0, "imports": 0}
@@ -0,0 +1,39 @@
+import diff_mode
+from diff_mode import FileChange, blob_sizes, get_changed_files
+
+
+def test_get_changed_files_parses_nul_separated_output(monkeypatch):
+    output = (b"M\0src/app.py\0"
+              b"R087\0old name.py\0new name.py\0"
+              b"C100\0lib/a.py\0lib/b.py\0"
+              b"D\0gone\xc3\xa9.txt\0"
+              b"A\0docs/tab\there.md\0")
+    calls = []
+
+    def fake_run_git(repo_directory, *args):
+        calls.append(args)
+        return output
+
+    monkeypatch.setattr(diff_mode, "run_git", fake_run_git)
+    changes = get_changed_files("repo", "main", "HEAD")
+    assert changes == [
+        FileChange("M", "src/app.py"),
+        FileChange("R", "new name.py", "old name.py", 87),
+        FileChange("C", "lib/b.py", "lib/a.py", 100),
+        FileChange("D", "goneé.txt"),
+        FileChange("A", "docs/tab\there.md"),
+    ]
+    assert calls == [('diff', '--name-status', '-z', '-M', '-C', 'main', 'HEAD')]
+
+
+def test_get_changed_files_without_changes(monkeypatch):
+    monkeypatch.setattr(diff_mode, "run_git", lambda repo_directory, *args: b"")
+    assert get_changed_files("repo", "main", "HEAD") == []
+
+
+def test_blob_sizes_parses_ls_tree_output(monkeypatch):
+    output = (b"100644 blob 1f2e3d4c        12\tsrc/app.py\0"
+              b"160000 commit 5a6b7c8d       -\tvendor/lib\0"
+              b"100644 blob 9e8f7a6b  600000\tdata/big file.json\0")
+    monkeypatch.setattr(diff_mode, "run_git", lambda repo_directory, *args: output)
+    assert blob_sizes("repo", "HEAD") == {"src/app.py": 12, "data/big file.json": 600000}
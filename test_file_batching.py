@@ -0,0 +1,47 @@
+from file_batching import FileBatch, plan_batches, parse_batch_response
+
+
+def test_parse_batch_response_splits_sections():
+    response = "=== FILE 1 ===\nFirst.\n\n## === FILE 2: b.py ===\nSecond."
+    assert parse_batch_response(response, 2) == {1: "First.", 2: "Second."}
+
+
+def test_parse_batch_response_drops_duplicate_sections():
+    response = "=== FILE 1 ===\nOne.\n=== FILE 2 ===\nTwo.\n=== FILE 1 ===\nAgain."
+    assert parse_batch_response(response, 2) == {2: "Two."}
+
+
+def test_parse_batch_response_leaves_out_missing_and_empty_sections():
+    response = "=== FILE 1 ===\n\n=== FILE 3 ===\nThree."
+    assert parse_batch_response(response, 3) == {3: "Three."}
+
+
+def test_parse_batch_response_ignores_numbers_outside_the_batch():
+    response = "=== FILE 0 ===\nZero.\n=== FILE 1 ===\nOne.\n=== FILE 4 ===\nFour."
+    assert parse_batch_response(response, 3) == {1: "One."}
+
+
+def _plan(files, sizes, **limits):
+    return plan_batches(files, sizes.get, lambda name: name.split('/')[0], **limits)
+
+
+def test_plan_batches_groups_small_files_by_key():
+    sizes = {'a/1': 10, 'a/2': 10, 'b/1': 10, 'a/3': 10, 'a/big': 1000}
+    items = _plan(['a/1', 'a/2', 'b/1', 'a/3', 'a/big'], sizes, max_file_tokens=100, token_budget=1000, max_files=10)
+    assert isinstance(items[0], FileBatch)
+    assert items[0].files == ['a/1', 'a/2', 'a/3']
+    assert items[0].tokens == 30
+    # A batch with a single file is replaced by the file
+    assert items[1:] == ['b/1', 'a/big']
+
+
+def test_plan_batches_respects_budget_and_file_limit():
+    sizes = {f'a/{n}': 40 for n in range(5)}
+    items = _plan(list(sizes), sizes, max_file_tokens=100, token_budget=100, max_files=2)
+    assert [item.files for item in items[:2]] == [['a/0', 'a/1'], ['a/2', 'a/3']]
+    assert items[2] == 'a/4'
+
+
+def test_plan_batches_keeps_files_without_estimate():
+    items = _plan(['a/1', 'a/2'], {}, max_file_tokens=100, token_budget=1000, max_files=10)
+    assert items == ['a/1', 'a/2']
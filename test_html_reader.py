@@ -0,0 +1,27 @@
+from file_readers.html_reader import _TextExtractor
+
+
+def _extract(html: str, keep_headings: bool = True, max_bytes: int = 10000) -> _TextExtractor:
+    parser = _TextExtractor(keep_headings, max_bytes)
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def test_text_extractor_collapses_whitespace_per_block():
+    html = ('<html><head><title>Doc</title><style>p {}</style><script>var x;</script></head>'
+            '<body><h2>Intro</h2><p>Some\n   text <b>here</b></p><div>Next</div></body></html>')
+    assert _extract(html).lines == ['Doc', '## Intro', 'Some text here', 'Next']
+    assert _extract(html, keep_headings=False).lines[1] == 'Intro'
+
+
+def test_text_extractor_keeps_preformatted_lines():
+    parser = _extract('<p>Code:</p><pre>\nif x:\n    y()\n</pre>')
+    assert parser.lines == ['Code:', 'if x:\n    y()']
+
+
+def test_text_extractor_stops_at_byte_budget_inside_one_element():
+    parser = _extract('<span>' + 'word ' * 10000 + '</span><p>after</p>', max_bytes=100)
+    assert parser.full
+    assert len('\n'.join(parser.lines).encode('utf-8')) <= 100
+    assert 'after' not in parser.lines
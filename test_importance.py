@@ -0,0 +1,32 @@
+import importance
+from importance import git_churn
+
+
+def _fake_git(prefix: bytes, log: bytes, calls=None):
+    def run_git(directory, *args):
+        if calls is not None:
+            calls.append(args)
+        return prefix if 'rev-parse' in args else log
+    return run_git
+
+
+def test_git_churn_strips_the_subdirectory_prefix(monkeypatch):
+    log = b"app/pkg/a.py\napp/pkg/b.py\n\napp/pkg/a.py\nother/c.py\n"
+    calls = []
+    monkeypatch.setattr(importance, "run_git", _fake_git(b"app/pkg/\n", log, calls))
+    assert git_churn("repo/app/pkg", since="1 month ago") == {"a.py": 2, "b.py": 1}
+    assert "--since=1 month ago" in calls[1]
+    assert calls[1][-2:] == ('--', '.')
+
+
+def test_git_churn_at_the_repository_root(monkeypatch):
+    monkeypatch.setattr(importance, "run_git", _fake_git(b"\n", "src/é.py\nsrc/é.py\n".encode('utf-8')))
+    assert git_churn("repo", since=None) == {"src/é.py": 2}
+
+
+def test_git_churn_outside_a_repository(monkeypatch):
+    def run_git(directory, *args):
+        raise RuntimeError("not a git repository")
+
+    monkeypatch.setattr(importance, "run_git", run_git)
+    assert git_churn("somewhere") == {}
@@ -0,0 +1,130 @@
+import socket
+import threading
+import time
+import pytest
+import llm_client
+from config import CIRCUIT_BREAKER_FAILURES
+from llm_client import CircuitBreaker, LLMRequestError, OllamaClient
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_client.time, "monotonic", clock)
+    return CircuitBreaker(failure_threshold=2, reset_seconds=30), clock
+
+
+def test_circuit_opens_after_consecutive_failures(monkeypatch):
+    breaker, _ = _breaker(monkeypatch)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.is_open and breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.available() and not breaker.allow()
+
+
+def test_one_trial_request_after_reset_time(monkeypatch):
+    breaker, clock = _breaker(monkeypatch)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 30
+    # available() does not claim the trial request
+    assert breaker.available() and breaker.available()
+    assert breaker.allow()
+    assert not breaker.available() and not breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open and breaker.allow()
+
+
+def test_failed_trial_keeps_circuit_open(monkeypatch):
+    breaker, clock = _breaker(monkeypatch)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_cancelled_trial_frees_the_slot(monkeypatch):
+    breaker, clock = _breaker(monkeypatch)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_cancelled()
+    assert breaker.is_open and breaker.allow()
+
+
+def _serve(handle):
+    """Start a one-connection-at-a-time HTTP server whose `handle(conn)` answers each request."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def loop():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn:
+                conn.recv(65536)
+                handle(conn)
+
+    threading.Thread(target=loop, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.getsockname()[1]}/api/generate"
+
+
+def _chunk(line: bytes) -> bytes:
+    return b"%x\r\n%s\r\n" % (len(line), line)
+
+
+def test_stalled_stream_fails_after_idle_timeout():
+    def stall(conn):
+        conn.sendall(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                     + _chunk(b'{"response": "a", "done": false}\n'))
+        time.sleep(5)
+
+    server, url = _serve(stall)
+    client = OllamaClient([url], first_token_timeout=30, idle_timeout=0.5, max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(LLMRequestError, match="idle"):
+        client.generate({"model": "m"})
+    assert time.monotonic() - started < 3
+    server.close()
+
+
+def _status(code: int, reason: str):
+    def respond(conn):
+        conn.sendall(b"HTTP/1.1 %d %s\r\nContent-Length: 0\r\n\r\n" % (code, reason.encode()))
+    return respond
+
+
+def test_only_server_errors_count_against_the_circuit():
+    server, url = _serve(_status(404, "Not Found"))
+    client = OllamaClient([url], max_retries=0)
+    for _ in range(CIRCUIT_BREAKER_FAILURES + 1):
+        with pytest.raises(LLMRequestError):
+            client.generate({"model": "unknown"})
+    assert not client.breakers[url].is_open
+    server.close()
+
+    server, url = _serve(_status(500, "Internal Server Error"))
+    client = OllamaClient([url], max_retries=0)
+    for _ in range(CIRCUIT_BREAKER_FAILURES):
+        with pytest.raises(LLMRequestError):
+            client.generate({"model": "m"})
+    assert client.breakers[url].is_open
+    server.close()
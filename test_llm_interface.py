@@ -0,0 +1,35 @@
+import llm_interface
+from llm_cache import LLMCache
+from llm_interface import batch_cache_key, cached_file_summary, summarize_file_content
+
+MODEL = "big-model"
+
+
+def _cache(monkeypatch, tmp_path) -> LLMCache:
+    cache = LLMCache(tmp_path / "llm_cache.sqlite")
+    monkeypatch.setattr(llm_interface, "_cache", cache)
+    monkeypatch.setattr(llm_interface, "MODEL_ROUTING", False)
+    return cache
+
+
+def test_summary_from_a_batch_request_is_reused(monkeypatch, tmp_path):
+    cache = _cache(monkeypatch, tmp_path)
+    content = "def add(a, b):\n    return a + b\n"
+    cache.put(batch_cache_key(content, MODEL), "Adds two numbers.", MODEL)
+
+    def request_llm(*args, **kwargs):
+        raise AssertionError("the LLM must not be called for a cached file")
+
+    monkeypatch.setattr(llm_interface, "request_llm", request_llm)
+    assert cached_file_summary("pkg/math.py", content, MODEL) == ("Adds two numbers.", "batch")
+    response_info = {}
+    assert summarize_file_content("pkg/math.py", content, MODEL, response_info=response_info) == "Adds two numbers."
+    assert response_info["cached"] is True and response_info["prompt_mode"] == "batch"
+
+
+def test_uncached_file_is_summarized(monkeypatch, tmp_path):
+    _cache(monkeypatch, tmp_path)
+    monkeypatch.setattr(llm_interface, "request_llm", lambda *args, **kwargs: "A summary.")
+    assert cached_file_summary("a.py", "x = 1\n", MODEL) is None
+    assert summarize_file_content("a.py", "x = 1\n", MODEL) == "A summary."
+    assert cached_file_summary("a.py", "x = 1\n", MODEL) == ("A summary.", "full")
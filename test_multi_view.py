@@ -0,0 +1,27 @@
+from diagram_generators.multi_view import generate_views
+
+SUMMARIES = {f"repo/{package}/file{n}.py": f"Part {n} of {package}." for package in ("api", "core") for n in range(3)}
+
+
+def _run(tmp_path, drawn, coverage=None):
+    def generate_view(summary, renderer, view_dir):
+        drawn.append(view_dir.name)
+        view_dir.mkdir(parents=True, exist_ok=True)
+        (view_dir / f"mermaid_diagram_{len(drawn)}.png").write_bytes(b"png")
+        return True
+
+    return generate_views(SUMMARIES, object(), tmp_path, generate_view, "mermaid", "model",
+                          workers=1, min_files=1, max_views=5, coverage=coverage)
+
+
+def test_unchanged_views_are_kept_until_the_coverage_note_changes(tmp_path):
+    drawn = []
+    assert _run(tmp_path, drawn, "Partial coverage: 4 of 6 files")
+    views = len(drawn)
+    assert views == 3
+    assert _run(tmp_path, drawn, "Partial coverage: 4 of 6 files")
+    assert len(drawn) == views
+    assert _run(tmp_path, drawn, "Partial coverage: 5 of 6 files")
+    assert len(drawn) == 2 * views
+    assert _run(tmp_path, drawn)
+    assert len(drawn) == 3 * views
@@ -0,0 +1,29 @@
+import io
+from file_readers._office_xml import W_NS, MC_NS, iter_paragraphs, _ooxml_paragraph_text
+
+
+def _docx_paragraphs(body: str):
+    xml = (f'<w:document xmlns:w="{W_NS[1:-1]}" xmlns:mc="{MC_NS[1:-1]}"><w:body>{body}</w:body></w:document>')
+    return list(iter_paragraphs(
+        io.BytesIO(xml.encode('utf-8')), {W_NS + 'p'},
+        lambda p: _ooxml_paragraph_text(p, W_NS + 't', {W_NS + 'br'}, W_NS + 'tab'),
+        skip_tags={MC_NS + 'Fallback'},
+    ))
+
+
+def test_iter_paragraphs_yields_text_with_breaks_and_tabs():
+    body = '<w:p><w:r><w:t>Hello</w:t><w:tab/><w:t>world</w:t><w:br/><w:t>again</w:t></w:r></w:p><w:p/>'
+    assert _docx_paragraphs(body) == ['Hello\tworld\nagain', '']
+
+
+def test_iter_paragraphs_yields_nested_paragraphs_on_their_own():
+    body = ('<w:p><w:r><w:t>outer</w:t></w:r>'
+            '<w:txbxContent><w:p><w:r><w:t>inner</w:t></w:r></w:p></w:txbxContent>'
+            '<w:r><w:t> end</w:t></w:r></w:p>')
+    assert _docx_paragraphs(body) == ['inner', 'outer end']
+
+
+def test_iter_paragraphs_skips_fallback_content():
+    body = ('<mc:AlternateContent><mc:Choice><w:p><w:r><w:t>box</w:t></w:r></w:p></mc:Choice>'
+            '<mc:Fallback><w:p><w:r><w:t>box</w:t></w:r></w:p></mc:Fallback></mc:AlternateContent>')
+    assert _docx_paragraphs(body) == ['box']
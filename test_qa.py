@@ -0,0 +1,80 @@
+import qa
+from qa import BM25Index, load_summary_documents
+from summary_store import SummaryStore
+
+
+def _index():
+    index = BM25Index()
+    index.update({
+        "summary:cache.py": ("cache.py", "Stores LLM responses in an SQLite cache."),
+        "summary:render.py": ("render.py", "Renders diagrams with a headless browser."),
+        "summary:main.py": ("main.py", "Command line entry point that runs the analysis."),
+    }, "summary")
+    return index
+
+
+def test_search_ranks_matching_document_first():
+    results = _index().search("where are responses cached", top_k=2)
+    assert results[0][1]["path"] == "cache.py"
+    assert len(results) <= 2
+
+
+def test_search_without_matches_or_documents():
+    assert _index().search("kubernetes") == []
+    assert BM25Index().search("cache") == []
+
+
+def test_update_adds_changes_and_removes_documents():
+    index = _index()
+    length = index.total_length
+    changed, removed = index.update({
+        "summary:cache.py": ("cache.py", "Stores LLM responses in an SQLite cache."),
+        "summary:render.py": ("render.py", "Draws charts in a browser."),
+    }, "summary")
+    assert (changed, removed) == (1, 1)
+    assert set(index.docs) == {"summary:cache.py", "summary:render.py"}
+    assert "headless" not in index.df and index.df["chart"] == 1
+    assert index.total_length < length
+    assert index.search("charts")[0][1]["path"] == "render.py"
+    assert index.update({}, "code") == (0, 0)
+    assert len(index.docs) == 2
+
+
+def test_update_file_replaces_documents_of_a_file():
+    index = BM25Index()
+    assert index.update_file("a.py", [1, 10], {"code:a.py:1": ("a.py", "alpha"), "code:a.py:2": ("a.py", "beta")},
+                             "code") == (2, 0)
+    assert index.update_file("a.py", [2, 5], {"code:a.py:1": ("a.py", "alpha")}, "code") == (0, 1)
+    assert index.files["a.py"] == {"stamp": [2, 5], "doc_ids": ["code:a.py:1"]}
+    assert index.search("beta") == []
+    assert index.remove_file("a.py") == 1
+    assert not index.docs and not index.files
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = _index()
+    index.update_file("a.py", [1, 2], {"code:a.py:1": ("a.py", "alpha")}, "code")
+    index_file = tmp_path / "qa_index.json"
+    index.save(index_file)
+    loaded = BM25Index.load(index_file)
+    assert loaded.docs == index.docs and loaded.files == index.files
+    assert loaded.search("alpha")[0][1]["path"] == "a.py"
+
+
+def test_load_summary_documents_of_one_repository(monkeypatch, tmp_path):
+    db_file = tmp_path / "summaries.sqlite"
+    store = SummaryStore(db_file)
+    store.put("shop", "cart.py", "h1", "Keeps the cart.")
+    store.put("blog", "post.py", "h2", "Renders posts.")
+    store.close()
+    monkeypatch.setattr(qa, "SummaryStore", lambda: SummaryStore(db_file))
+    missing = tmp_path / "combined_summary.txt"
+    assert set(load_summary_documents(missing)) == {"summary:shop/cart.py", "summary:blog/post.py"}
+    assert load_summary_documents(missing, "shop") == {"summary:shop/cart.py": ("shop/cart.py", "Keeps the cart.")}
+
+
+def test_search_uses_document_frequencies():
+    index = _index()
+    index.update_file("cache2.py", [1, 1], {"code:cache2.py:1": ("cache2.py", "Another cache.")}, "code")
+    assert index.df["cache"] == 2
+    assert [doc["path"] for _, doc in index.search("cache")] == ["cache2.py", "cache.py"]
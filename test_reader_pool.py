@@ -0,0 +1,20 @@
+import json
+from reader_pool import ReaderError, UNPROCESSED_LIST_NAME, record_unprocessed
+
+
+def test_record_unprocessed_copies_the_file(tmp_path):
+    source = tmp_path / "report.pdf"
+    source.write_bytes(b"%PDF")
+    unprocessed_dir = tmp_path / "out" / "unprocessed"
+    record_unprocessed(source, "docs/report.pdf", unprocessed_dir, ReaderError("broken"))
+    assert (unprocessed_dir / "docs" / "report.pdf").read_bytes() == b"%PDF"
+
+
+def test_record_unprocessed_does_not_write_outside_its_directory(tmp_path):
+    source = tmp_path / "report.pdf"
+    source.write_bytes(b"%PDF")
+    unprocessed_dir = tmp_path / "out" / "unprocessed"
+    record_unprocessed(source, "docs/../../../escaped.pdf", unprocessed_dir, ReaderError("broken"))
+    assert not (tmp_path / "escaped.pdf").exists()
+    entries = (unprocessed_dir / UNPROCESSED_LIST_NAME).read_text(encoding="utf-8").splitlines()
+    assert json.loads(entries[0])["path"] == "docs/../../../escaped.pdf"